@@ -0,0 +1,77 @@
+const express = require('express');
+const router = express.Router();
+const llmService = require('../services/llmService');
+
+// Bulk generation: jobs are queued on the LLM service and polled for, so no
+// request has to stay open for the whole generation
+router.post('/', async (req, res) => {
+    try {
+        const { jobs, batchId } = req.body;
+
+        if (!Array.isArray(jobs) || jobs.length === 0) {
+            return res.status(400).json({
+                success: false,
+                error: 'Jobs must be a non-empty array'
+            });
+        }
+
+        const submitted = await llmService.submitJobs(jobs, batchId);
+
+        res.status(202).json({
+            success: true,
+            data: submitted
+        });
+    } catch (error) {
+        console.error('Job submission error:', error);
+        res.status(error.status || 500).json({
+            success: false,
+            error: error.message || 'Failed to submit jobs'
+        });
+    }
+});
+
+// Fetch many results at once, by ids or a page of a batch
+router.post('/results', async (req, res) => {
+    try {
+        const { ids, batchId, status, after, limit } = req.body;
+
+        if (!Array.isArray(ids) && (!batchId || typeof batchId !== 'string')) {
+            return res.status(400).json({
+                success: false,
+                error: 'Job ids or a batch id are required'
+            });
+        }
+
+        const results = await llmService.getJobResults({ ids, batchId, status, after, limit });
+
+        res.json({
+            success: true,
+            data: results
+        });
+    } catch (error) {
+        console.error('Job results error:', error);
+        res.status(error.status || 500).json({
+            success: false,
+            error: error.message || 'Failed to get job results'
+        });
+    }
+});
+
+router.get('/:id', async (req, res) => {
+    try {
+        const job = await llmService.getJob(req.params.id);
+
+        res.json({
+            success: true,
+            data: job
+        });
+    } catch (error) {
+        console.error('Job status error:', error);
+        res.status(error.status || 500).json({
+            success: false,
+            error: error.message || 'Failed to get job'
+        });
+    }
+});
+
+module.exports = router;
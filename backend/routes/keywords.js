@@ -38,6 +38,33 @@ router.post('/research', async (req, res) => {
     }
 });
 
+// Keystroke-driven suggestions, served without an LLM call
+router.get('/suggest', async (req, res) => {
+    try {
+        const { q, limit } = req.query;
+
+        if (!q || typeof q !== 'string' || !q.trim()) {
+            return res.status(400).json({
+                success: false,
+                error: 'Query is required'
+            });
+        }
+
+        const suggestions = await llmService.suggestKeywords(q, Number(limit) || 10);
+
+        res.json({
+            success: true,
+            data: suggestions
+        });
+    } catch (error) {
+        console.error('Keyword suggestion error:', error);
+        res.status(500).json({
+            success: false,
+            error: error.message || 'Failed to suggest keywords'
+        });
+    }
+});
+
 // Get current session keywords
 router.get('/current', (req, res) => {
     res.json({
@@ -36,6 +36,7 @@ const titleRoutes = require('./routes/titles');
 const topicRoutes = require('./routes/topics');
 const contentRoutes = require('./routes/content');
 const authRoutes = require('./routes/auth');
+const jobRoutes = require('./routes/jobs');
 
 // Use routes
 app.use('/api/keywords', keywordRoutes);
@@ -43,6 +44,7 @@ app.use('/api/titles', titleRoutes);
 app.use('/api/topics', topicRoutes);
 app.use('/api/content', contentRoutes);
 app.use('/api/auth', authRoutes);
+app.use('/api/jobs', jobRoutes);
 
 // Health check endpoint
 app.get('/api/health', (req, res) => {
@@ -2,6 +2,16 @@ const axios = require('axios');
 
 const LLM_SERVICE_URL = process.env.LLM_SERVICE_URL || 'http://localhost:5001';
 
+// Keeps the LLM service's 4xx status (a bad job, an unknown id) for the route to pass on
+function jobError(message, error) {
+    const wrapped = new Error(`${message}: ${error.message}`);
+    const status = error.response && error.response.status;
+    if (status >= 400 && status < 500) {
+        wrapped.status = status;
+    }
+    return wrapped;
+}
+
 class LLMService {
     constructor() {
         this.client = axios.create({
@@ -15,13 +25,12 @@ class LLMService {
 
     async generateKeywords(seedKeyword) {
         try {
-            const response = await this.client.post('/generate-keywords', {
+            // v2 returns the keyword list itself, not a JSON string to parse again
+            const response = await this.client.post('/v2/generate-keywords', {
                 seed_keyword: seedKeyword
             });
 
-            // Parse the JSON string response
-            const keywords = JSON.parse(response.data.keywords);
-            return keywords;
+            return response.data.keywords;
         } catch (error) {
             if (error.code === 'ECONNREFUSED') {
                 // Fallback to mock data if LLM service is not available
@@ -34,13 +43,12 @@ class LLMService {
 
     async generateTitles(keyword, tone = 'professional') {
         try {
-            const response = await this.client.post('/generate-titles', {
+            const response = await this.client.post('/v2/generate-titles', {
                 keyword,
                 tone
             });
 
-            const titles = JSON.parse(response.data.titles);
-            return titles;
+            return response.data.titles;
         } catch (error) {
             if (error.code === 'ECONNREFUSED') {
                 console.warn('LLM service not available, using mock data');
@@ -52,13 +60,12 @@ class LLMService {
 
     async generateTopics(title, keyword) {
         try {
-            const response = await this.client.post('/generate-topics', {
+            const response = await this.client.post('/v2/generate-topics', {
                 title,
                 keyword
             });
 
-            const topics = JSON.parse(response.data.topics);
-            return topics;
+            return response.data.topics;
         } catch (error) {
             if (error.code === 'ECONNREFUSED') {
                 console.warn('LLM service not available, using mock data');
@@ -70,7 +77,7 @@ class LLMService {
 
     async generateContent(title, keyword, outline, contentType = 'blog_intro', wordCount = 150) {
         try {
-            const response = await this.client.post('/generate-content', {
+            const response = await this.client.post('/v2/generate-content', {
                 title,
                 keyword,
                 outline,
@@ -106,6 +113,63 @@ class LLMService {
         }
     }
 
+    // Bulk generation runs as queued jobs on the LLM service, so it does not
+    // depend on a request staying open for the whole generation
+    async submitJobs(jobs, batchId) {
+        try {
+            const response = await this.client.post('/jobs', {
+                jobs,
+                batch_id: batchId
+            });
+
+            return response.data;
+        } catch (error) {
+            throw jobError('Failed to submit jobs', error);
+        }
+    }
+
+    async getJob(jobId) {
+        try {
+            const response = await this.client.get(`/jobs/${encodeURIComponent(jobId)}`);
+            return response.data;
+        } catch (error) {
+            throw jobError('Failed to get job', error);
+        }
+    }
+
+    async getJobResults({ ids, batchId, status, after = 0, limit = 100 }) {
+        try {
+            const response = await this.client.post('/jobs/results', ids ? { ids } : {
+                batch_id: batchId,
+                status,
+                after,
+                limit
+            });
+
+            return response.data;
+        } catch (error) {
+            throw jobError('Failed to get job results', error);
+        }
+    }
+
+    // Autocomplete from the LLM service's local keyword index; never calls the model.
+    // An empty result (rather than an error) keeps typing responsive while it is down.
+    async suggestKeywords(query, limit = 10) {
+        try {
+            const response = await this.client.get('/keywords/suggest', {
+                params: { q: query, limit },
+                timeout: 2000
+            });
+
+            return response.data;
+        } catch (error) {
+            if (error.code === 'ECONNREFUSED' || (error.response && error.response.status === 404)) {
+                return { query, prefix: [], related: [] };
+            }
+            throw new Error(`Failed to suggest keywords: ${error.message}`);
+        }
+    }
+
     // Mock data fallbacks for development
     getMockKeywords(seedKeyword) {
         const mockKeywords = [
@@ -1,10 +1,25 @@
-from flask import Flask, request, jsonify
+# Imported first so the startup timings cover everything below
+from services.startup import STARTUP, is_preforking, on_worker_boot, preload, prewarm, prewarm_enabled
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 import os
+import json
 import time
 from dotenv import load_dotenv
 from services.openai_service import OpenAIService
 from services.seo_scorer import SEOScorer
+from services.batch_scorer import BatchScorer
+from services.corpus_coverage import CorpusStore
+from services.article_pipeline import ArticlePipeline, long_form_error
+from services.job_queue import JobQueue, STATUSES, generation_handlers
+from services.json_codec import encode_response
+from services.metrics import REGISTRY, record_request, register_service_gauges
+from services.priority import reset_priority, set_priority
+from services.profiler import Profiler
+from services.seo_session import ScoringSession, SessionStore
+from services.upstream_scheduler import UpstreamError
+
+STARTUP.mark('imports')
 
 # Load environment variables
 load_dotenv()
@@ -15,16 +30,106 @@ CORS(app)
 # Initialize services
 openai_service = OpenAIService()
 seo_scorer = SEOScorer()
+batch_scorer = BatchScorer()
+article_pipeline = ArticlePipeline(openai_service, seo_scorer)
+job_queue = JobQueue.from_env(generation_handlers(openai_service, article_pipeline))
+if job_queue.workers:
+    on_worker_boot(job_queue.start)
+seo_sessions = SessionStore(
+    max_sessions=int(os.environ.get('SEO_SESSION_MAX', 1000)),
+    ttl_seconds=float(os.environ.get('SEO_SESSION_TTL', 1800))
+)
+corpora = CorpusStore.from_env()
+profiler = Profiler.from_env()
+register_service_gauges(REGISTRY, openai_service, job_queue)
+STARTUP.mark('services')
+
+# Under gunicorn.conf.py each worker opens its upstream connections before traffic arrives
+if prewarm_enabled():
+    on_worker_boot(lambda: prewarm(openai_service))
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.before_request
+def set_request_priority():
+    # Upstream calls made for this request queue under its priority class
+    g.priority_token = set_priority(*openai_service.scheduler.queue.policy.from_headers(request.headers))
+
+@app.teardown_request
+def reset_request_priority(exc):
+    token = g.pop('priority_token', None)
+    if token is not None:
+        reset_priority(token)
+
+@app.after_request
+def record_request_metrics(response):
+    # Route templates keep label cardinality bounded; streamed bodies are timed until closed
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    method = request.method
+    start = g.get('request_start', time.perf_counter())
+    response.call_on_close(
+        lambda: record_request(route, method, response.status_code, time.perf_counter() - start)
+    )
+    return response
+
+# Without PROFILE_ENABLED no profiling hook is registered, so requests pay nothing for it
+if profiler is not None:
+    @app.before_request
+    def start_profile():
+        if profiler.wants(request.headers):
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            g.profile = profiler.start(route, request.method)
+
+    @app.after_request
+    def finish_profile(response):
+        session = g.pop('profile', None)
+        if session is not None:
+            response.headers['X-Profile-Id'] = session.id
+            response.call_on_close(lambda: profiler.finish(session, response.status_code))
+        return response
+
+def use_cache(data) -> bool:
+    """Completion cache bypass: {"cache": false} in the body or Cache-Control: no-cache"""
+    if data.get('cache') is False:
+        return False
+    return 'no-cache' not in request.headers.get('Cache-Control', '')
+
+def is_v2() -> bool:
+    """/v2/ routes return generated JSON as nested data instead of a string inside the envelope"""
+    return request.path.startswith('/v2/')
+
+def json_response(payload):
+    """jsonify for v1; compact JSON (gzipped when accepted and large enough) for v2"""
+    if not is_v2():
+        return jsonify(payload)
+    body, headers = encode_response(payload, request.headers.get('Accept-Encoding', ''))
+    return Response(body, content_type='application/json', headers=headers)
+
+def upstream_error_response(error: UpstreamError):
+    """503 (with Retry-After when known) for exhausted retries, 502 for bad upstream output"""
+    retryable = error.retry_after is not None or error.status_code in (None, 408, 429, 500, 503, 504)
+    response = jsonify({'error': str(error), 'upstream_status': error.status_code})
+    if error.retry_after is not None:
+        response.headers['Retry-After'] = str(int(error.retry_after + 0.999))
+    return response, 503 if retryable else 502
 
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({
         'status': 'OK',
         'timestamp': time.time(),
-        'service': 'LLM Service'
+        'service': 'LLM Service',
+        'startup': STARTUP.snapshot()
     })
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), content_type=REGISTRY.CONTENT_TYPE)
+
 @app.route('/generate-keywords', methods=['POST'])
+@app.route('/v2/generate-keywords', methods=['POST'])
 def generate_keywords():
     try:
         data = request.get_json()
@@ -34,17 +139,71 @@ def generate_keywords():
             return jsonify({'error': 'seed_keyword is required'}), 400
         
         start_time = time.time()
-        keywords = openai_service.generate_keywords(seed_keyword)
+        keywords = openai_service.generate_keywords(
+            seed_keyword, use_cache=use_cache(data), native=is_v2()
+        )
         processing_time = time.time() - start_time
         
-        return jsonify({
+        return json_response({
             'keywords': keywords,
             'processing_time': processing_time
         })
+    except UpstreamError as e:
+        return upstream_error_response(e)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def keyword_index_unavailable():
+    """404 while the keyword index is disabled; None when it can be used"""
+    if openai_service.keyword_index is None:
+        return jsonify({'error': 'keyword index is disabled'}), 404
+    return None
+
+@app.route('/keywords/suggest', methods=['GET'])
+def suggest_keywords():
+    unavailable = keyword_index_unavailable()
+    if unavailable is not None:
+        return unavailable
+    query = request.args.get('q', '')
+    if not query.strip():
+        return jsonify({'error': 'q is required'}), 400
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    
+    # Served from the local index only; never waits on the model
+    start_time = time.perf_counter()
+    suggestions = openai_service.keyword_index.suggest(query, limit)
+    suggestions['processing_time'] = time.perf_counter() - start_time
+    return jsonify(suggestions)
+
+@app.route('/keywords/import', methods=['POST'])
+def import_keywords():
+    unavailable = keyword_index_unavailable()
+    if unavailable is not None:
+        return unavailable
+    try:
+        data = request.get_json()
+        lists = data.get('lists', [data] if 'keywords' in data else None)
+        if not isinstance(lists, list) or not lists:
+            return jsonify({'error': 'keywords or lists is required'}), 400
+        
+        try:
+            imported = openai_service.keyword_index.import_lists(lists)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({'imported': imported, 'lists': len(lists)})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/keywords/stats', methods=['GET'])
+def keyword_index_stats():
+    unavailable = keyword_index_unavailable()
+    if unavailable is not None:
+        return unavailable
+    return jsonify(openai_service.keyword_index.stats())
+
 @app.route('/generate-titles', methods=['POST'])
+@app.route('/v2/generate-titles', methods=['POST'])
 def generate_titles():
     try:
         data = request.get_json()
@@ -55,17 +214,22 @@ def generate_titles():
             return jsonify({'error': 'keyword is required'}), 400
         
         start_time = time.time()
-        titles = openai_service.generate_titles(keyword, tone)
+        titles = openai_service.generate_titles(
+            keyword, tone, use_cache=use_cache(data), native=is_v2()
+        )
         processing_time = time.time() - start_time
         
-        return jsonify({
+        return json_response({
             'titles': titles,
             'processing_time': processing_time
         })
+    except UpstreamError as e:
+        return upstream_error_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/generate-topics', methods=['POST'])
+@app.route('/v2/generate-topics', methods=['POST'])
 def generate_topics():
     try:
         data = request.get_json()
@@ -76,17 +240,22 @@ def generate_topics():
             return jsonify({'error': 'title and keyword are required'}), 400
         
         start_time = time.time()
-        topics = openai_service.generate_topics(title, keyword)
+        topics = openai_service.generate_topics(
+            title, keyword, use_cache=use_cache(data), native=is_v2()
+        )
         processing_time = time.time() - start_time
         
-        return jsonify({
+        return json_response({
             'topics': topics,
             'processing_time': processing_time
         })
+    except UpstreamError as e:
+        return upstream_error_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/generate-content', methods=['POST'])
+@app.route('/v2/generate-content', methods=['POST'])
 def generate_content():
     try:
         data = request.get_json()
@@ -101,17 +270,255 @@ def generate_content():
         
         start_time = time.time()
         content = openai_service.generate_content(
-            title, keyword, outline, content_type, word_count
+            title, keyword, outline, content_type, word_count, use_cache=use_cache(data)
         )
         processing_time = time.time() - start_time
         
-        return jsonify({
+        return json_response({
             'content': content,
             'processing_time': processing_time
         })
+    except UpstreamError as e:
+        return upstream_error_response(e)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/generate-content/long-form', methods=['POST'])
+@app.route('/v2/generate-content/long-form', methods=['POST'])
+def generate_long_form():
+    try:
+        data = request.get_json()
+        title = data.get('title')
+        keyword = data.get('keyword')
+        outline = data.get('outline')
+        intro = data.get('intro')
+        
+        if not title or not keyword:
+            return jsonify({'error': 'title and keyword are required'}), 400
+        
+        error = long_form_error(outline, intro)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        result = article_pipeline.write_long_form(
+            title, keyword, outline,
+            word_count=data.get('word_count', 1500),
+            intro=intro,
+            consistency_pass=data.get('consistency_pass', False),
+            analyze=data.get('analyze', False),
+            use_cache=use_cache(data)
+        )
+        
+        return json_response(result)
+    except UpstreamError as e:
+        return upstream_error_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    if openai_service.cache is None:
+        return jsonify({'enabled': False})
+    stats = openai_service.cache.stats()
+    if openai_service.similar is not None:
+        stats['similar'] = openai_service.similar.stats()
+    return jsonify({'enabled': True, **stats})
+
+@app.route('/generate-article', methods=['POST'])
+@app.route('/v2/generate-article', methods=['POST'])
+def generate_article():
+    try:
+        data = request.get_json()
+        seed_keyword = data.get('seed_keyword')
+        content_types = data.get('content_types', ['blog_intro'])
+        
+        if not seed_keyword:
+            return jsonify({'error': 'seed_keyword is required'}), 400
+        
+        if not isinstance(content_types, list) or not content_types or \
+                not all(isinstance(content_type, str) for content_type in content_types):
+            return jsonify({'error': 'content_types must be a non-empty list of strings'}), 400
+        
+        result = article_pipeline.run(
+            seed_keyword,
+            keyword=data.get('keyword'),
+            title=data.get('title'),
+            tone=data.get('tone', 'professional'),
+            content_types=content_types,
+            word_count=data.get('word_count', 150),
+            analyze=data.get('analyze', True),
+            use_cache=use_cache(data)
+        )
+        
+        return json_response(result)
+    except UpstreamError as e:
+        return upstream_error_response(e)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/generate-content/stream', methods=['POST'])
+def generate_content_stream():
+    try:
+        data = request.get_json()
+        title = data.get('title')
+        keyword = data.get('keyword')
+        outline = data.get('outline')
+        content_type = data.get('content_type', 'blog_intro')
+        word_count = data.get('word_count', 150)
+        
+        if not title or not keyword:
+            return jsonify({'error': 'title and keyword are required'}), 400
+        
+        start_time = time.time()
+        events = openai_service.generate_content_stream(
+            title, keyword, outline, content_type, word_count, use_cache=use_cache(data)
+        )
+        
+        def stream():
+            # token events as they arrive, then a single done (or error) event
+            try:
+                for event in events:
+                    if event['type'] == 'token':
+                        yield sse_event('token', {'content': event['content']})
+                    else:
+                        yield sse_event('done', {
+                            'processing_time': time.time() - start_time,
+                            'usage': event['usage']
+                        })
+            except Exception as e:
+                yield sse_event('error', {'error': str(e)})
+        
+        return Response(
+            stream_with_context(stream()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/upstream/stats', methods=['GET'])
+def upstream_stats():
+    stats = openai_service.scheduler.stats()
+    if openai_service.router is not None:
+        stats['router'] = openai_service.router.stats()
+    return jsonify(stats)
+
+def profiler_unavailable():
+    """404 while profiling is disabled, 403 without the PROFILE_TOKEN; None when allowed"""
+    if profiler is None:
+        return jsonify({'error': 'profiling is disabled'}), 404
+    if not profiler.authorized(request.headers):
+        return jsonify({'error': 'X-Profile-Token required'}), 403
+    return None
+
+@app.route('/admin/profiles', methods=['GET'])
+def list_profiles():
+    unavailable = profiler_unavailable()
+    if unavailable is not None:
+        return unavailable
+    limit = request.args.get('limit', 100, type=int)
+    return jsonify({'profiles': profiler.list(limit)})
+
+@app.route('/admin/profiles/<profile_id>', methods=['GET'])
+def download_profile(profile_id):
+    unavailable = profiler_unavailable()
+    if unavailable is not None:
+        return unavailable
+    path = profiler.path(profile_id)
+    if path is None:
+        return jsonify({'error': 'profile not found'}), 404
+    with open(path, encoding='utf-8') as f:
+        folded = f.read()
+    return Response(folded, content_type='text/plain; charset=utf-8',
+                    headers={'Content-Disposition': f'attachment; filename={profile_id}.folded'})
+
+@app.route('/jobs', methods=['POST'])
+def submit_jobs():
+    try:
+        data = request.get_json()
+        # Either a single {kind, payload, priority} or {jobs: [...], batch_id}
+        jobs = data.get('jobs', [data] if 'kind' in data else None)
+        
+        if not isinstance(jobs, list) or not jobs:
+            return jsonify({'error': 'kind and payload (or a non-empty jobs list) are required'}), 400
+        
+        max_jobs = int(os.environ.get('JOB_MAX_SUBMIT', 10000))
+        if len(jobs) > max_jobs:
+            return jsonify({'error': f'at most {max_jobs} jobs may be submitted at once'}), 400
+        
+        try:
+            submitted = job_queue.submit_many(jobs, data.get('batch_id'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({'batch_id': submitted[0]['batch_id'], 'jobs': submitted}), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    try:
+        status = request.args.get('status')
+        if status and status not in STATUSES:
+            return jsonify({'error': f"status must be one of: {', '.join(STATUSES)}"}), 400
+        
+        jobs = job_queue.list(
+            status=status,
+            batch_id=request.args.get('batch_id'),
+            after=request.args.get('after', 0, type=int),
+            limit=min(request.args.get('limit', 100, type=int), 1000)
+        )
+        
+        return jsonify({'jobs': jobs, 'next': jobs[-1]['seq'] if jobs else None})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/jobs/stats', methods=['GET'])
+def job_stats():
+    return jsonify(job_queue.stats())
+
+@app.route('/jobs/results', methods=['POST'])
+def job_results():
+    try:
+        data = request.get_json()
+        ids = data.get('ids')
+        batch_id = data.get('batch_id')
+        
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(job_id, str) for job_id in ids):
+                return jsonify({'error': 'ids must be a list of job ids'}), 400
+            if len(ids) > 1000:
+                return jsonify({'error': 'at most 1000 ids may be fetched at once'}), 400
+            return jsonify({'jobs': job_queue.results(ids)})
+        
+        if not batch_id:
+            return jsonify({'error': 'ids or batch_id is required'}), 400
+        
+        if data.get('status') and data['status'] not in STATUSES:
+            return jsonify({'error': f"status must be one of: {', '.join(STATUSES)}"}), 400
+        
+        # Page through a batch's finished jobs with the returned cursor
+        jobs = job_queue.list(
+            status=data.get('status'),
+            batch_id=batch_id,
+            after=int(data.get('after', 0)),
+            limit=min(int(data.get('limit', 100)), 1000),
+            include_result=True
+        )
+        return jsonify({'jobs': jobs, 'next': jobs[-1]['seq'] if jobs else None})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'job not found'}), 404
+    return jsonify(job)
+
 @app.route('/analyze-seo', methods=['POST'])
 def analyze_seo():
     try:
@@ -119,16 +526,222 @@ def analyze_seo():
         content = data.get('content')
         keyword = data.get('keyword')
         title = data.get('title')
+        secondary_keywords = data.get('secondary_keywords')
+        corpus_id = data.get('corpus_id')
         
         if not content or not keyword or not title:
             return jsonify({'error': 'content, keyword, and title are required'}), 400
         
-        analysis = seo_scorer.analyze_content(content, keyword, title)
+        corpus = None
+        if corpus_id is not None:
+            corpus = corpora.get(corpus_id)
+            if corpus is None:
+                return jsonify({'error': 'corpus not found or expired'}), 404
+        
+        if secondary_keywords is not None and (
+            not isinstance(secondary_keywords, list)
+            or not all(isinstance(kw, str) for kw in secondary_keywords)
+        ):
+            return jsonify({'error': 'secondary_keywords must be a list of strings'}), 400
+        
+        start_time = time.time()
+        analysis = seo_scorer.analyze_content(content, keyword, title, secondary_keywords, corpus)
+        analysis['processing_time'] = time.time() - start_time
+        
+        return jsonify(analysis)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/analyze-seo/stream', methods=['POST'])
+def analyze_seo_stream():
+    try:
+        keyword = request.args.get('keyword')
+        title = request.args.get('title')
+        
+        if not keyword or not title:
+            return jsonify({'error': 'keyword and title query parameters are required'}), 400
+        
+        max_bytes = int(os.environ.get('SEO_STREAM_MAX_BYTES', 64 * 1024 * 1024))
+        if request.content_length is not None and request.content_length > max_bytes:
+            return jsonify({'error': f'documents may be at most {max_bytes} bytes'}), 413
+        
+        # The body is plain text or Markdown, read in pieces (chunked uploads
+        # included) and analyzed as it arrives rather than buffered whole
+        def read_body():
+            received = 0
+            while True:
+                chunk = request.stream.read(64 * 1024)
+                if not chunk:
+                    return
+                received += len(chunk)
+                if received > max_bytes:
+                    raise OverflowError(f'documents may be at most {max_bytes} bytes')
+                yield chunk
+        
+        start_time = time.time()
+        try:
+            analysis = seo_scorer.analyze_stream(read_body(), keyword, title)
+        except OverflowError as e:
+            return jsonify({'error': str(e)}), 413
+        analysis['processing_time'] = time.time() - start_time
         
         return jsonify(analysis)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/analyze-seo/batch', methods=['POST'])
+def analyze_seo_batch():
+    try:
+        data = request.get_json()
+        items = data.get('items')
+        order = data.get('order', 'input')
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'items must be a non-empty list'}), 400
+        
+        max_items = int(os.environ.get('SEO_BATCH_MAX_ITEMS', 100000))
+        if len(items) > max_items:
+            return jsonify({'error': f'a batch may contain at most {max_items} items'}), 400
+        
+        if order not in BatchScorer.ORDERS:
+            return jsonify({'error': f"order must be one of: {', '.join(BatchScorer.ORDERS)}"}), 400
+        
+        # One JSON object per line, each tagged with its input index
+        results = batch_scorer.score_ndjson(items, order)
+        return Response(stream_with_context(results), mimetype='application/x-ndjson')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/corpora', methods=['POST'])
+def create_corpus():
+    try:
+        data = request.get_json()
+        keyword = data.get('keyword')
+        documents = data.get('documents')
+        
+        if not keyword:
+            return jsonify({'error': 'keyword is required'}), 400
+        
+        if not isinstance(documents, list) or not documents or \
+                not all(isinstance(document, str) for document in documents):
+            return jsonify({'error': 'documents must be a non-empty list of strings'}), 400
+        
+        try:
+            corpus_id, corpus, created = corpora.build(keyword, documents)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'corpus_id': corpus_id,
+            'keyword': keyword,
+            'documents': corpus.size,
+            'terms': len(corpus.terms),
+            'important_terms': corpus.important_terms()
+        }), 201 if created else 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/corpora/<corpus_id>/score', methods=['POST'])
+def score_against_corpus(corpus_id):
+    try:
+        data = request.get_json()
+        drafts = data.get('drafts')
+        
+        if not isinstance(drafts, list) or not drafts or not all(isinstance(draft, str) for draft in drafts):
+            return jsonify({'error': 'drafts must be a non-empty list of strings'}), 400
+        
+        corpus = corpora.get(corpus_id)
+        if corpus is None:
+            return jsonify({'error': 'corpus not found or expired'}), 404
+        
+        # Every draft is scored in the same batch of matrix operations
+        start_time = time.time()
+        results = corpus.score(drafts)
+        
+        return jsonify({'results': results, 'processing_time': time.time() - start_time})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/corpora/<corpus_id>', methods=['DELETE'])
+def delete_corpus(corpus_id):
+    if not corpora.delete(corpus_id):
+        return jsonify({'error': 'corpus not found or expired'}), 404
+    return jsonify({'deleted': corpus_id})
+
+@app.route('/seo-sessions', methods=['POST'])
+def create_seo_session():
+    try:
+        data = request.get_json()
+        content = data.get('content', '')
+        keyword = data.get('keyword')
+        title = data.get('title')
+        
+        if not keyword or not title or not isinstance(content, str):
+            return jsonify({'error': 'keyword and title are required'}), 400
+        
+        session = ScoringSession(content, keyword, title)
+        session_id = seo_sessions.create(session)
+        
+        return jsonify({
+            'session_id': session_id,
+            'version': session.version,
+            'analysis': seo_scorer.analyze_document(session.document, keyword, title)
+        }), 201
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/seo-sessions/<session_id>/edits', methods=['POST'])
+def edit_seo_session(session_id):
+    try:
+        data = request.get_json()
+        edits = data.get('edits', [])
+        
+        if not isinstance(edits, list):
+            return jsonify({'error': 'edits must be a list'}), 400
+        
+        session = seo_sessions.get(session_id)
+        if session is None:
+            return jsonify({'error': 'session not found or expired'}), 404
+        
+        with session.lock:
+            # Optional optimistic concurrency check against the client's copy
+            expected_version = data.get('version')
+            if expected_version is not None and expected_version != session.version:
+                return jsonify({
+                    'error': 'version mismatch, reopen the session',
+                    'version': session.version
+                }), 409
+            
+            try:
+                session.apply_edits(edits)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            if data.get('title'):
+                session.title = data['title']
+            
+            analysis = seo_scorer.analyze_document(session.document, session.keyword, session.title)
+            return jsonify({
+                'session_id': session_id,
+                'version': session.version,
+                'analysis': analysis
+            })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/seo-sessions/<session_id>', methods=['DELETE'])
+def delete_seo_session(session_id):
+    if not seo_sessions.delete(session_id):
+        return jsonify({'error': 'session not found or expired'}), 404
+    return jsonify({'deleted': session_id})
+
+STARTUP.mark('routes')
+
+# Under gunicorn.conf.py the master warms the scorer once for every forked worker
+if is_preforking():
+    preload(seo_scorer)
+STARTUP.set_ready()
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5001))
     debug = os.environ.get('FLASK_ENV') == 'development'
@@ -0,0 +1,906 @@
+"""Async serving mode for the LLM service.
+
+Same routes and payloads as app.py, served by an ASGI server:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5001
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+
+Upstream OpenAI calls are awaited on an AsyncOpenAI client instead of
+holding a worker thread each, and CPU-bound SEOScorer work runs in an
+executor so it never stalls the event loop.
+"""
+# Imported first so the startup timings cover everything below
+from services.startup import STARTUP, aprewarm, is_preforking, preload, prewarm_enabled
+
+import asyncio
+import contextlib
+import json
+import os
+import time
+
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.datastructures import Headers
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Match, Route
+
+from services import batch_scorer as batch_scoring
+from services.article_pipeline import ArticlePipeline, long_form_error
+from services.async_openai_service import AsyncOpenAIService
+from services.batch_scorer import BatchScorer
+from services.corpus_coverage import CorpusStore
+from services.job_queue import JobQueue, STATUSES, generation_handlers
+from services.json_codec import encode_response
+from services.metrics import REGISTRY, record_request, register_service_gauges
+from services.priority import priority_scope
+from services.profiler import CURRENT_PROFILE, Profiler
+from services.seo_scorer import SEOScorer
+from services.seo_session import ScoringSession, SessionStore
+from services.seo_stream import StreamingAnalyzer
+from services.upstream_scheduler import UpstreamError
+
+STARTUP.mark('imports')
+
+# Load environment variables
+load_dotenv()
+
+# Initialize services
+openai_service = AsyncOpenAIService()
+seo_scorer = SEOScorer()
+batch_scorer = BatchScorer()
+article_pipeline = ArticlePipeline(openai_service, seo_scorer)
+job_queue = JobQueue.from_env(generation_handlers(openai_service, article_pipeline))
+seo_sessions = SessionStore(
+    max_sessions=int(os.environ.get('SEO_SESSION_MAX', 1000)),
+    ttl_seconds=float(os.environ.get('SEO_SESSION_TTL', 1800))
+)
+corpora = CorpusStore.from_env()
+profiler = Profiler.from_env()
+register_service_gauges(REGISTRY, openai_service, job_queue)
+STARTUP.mark('services')
+
+
+def use_cache(request, data) -> bool:
+    if data.get('cache') is False:
+        return False
+    return 'no-cache' not in request.headers.get('cache-control', '')
+
+
+async def run_scorer(fn, *args):
+    """Run SEOScorer work off the event loop.
+
+    SEO_EXECUTOR=process (default) uses the batch process pool so scoring
+    also escapes the GIL; SEO_EXECUTOR=thread uses the default thread pool.
+    """
+    loop = asyncio.get_running_loop()
+    session = CURRENT_PROFILE.get()
+    if session is not None:
+        # A profiled request scores on a thread, where the sampler can follow it
+        return await loop.run_in_executor(None, profiler.follow(session, fn), *args)
+    if os.environ.get('SEO_EXECUTOR', 'process') == 'process':
+        # submit() replaces the pool after a worker died, so one crash fails one request
+        return await asyncio.wrap_future(batch_scorer.submit(fn, *args))
+    return await loop.run_in_executor(None, fn, *args)
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def is_v2(request) -> bool:
+    """/v2/ routes return generated JSON as nested data instead of a string inside the envelope"""
+    return request.url.path.startswith('/v2/')
+
+
+def json_response(request, payload):
+    """JSONResponse for v1; compact JSON (gzipped when accepted and large enough) for v2"""
+    if not is_v2(request):
+        return JSONResponse(payload)
+    body, headers = encode_response(payload, request.headers.get('accept-encoding', ''))
+    return Response(body, media_type='application/json', headers=headers)
+
+
+def upstream_error_response(error: UpstreamError):
+    """503 (with Retry-After when known) for exhausted retries, 502 for bad upstream output"""
+    retryable = error.retry_after is not None or error.status_code in (None, 408, 429, 500, 503, 504)
+    headers = {'Retry-After': str(int(error.retry_after + 0.999))} if error.retry_after is not None else None
+    return JSONResponse(
+        {'error': str(error), 'upstream_status': error.status_code},
+        status_code=503 if retryable else 502,
+        headers=headers
+    )
+
+
+class RequestMetricsMiddleware:
+    """Per-route latency histogram, timed until the last body chunk is sent"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            record_request(route_template(scope), scope['method'], status[0], time.perf_counter() - start)
+
+
+class PriorityMiddleware:
+    """Queue the request's upstream calls under its X-Priority / X-Client-Id class"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        policy = openai_service.scheduler.queue.policy
+        with priority_scope(*policy.from_headers(Headers(scope=scope))):
+            await self.app(scope, receive, send)
+
+
+class ProfilingMiddleware:
+    """Sample the request's task when it asks for (or is picked for) a profile"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not profiler.wants(Headers(scope=scope)):
+            return await self.app(scope, receive, send)
+
+        session = profiler.start(route_template(scope), scope['method'], asyncio.current_task())
+        status = [500]
+
+        async def send_with_profile_id(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+                message = {**message, 'headers': [*message.get('headers', []),
+                                                  (b'x-profile-id', session.id.encode())]}
+            await send(message)
+
+        token = CURRENT_PROFILE.set(session)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            CURRENT_PROFILE.reset(token)
+            profiler.stop(session)
+            await asyncio.get_running_loop().run_in_executor(None, profiler.finish, session, status[0])
+
+
+def route_template(scope) -> str:
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return 'unmatched'
+
+
+async def metrics(request):
+    return Response(REGISTRY.render(), media_type=REGISTRY.CONTENT_TYPE)
+
+
+async def health_check(request):
+    return JSONResponse({
+        'status': 'OK',
+        'timestamp': time.time(),
+        'service': 'LLM Service',
+        'startup': STARTUP.snapshot()
+    })
+
+
+async def generate_keywords(request):
+    try:
+        data = await request.json()
+        seed_keyword = data.get('seed_keyword')
+
+        if not seed_keyword:
+            return JSONResponse({'error': 'seed_keyword is required'}, status_code=400)
+
+        start_time = time.time()
+        keywords = await openai_service.generate_keywords(
+            seed_keyword, use_cache=use_cache(request, data), native=is_v2(request)
+        )
+        processing_time = time.time() - start_time
+
+        return json_response(request, {
+            'keywords': keywords,
+            'processing_time': processing_time
+        })
+    except UpstreamError as e:
+        return upstream_error_response(e)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+def keyword_index_unavailable():
+    """404 while the keyword index is disabled; None when it can be used"""
+    if openai_service.keyword_index is None:
+        return JSONResponse({'error': 'keyword index is disabled'}, status_code=404)
+    return None
+
+
+async def suggest_keywords(request):
+    unavailable = keyword_index_unavailable()
+    if unavailable is not None:
+        return unavailable
+    query = request.query_params.get('q', '')
+    if not query.strip():
+        return JSONResponse({'error': 'q is required'}, status_code=400)
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+
+    # Served from the local index only; a refresh may read the log, so on a thread
+    start_time = time.perf_counter()
+    suggestions = await asyncio.get_running_loop().run_in_executor(
+        None, openai_service.keyword_index.suggest, query, limit
+    )
+    suggestions['processing_time'] = time.perf_counter() - start_time
+    return JSONResponse(suggestions)
+
+
+async def import_keywords(request):
+    unavailable = keyword_index_unavailable()
+    if unavailable is not None:
+        return unavailable
+    try:
+        data = await request.json()
+        lists = data.get('lists', [data] if 'keywords' in data else None)
+        if not isinstance(lists, list) or not lists:
+            return JSONResponse({'error': 'keywords or lists is required'}, status_code=400)
+
+        try:
+            imported = await asyncio.get_running_loop().run_in_executor(
+                None, openai_service.keyword_index.import_lists, lists
+            )
+        except ValueError as e:
+            return JSONResponse({'error': str(e)}, status_code=400)
+
+        return JSONResponse({'imported': imported, 'lists': len(lists)})
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def keyword_index_stats(request):
+    unavailable = keyword_index_unavailable()
+    if unavailable is not None:
+        return unavailable
+    return JSONResponse(await asyncio.get_running_loop().run_in_executor(None, openai_service.keyword_index.stats))
+
+
+async def generate_titles(request):
+    try:
+        data = await request.json()
+        keyword = data.get('keyword')
+        tone = data.get('tone', 'professional')
+
+        if not keyword:
+            return JSONResponse({'error': 'keyword is required'}, status_code=400)
+
+        start_time = time.time()
+        titles = await openai_service.generate_titles(
+            keyword, tone, use_cache=use_cache(request, data), native=is_v2(request)
+        )
+        processing_time = time.time() - start_time
+
+        return json_response(request, {
+            'titles': titles,
+            'processing_time': processing_time
+        })
+    except UpstreamError as e:
+        return upstream_error_response(e)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def generate_topics(request):
+    try:
+        data = await request.json()
+        title = data.get('title')
+        keyword = data.get('keyword')
+
+        if not title or not keyword:
+            return JSONResponse({'error': 'title and keyword are required'}, status_code=400)
+
+        start_time = time.time()
+        topics = await openai_service.generate_topics(
+            title, keyword, use_cache=use_cache(request, data), native=is_v2(request)
+        )
+        processing_time = time.time() - start_time
+
+        return json_response(request, {
+            'topics': topics,
+            'processing_time': processing_time
+        })
+    except UpstreamError as e:
+        return upstream_error_response(e)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def generate_content(request):
+    try:
+        data = await request.json()
+        title = data.get('title')
+        keyword = data.get('keyword')
+        outline = data.get('outline')
+        content_type = data.get('content_type', 'blog_intro')
+        word_count = data.get('word_count', 150)
+
+        if not title or not keyword:
+            return JSONResponse({'error': 'title and keyword are required'}, status_code=400)
+
+        start_time = time.time()
+        content = await openai_service.generate_content(
+            title, keyword, outline, content_type, word_count, use_cache=use_cache(request, data)
+        )
+        processing_time = time.time() - start_time
+
+        return json_response(request, {
+            'content': content,
+            'processing_time': processing_time
+        })
+    except UpstreamError as e:
+        return upstream_error_response(e)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def generate_long_form(request):
+    try:
+        data = await request.json()
+        title = data.get('title')
+        keyword = data.get('keyword')
+        outline = data.get('outline')
+        intro = data.get('intro')
+
+        if not title or not keyword:
+            return JSONResponse({'error': 'title and keyword are required'}, status_code=400)
+
+        error = long_form_error(outline, intro)
+        if error:
+            return JSONResponse({'error': error}, status_code=400)
+
+        result = await article_pipeline.awrite_long_form(
+            title, keyword, outline,
+            word_count=data.get('word_count', 1500),
+            intro=intro,
+            consistency_pass=data.get('consistency_pass', False),
+            analyze=data.get('analyze', False),
+            use_cache=use_cache(request, data)
+        )
+
+        return json_response(request, result)
+    except UpstreamError as e:
+        return upstream_error_response(e)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def generate_article(request):
+    try:
+        data = await request.json()
+        seed_keyword = data.get('seed_keyword')
+        content_types = data.get('content_types', ['blog_intro'])
+
+        if not seed_keyword:
+            return JSONResponse({'error': 'seed_keyword is required'}, status_code=400)
+
+        if not isinstance(content_types, list) or not content_types or \
+                not all(isinstance(content_type, str) for content_type in content_types):
+            return JSONResponse({'error': 'content_types must be a non-empty list of strings'}, status_code=400)
+
+        result = await article_pipeline.arun(
+            seed_keyword,
+            keyword=data.get('keyword'),
+            title=data.get('title'),
+            tone=data.get('tone', 'professional'),
+            content_types=content_types,
+            word_count=data.get('word_count', 150),
+            analyze=data.get('analyze', True),
+            use_cache=use_cache(request, data)
+        )
+
+        return json_response(request, result)
+    except UpstreamError as e:
+        return upstream_error_response(e)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def generate_content_stream(request):
+    try:
+        data = await request.json()
+        title = data.get('title')
+        keyword = data.get('keyword')
+        outline = data.get('outline')
+        content_type = data.get('content_type', 'blog_intro')
+        word_count = data.get('word_count', 150)
+
+        if not title or not keyword:
+            return JSONResponse({'error': 'title and keyword are required'}, status_code=400)
+
+        start_time = time.time()
+        events = openai_service.generate_content_stream(
+            title, keyword, outline, content_type, word_count, use_cache=use_cache(request, data)
+        )
+
+        async def stream():
+            try:
+                async for event in events:
+                    if event['type'] == 'token':
+                        yield sse_event('token', {'content': event['content']})
+                    else:
+                        yield sse_event('done', {
+                            'processing_time': time.time() - start_time,
+                            'usage': event['usage']
+                        })
+            except Exception as e:
+                yield sse_event('error', {'error': str(e)})
+
+        return StreamingResponse(
+            stream(),
+            media_type='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def cache_stats(request):
+    if openai_service.cache is None:
+        return JSONResponse({'enabled': False})
+    stats = await asyncio.get_running_loop().run_in_executor(None, openai_service.cache.stats)
+    if openai_service.similar is not None:
+        stats['similar'] = openai_service.similar.stats()
+    return JSONResponse({'enabled': True, **stats})
+
+
+async def upstream_stats(request):
+    stats = openai_service.scheduler.stats()
+    if openai_service.router is not None:
+        stats['router'] = openai_service.router.stats()
+    return JSONResponse(stats)
+
+
+def profiler_unavailable(request):
+    """404 while profiling is disabled, 403 without the PROFILE_TOKEN; None when allowed"""
+    if profiler is None:
+        return JSONResponse({'error': 'profiling is disabled'}, status_code=404)
+    if not profiler.authorized(request.headers):
+        return JSONResponse({'error': 'X-Profile-Token required'}, status_code=403)
+    return None
+
+
+async def list_profiles(request):
+    unavailable = profiler_unavailable(request)
+    if unavailable is not None:
+        return unavailable
+    try:
+        limit = int(request.query_params.get('limit', 100))
+    except ValueError:
+        limit = 100
+    profiles = await asyncio.get_running_loop().run_in_executor(None, profiler.list, limit)
+    return JSONResponse({'profiles': profiles})
+
+
+async def download_profile(request):
+    unavailable = profiler_unavailable(request)
+    if unavailable is not None:
+        return unavailable
+    profile_id = request.path_params['profile_id']
+    path = profiler.path(profile_id)
+    if path is None:
+        return JSONResponse({'error': 'profile not found'}, status_code=404)
+    with open(path, encoding='utf-8') as f:
+        folded = f.read()
+    return Response(folded, media_type='text/plain; charset=utf-8',
+                    headers={'Content-Disposition': f'attachment; filename={profile_id}.folded'})
+
+
+async def submit_jobs(request):
+    try:
+        data = await request.json()
+        jobs = data.get('jobs', [data] if 'kind' in data else None)
+
+        if not isinstance(jobs, list) or not jobs:
+            return JSONResponse({'error': 'kind and payload (or a non-empty jobs list) are required'}, status_code=400)
+
+        max_jobs = int(os.environ.get('JOB_MAX_SUBMIT', 10000))
+        if len(jobs) > max_jobs:
+            return JSONResponse({'error': f'at most {max_jobs} jobs may be submitted at once'}, status_code=400)
+
+        try:
+            submitted = await asyncio.get_running_loop().run_in_executor(
+                None, job_queue.submit_many, jobs, data.get('batch_id')
+            )
+        except ValueError as e:
+            return JSONResponse({'error': str(e)}, status_code=400)
+
+        return JSONResponse({'batch_id': submitted[0]['batch_id'], 'jobs': submitted}, status_code=202)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def list_jobs(request):
+    try:
+        status = request.query_params.get('status')
+        if status and status not in STATUSES:
+            return JSONResponse({'error': f"status must be one of: {', '.join(STATUSES)}"}, status_code=400)
+
+        jobs = await asyncio.get_running_loop().run_in_executor(None, lambda: job_queue.list(
+            status=status,
+            batch_id=request.query_params.get('batch_id'),
+            after=int(request.query_params.get('after', 0)),
+            limit=min(int(request.query_params.get('limit', 100)), 1000)
+        ))
+
+        return JSONResponse({'jobs': jobs, 'next': jobs[-1]['seq'] if jobs else None})
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def job_stats(request):
+    return JSONResponse(await asyncio.get_running_loop().run_in_executor(None, job_queue.stats))
+
+
+async def job_results(request):
+    try:
+        data = await request.json()
+        ids = data.get('ids')
+        batch_id = data.get('batch_id')
+        loop = asyncio.get_running_loop()
+
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(job_id, str) for job_id in ids):
+                return JSONResponse({'error': 'ids must be a list of job ids'}, status_code=400)
+            if len(ids) > 1000:
+                return JSONResponse({'error': 'at most 1000 ids may be fetched at once'}, status_code=400)
+            return JSONResponse({'jobs': await loop.run_in_executor(None, job_queue.results, ids)})
+
+        if not batch_id:
+            return JSONResponse({'error': 'ids or batch_id is required'}, status_code=400)
+
+        if data.get('status') and data['status'] not in STATUSES:
+            return JSONResponse({'error': f"status must be one of: {', '.join(STATUSES)}"}, status_code=400)
+
+        jobs = await loop.run_in_executor(None, lambda: job_queue.list(
+            status=data.get('status'),
+            batch_id=batch_id,
+            after=int(data.get('after', 0)),
+            limit=min(int(data.get('limit', 100)), 1000),
+            include_result=True
+        ))
+        return JSONResponse({'jobs': jobs, 'next': jobs[-1]['seq'] if jobs else None})
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def get_job(request):
+    job = await asyncio.get_running_loop().run_in_executor(None, job_queue.get, request.path_params['job_id'])
+    if job is None:
+        return JSONResponse({'error': 'job not found'}, status_code=404)
+    return JSONResponse(job)
+
+
+async def analyze_seo(request):
+    try:
+        data = await request.json()
+        content = data.get('content')
+        keyword = data.get('keyword')
+        title = data.get('title')
+        secondary_keywords = data.get('secondary_keywords')
+        corpus_id = data.get('corpus_id')
+
+        if not content or not keyword or not title:
+            return JSONResponse({'error': 'content, keyword, and title are required'}, status_code=400)
+
+        if secondary_keywords is not None and (
+            not isinstance(secondary_keywords, list)
+            or not all(isinstance(kw, str) for kw in secondary_keywords)
+        ):
+            return JSONResponse({'error': 'secondary_keywords must be a list of strings'}, status_code=400)
+
+        corpus = None
+        if corpus_id is not None:
+            corpus = corpora.get(corpus_id)
+            if corpus is None:
+                return JSONResponse({'error': 'corpus not found or expired'}, status_code=404)
+
+        start_time = time.time()
+        analysis = await run_scorer(batch_scoring.analyze, content, keyword, title, secondary_keywords)
+        if corpus is not None:
+            # Corpora live in this process, so their scoring runs on a thread rather than the pool
+            coverage = await asyncio.get_running_loop().run_in_executor(None, corpus.score, [content])
+            seo_scorer.add_corpus_coverage(analysis, coverage[0])
+        analysis['processing_time'] = time.time() - start_time
+
+        return JSONResponse(analysis)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def analyze_seo_stream(request):
+    try:
+        keyword = request.query_params.get('keyword')
+        title = request.query_params.get('title')
+
+        if not keyword or not title:
+            return JSONResponse({'error': 'keyword and title query parameters are required'}, status_code=400)
+
+        max_bytes = int(os.environ.get('SEO_STREAM_MAX_BYTES', 64 * 1024 * 1024))
+        declared = request.headers.get('content-length')
+        if declared is not None and int(declared) > max_bytes:
+            return JSONResponse({'error': f'documents may be at most {max_bytes} bytes'}, status_code=413)
+
+        # Each received piece is folded in on a worker thread, so the loop
+        # never holds more than one piece plus the current paragraph
+        loop = asyncio.get_running_loop()
+        start_time = time.time()
+        analyzer = StreamingAnalyzer(keyword)
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_bytes:
+                return JSONResponse({'error': f'documents may be at most {max_bytes} bytes'}, status_code=413)
+            if chunk:
+                await loop.run_in_executor(None, analyzer.feed, chunk)
+
+        analysis = await loop.run_in_executor(None, seo_scorer.analyze_streamed, analyzer, keyword, title)
+        analysis['processing_time'] = time.time() - start_time
+
+        return JSONResponse(analysis)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def analyze_seo_batch(request):
+    try:
+        data = await request.json()
+        items = data.get('items')
+        order = data.get('order', 'input')
+
+        if not isinstance(items, list) or not items:
+            return JSONResponse({'error': 'items must be a non-empty list'}, status_code=400)
+
+        max_items = int(os.environ.get('SEO_BATCH_MAX_ITEMS', 100000))
+        if len(items) > max_items:
+            return JSONResponse({'error': f'a batch may contain at most {max_items} items'}, status_code=400)
+
+        if order not in BatchScorer.ORDERS:
+            return JSONResponse({'error': f"order must be one of: {', '.join(BatchScorer.ORDERS)}"}, status_code=400)
+
+        # Starlette drains the blocking iterator in its thread pool
+        return StreamingResponse(batch_scorer.score_ndjson(items, order), media_type='application/x-ndjson')
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def create_corpus(request):
+    try:
+        data = await request.json()
+        keyword = data.get('keyword')
+        documents = data.get('documents')
+
+        if not keyword:
+            return JSONResponse({'error': 'keyword is required'}, status_code=400)
+
+        if not isinstance(documents, list) or not documents or \
+                not all(isinstance(document, str) for document in documents):
+            return JSONResponse({'error': 'documents must be a non-empty list of strings'}, status_code=400)
+
+        try:
+            corpus_id, corpus, created = await asyncio.get_running_loop().run_in_executor(
+                None, corpora.build, keyword, documents
+            )
+        except ValueError as e:
+            return JSONResponse({'error': str(e)}, status_code=400)
+
+        return JSONResponse({
+            'corpus_id': corpus_id,
+            'keyword': keyword,
+            'documents': corpus.size,
+            'terms': len(corpus.terms),
+            'important_terms': corpus.important_terms()
+        }, status_code=201 if created else 200)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def score_against_corpus(request):
+    try:
+        data = await request.json()
+        drafts = data.get('drafts')
+
+        if not isinstance(drafts, list) or not drafts or not all(isinstance(draft, str) for draft in drafts):
+            return JSONResponse({'error': 'drafts must be a non-empty list of strings'}, status_code=400)
+
+        corpus = corpora.get(request.path_params['corpus_id'])
+        if corpus is None:
+            return JSONResponse({'error': 'corpus not found or expired'}, status_code=404)
+
+        # Every draft is scored in the same batch of matrix operations
+        start_time = time.time()
+        results = await asyncio.get_running_loop().run_in_executor(None, corpus.score, drafts)
+
+        return JSONResponse({'results': results, 'processing_time': time.time() - start_time})
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def delete_corpus(request):
+    corpus_id = request.path_params['corpus_id']
+    if not corpora.delete(corpus_id):
+        return JSONResponse({'error': 'corpus not found or expired'}, status_code=404)
+    return JSONResponse({'deleted': corpus_id})
+
+
+async def create_seo_session(request):
+    try:
+        data = await request.json()
+        content = data.get('content', '')
+        keyword = data.get('keyword')
+        title = data.get('title')
+
+        if not keyword or not title or not isinstance(content, str):
+            return JSONResponse({'error': 'keyword and title are required'}, status_code=400)
+
+        # Sessions live in this process, so tokenize and score on a thread rather than the pool
+        loop = asyncio.get_running_loop()
+        session = await loop.run_in_executor(None, ScoringSession, content, keyword, title)
+        session_id = seo_sessions.create(session)
+        analysis = await loop.run_in_executor(None, seo_scorer.analyze_document, session.document, keyword, title)
+
+        return JSONResponse({
+            'session_id': session_id,
+            'version': session.version,
+            'analysis': analysis
+        }, status_code=201)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def edit_seo_session(request):
+    try:
+        data = await request.json()
+        edits = data.get('edits', [])
+        session_id = request.path_params['session_id']
+
+        if not isinstance(edits, list):
+            return JSONResponse({'error': 'edits must be a list'}, status_code=400)
+
+        session = seo_sessions.get(session_id)
+        if session is None:
+            return JSONResponse({'error': 'session not found or expired'}, status_code=404)
+
+        # Edits only touch a few sentences, so they are cheap enough to run inline
+        with session.lock:
+            expected_version = data.get('version')
+            if expected_version is not None and expected_version != session.version:
+                return JSONResponse({
+                    'error': 'version mismatch, reopen the session',
+                    'version': session.version
+                }, status_code=409)
+
+            try:
+                session.apply_edits(edits)
+            except ValueError as e:
+                return JSONResponse({'error': str(e)}, status_code=400)
+
+            if data.get('title'):
+                session.title = data['title']
+
+            analysis = seo_scorer.analyze_document(session.document, session.keyword, session.title)
+            return JSONResponse({
+                'session_id': session_id,
+                'version': session.version,
+                'analysis': analysis
+            })
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def delete_seo_session(request):
+    session_id = request.path_params['session_id']
+    if not seo_sessions.delete(session_id):
+        return JSONResponse({'error': 'session not found or expired'}, status_code=404)
+    return JSONResponse({'deleted': session_id})
+
+
+routes = [
+    Route('/health', health_check, methods=['GET']),
+    Route('/metrics', metrics, methods=['GET']),
+    Route('/generate-keywords', generate_keywords, methods=['POST']),
+    Route('/v2/generate-keywords', generate_keywords, methods=['POST']),
+    Route('/keywords/suggest', suggest_keywords, methods=['GET']),
+    Route('/keywords/import', import_keywords, methods=['POST']),
+    Route('/keywords/stats', keyword_index_stats, methods=['GET']),
+    Route('/generate-titles', generate_titles, methods=['POST']),
+    Route('/v2/generate-titles', generate_titles, methods=['POST']),
+    Route('/generate-topics', generate_topics, methods=['POST']),
+    Route('/v2/generate-topics', generate_topics, methods=['POST']),
+    Route('/generate-content', generate_content, methods=['POST']),
+    Route('/v2/generate-content', generate_content, methods=['POST']),
+    Route('/generate-content/stream', generate_content_stream, methods=['POST']),
+    Route('/generate-content/long-form', generate_long_form, methods=['POST']),
+    Route('/v2/generate-content/long-form', generate_long_form, methods=['POST']),
+    Route('/generate-article', generate_article, methods=['POST']),
+    Route('/v2/generate-article', generate_article, methods=['POST']),
+    Route('/cache/stats', cache_stats, methods=['GET']),
+    Route('/upstream/stats', upstream_stats, methods=['GET']),
+    Route('/admin/profiles', list_profiles, methods=['GET']),
+    Route('/admin/profiles/{profile_id}', download_profile, methods=['GET']),
+    Route('/jobs', submit_jobs, methods=['POST']),
+    Route('/jobs', list_jobs, methods=['GET']),
+    Route('/jobs/stats', job_stats, methods=['GET']),
+    Route('/jobs/results', job_results, methods=['POST']),
+    Route('/jobs/{job_id}', get_job, methods=['GET']),
+    Route('/analyze-seo', analyze_seo, methods=['POST']),
+    Route('/analyze-seo/stream', analyze_seo_stream, methods=['POST']),
+    Route('/analyze-seo/batch', analyze_seo_batch, methods=['POST']),
+    Route('/corpora', create_corpus, methods=['POST']),
+    Route('/corpora/{corpus_id}/score', score_against_corpus, methods=['POST']),
+    Route('/corpora/{corpus_id}', delete_corpus, methods=['DELETE']),
+    Route('/seo-sessions', create_seo_session, methods=['POST']),
+    Route('/seo-sessions/{session_id}/edits', edit_seo_session, methods=['POST']),
+    Route('/seo-sessions/{session_id}', delete_seo_session, methods=['DELETE']),
+]
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Async job handlers run on this loop; the workers only wait on them
+    if job_queue.workers:
+        job_queue.start(asyncio.get_running_loop())
+    prewarm_task = None
+    if prewarm_enabled():
+        # Async clients' connections belong to this loop, so they are opened here
+        prewarm_task = asyncio.create_task(aprewarm(openai_service))
+    yield
+    if prewarm_task is not None:
+        prewarm_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await prewarm_task
+    job_queue.stop(timeout=5)
+    batch_scorer.shutdown()
+
+
+app = Starlette(
+    routes=routes,
+    middleware=[
+        Middleware(RequestMetricsMiddleware),
+        # Without PROFILE_ENABLED the profiling middleware is left out entirely
+        *([Middleware(ProfilingMiddleware)] if profiler is not None else []),
+        Middleware(PriorityMiddleware),
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])
+    ],
+    lifespan=lifespan
+)
+
+STARTUP.mark('routes')
+
+# Under gunicorn.conf.py the master warms the scorer once for every forked worker
+if is_preforking():
+    preload(seo_scorer)
+STARTUP.set_ready()
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = int(os.environ.get('PORT', 5001))
+    print(f"LLM Service (async) starting on port {port}")
+    uvicorn.run(app, host='0.0.0.0', port=port)
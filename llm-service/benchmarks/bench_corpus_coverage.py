@@ -0,0 +1,68 @@
+"""Compare batched matrix scoring with per-draft scoring against a corpus.
+
+A corpus of reference pages is indexed once, then thousands of drafts
+are scored against it in one CorpusIndex.score() call (sparse matrix
+products when NumPy/SciPy are installed) and, for a sample, one at a
+time through the pure-Python path. Both paths must agree. Run from the
+llm-service directory:
+
+    python -m benchmarks.bench_corpus_coverage
+"""
+import random
+import time
+
+from services import corpus_coverage
+from services.corpus_coverage import CorpusIndex, extract_terms
+
+KEYWORD = 'crm software'
+REFERENCES = 200
+DRAFTS = 2000
+PYTHON_SAMPLE = 100
+WORDS_PER_PAGE = 1200
+
+VOCABULARY = (
+    'crm software sales pipeline lead scoring contact management email automation integration '
+    'dashboard reporting forecast deal stage customer support ticket workflow mobile app pricing '
+    'plan team collaboration onboarding migration data import export api webhook permission role '
+    'territory quota commission marketing campaign segment audience analytics churn retention '
+    'renewal upsell invoice quote proposal calendar meeting task reminder notification template'
+).split()
+
+
+def make_page(rng: random.Random) -> str:
+    # A skewed draw, so some terms are common across pages and most are not
+    words = [VOCABULARY[min(int(rng.expovariate(0.08)), len(VOCABULARY) - 1)] for _ in range(WORDS_PER_PAGE)]
+    return ' '.join(' '.join(words[start:start + 15]) + '.' for start in range(0, len(words), 15))
+
+
+def main():
+    rng = random.Random(7)
+    references = [make_page(rng) for _ in range(REFERENCES)]
+    drafts = [make_page(rng) for _ in range(DRAFTS)]
+
+    start = time.perf_counter()
+    index = CorpusIndex(KEYWORD, references)
+    build = time.perf_counter() - start
+    print(f"indexed {REFERENCES} pages, {len(index.terms)} terms in {build:.2f}s")
+
+    if corpus_coverage.np is None:
+        print('numpy is not installed: score() uses the pure-Python path (pip install numpy scipy)')
+    backend = 'scipy sparse' if corpus_coverage.sparse is not None else 'numpy dense'
+
+    start = time.perf_counter()
+    batched = index.score(drafts)
+    elapsed = time.perf_counter() - start
+    print(f"{'batched (' + backend + ')':<28} {DRAFTS:>5} drafts {elapsed:>7.2f}s "
+          f"{elapsed / DRAFTS * 1000:>7.3f} ms/draft")
+
+    start = time.perf_counter()
+    one_by_one = [index._score_row(index._row(extract_terms(draft))) for draft in drafts[:PYTHON_SAMPLE]]
+    elapsed = time.perf_counter() - start
+    print(f"{'per draft (pure Python)':<28} {PYTHON_SAMPLE:>5} drafts {elapsed:>7.2f}s "
+          f"{elapsed / PYTHON_SAMPLE * 1000:>7.3f} ms/draft")
+
+    assert batched[:PYTHON_SAMPLE] == one_by_one, 'batched and per-draft scores differ'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""Throughput and latency percentiles for every route of the Flask app.
+
+Requests go through the Flask test client from a pool of threads, with
+the OpenAI client replaced by benchmarks.fakes so nothing leaves the
+process. The completion cache is off so every generation call reaches
+the (fake) upstream. Run from the llm-service directory:
+
+    python -m benchmarks.bench_endpoints [--upstream-latency 0.05]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.bench_seo_document import KEYWORD, make_content
+from benchmarks.stats import summarize
+
+OUTLINE = {
+    'title': 'Overview',
+    'sections': [{'heading': 'Getting started', 'points': ['Basics', 'First steps']}]
+}
+
+
+def load_app(upstream_latency: float):
+    """Import app.py with settings that keep the benchmark self-contained"""
+    os.environ['LLM_CACHE_ENABLED'] = 'false'
+    # Warm seeds would be answered from the keyword index instead of the fake upstream
+    os.environ['KEYWORD_INDEX_ENABLED'] = 'false'
+    os.environ['JOB_QUEUE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='llm-bench-'), 'jobs.sqlite3')
+    # Jobs are only queued, so job routes measure the API and not generation
+    os.environ['JOB_WORKERS'] = '0'
+    os.environ.setdefault('MOCK_STREAM_DELAY', '0')
+
+    import app as flask_app
+    from benchmarks.fakes import FakeOpenAIClient
+
+    flask_app.openai_service.client = FakeOpenAIClient(latency=upstream_latency)
+    return flask_app
+
+
+def route_specs(flask_app) -> Dict[str, Callable]:
+    """name -> fn(client) performing one request and returning its status"""
+    content = make_content(600)
+    seo_body = {'content': content, 'keyword': KEYWORD, 'title': 'Digital Marketing Guide'}
+
+    setup = flask_app.app.test_client()
+    session_id = setup.post('/seo-sessions', json=seo_body).get_json()['session_id']
+    job_id = setup.post('/jobs', json={'kind': 'keywords', 'payload': {'seed_keyword': 'crm'}}) \
+        .get_json()['jobs'][0]['id']
+
+    def post(path: str, body: Dict) -> Callable:
+        return lambda client: client.post(path, json=body)
+
+    def get(path: str) -> Callable:
+        return lambda client: client.get(path)
+
+    def consume(path: str, body: Dict) -> Callable:
+        # Streamed routes are timed until the last byte arrives
+        def call(client):
+            response = client.post(path, json=body, buffered=True)
+            response.get_data()
+            return response
+        return call
+
+    def edit_session(client):
+        return client.post(f'/seo-sessions/{session_id}/edits', json={
+            'edits': [{'start': 0, 'end': 0, 'text': 'Fresh intro. '}]
+        })
+
+    def session_lifecycle(client):
+        created = client.post('/seo-sessions', json=seo_body)
+        return client.delete(f"/seo-sessions/{created.get_json()['session_id']}")
+
+    return {
+        'GET /health': get('/health'),
+        'GET /metrics': get('/metrics'),
+        'GET /cache/stats': get('/cache/stats'),
+        'GET /upstream/stats': get('/upstream/stats'),
+        'POST /generate-keywords': post('/generate-keywords', {'seed_keyword': 'crm software'}),
+        'POST /generate-titles': post('/generate-titles', {'keyword': 'crm software'}),
+        'POST /generate-topics': post('/generate-topics', {'title': 'CRM Guide', 'keyword': 'crm software'}),
+        'POST /generate-content': post('/generate-content', {
+            'title': 'CRM Guide', 'keyword': 'crm software', 'outline': OUTLINE
+        }),
+        'POST /generate-content/stream': consume('/generate-content/stream', {
+            'title': 'CRM Guide', 'keyword': 'crm software', 'outline': OUTLINE
+        }),
+        'POST /generate-article': post('/generate-article', {
+            'seed_keyword': 'crm software', 'content_types': ['blog_intro', 'meta_description']
+        }),
+        'POST /analyze-seo': post('/analyze-seo', seo_body),
+        'POST /analyze-seo/batch': consume('/analyze-seo/batch', {'items': [seo_body] * 20}),
+        'POST /seo-sessions + DELETE': session_lifecycle,
+        'POST /seo-sessions/<id>/edits': edit_session,
+        'POST /jobs': post('/jobs', {'kind': 'keywords', 'payload': {'seed_keyword': 'crm'}}),
+        'GET /jobs/<id>': get(f'/jobs/{job_id}'),
+        'GET /jobs': get('/jobs?limit=50'),
+        'POST /jobs/results': post('/jobs/results', {'ids': [job_id]}),
+        'GET /jobs/stats': get('/jobs/stats'),
+    }
+
+
+def drive(flask_app, call: Callable, requests: int, concurrency: int) -> Dict:
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    remaining = [requests]
+
+    def worker():
+        client = flask_app.app.test_client()
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            start = time.perf_counter()
+            response = call(client)
+            elapsed = time.perf_counter() - start
+            with lock:
+                if response.status_code >= 400:
+                    errors[0] += 1
+                else:
+                    latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, time.perf_counter() - start, errors[0])
+
+
+def run(requests: int = 200, concurrency: int = 8, upstream_latency: float = 0.0,
+        routes: Optional[List[str]] = None) -> Dict:
+    flask_app = load_app(upstream_latency)
+    specs = route_specs(flask_app)
+    results = {}
+    try:
+        for name, call in specs.items():
+            if routes and name not in routes:
+                continue
+            drive(flask_app, call, min(requests, 10), 1)  # warm-up
+            results[name] = drive(flask_app, call, requests, concurrency)
+    finally:
+        flask_app.batch_scorer.shutdown()
+    return results
+
+
+def print_results(results: Dict):
+    width = max(len(name) for name in results)
+    print(f"{'route':<{width}} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, result in results.items():
+        print(f"{name:<{width}} {result['throughput_rps']:>9.1f} {result['p50_ms']:>9.2f} "
+              f"{result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['errors']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200, help='requests per route')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--upstream-latency', type=float, default=0.0, help='fake OpenAI latency in seconds')
+    args = parser.parse_args()
+    print_results(run(args.requests, args.concurrency, args.upstream_latency))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Compare the v1 and v2 encodings of a large topic outline response.
+
+v1 parses the model output, dumps it to a string and wraps that string in
+the response envelope, so the client has to parse twice. v2 validates the
+parsed outline and encodes it once, gzipped when the client accepts it.
+Run from the llm-service directory:
+
+    python -m benchmarks.bench_json_encoding
+"""
+import gzip
+import json
+import timeit
+
+from services import json_codec
+from services.schemas import TOPICS_SCHEMA, validate
+
+OUTLINES = 40
+SECTIONS = 8
+
+
+def make_model_output() -> str:
+    outlines = [
+        {
+            'title': f'Outline {n}: a "complete" guide',
+            'sections': [
+                {'heading': f'Section {s}', 'points': [f'Point {p} about café CRM tools' for p in range(5)]}
+                for s in range(SECTIONS)
+            ]
+        }
+        for n in range(OUTLINES)
+    ]
+    return json.dumps(outlines, indent=2)
+
+
+def v1(content: str) -> bytes:
+    topics = json.dumps(json.loads(content))
+    return json.dumps({'topics': topics, 'processing_time': 0.1}).encode('utf-8')
+
+
+def v1_client(body: bytes):
+    return json.loads(json.loads(body)['topics'])
+
+
+def v2(content: str, accept_encoding: str = '') -> bytes:
+    topics = validate(json_codec.loads(content), TOPICS_SCHEMA)
+    body, _ = json_codec.encode_response({'topics': topics, 'processing_time': 0.1}, accept_encoding)
+    return body
+
+
+def v2_client(body: bytes):
+    return json.loads(body)['topics']
+
+
+def best_us(fn, *args, number: int = 200) -> float:
+    return min(timeit.repeat(lambda: fn(*args), number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    content = make_model_output()
+    v1_body, v2_body, gzip_body = v1(content), v2(content), v2(content, 'gzip')
+    assert v1_client(v1_body) == v2_client(v2_body) == v2_client(gzip.decompress(gzip_body))
+
+    print(f"encoder: {'orjson' if json_codec.orjson is not None else 'json (stdlib)'}")
+    print(f"{'format':<10} {'bytes':>9} {'server us':>11} {'client us':>11}")
+    print(f"{'v1':<10} {len(v1_body):>9} {best_us(v1, content):>11.1f} {best_us(v1_client, v1_body):>11.1f}")
+    print(f"{'v2':<10} {len(v2_body):>9} {best_us(v2, content):>11.1f} {best_us(v2_client, v2_body):>11.1f}")
+    print(f"{'v2 gzip':<10} {len(gzip_body):>9} {best_us(v2, content, 'gzip'):>11.1f} "
+          f"{best_us(lambda body: v2_client(gzip.decompress(body)), gzip_body):>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
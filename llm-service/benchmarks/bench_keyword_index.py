@@ -0,0 +1,111 @@
+"""Keyword index: build time, lookup latency, and warm versus cold seeds.
+
+Imports a synthetic keyword research export (TERMS keywords in lists of
+ten, one list per seed) and compacts it into a memory-mapped segment.
+Then it times autocomplete lookups for random prefixes of indexed
+keywords, expansions of warm seeds, and a fold-back of freshly generated
+keywords. Last, OpenAIService.generate_keywords is run against a fake
+upstream, once for a cold seed and then for the same seed warm. Run from
+the llm-service directory:
+
+    python -m benchmarks.bench_keyword_index
+"""
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.fakes import FakeOpenAIClient
+from services.keyword_index import KeywordIndex
+
+TERMS = 200000
+LOOKUPS = 2000
+UPSTREAM_LATENCY = 0.5
+WORDS = ('crm email seo content marketing sales software tools small business team pipeline lead '
+         'automation pricing free best guide template strategy analytics report social media ads '
+         'budget agency startup ecommerce local b2b saas onboarding retention churn').split()
+MODIFIERS = 'for with vs without in'.split()
+
+
+def keyword_lists(rng: random.Random):
+    seen = set()
+    while len(seen) < TERMS:
+        seed = ' '.join(rng.sample(WORDS, rng.randint(1, 3)))
+        keywords = []
+        for _ in range(10):
+            keyword = f"{seed} {rng.choice(MODIFIERS)} {' '.join(rng.sample(WORDS, rng.randint(1, 2)))}"
+            if keyword not in seen:
+                seen.add(keyword)
+                keywords.append({'keyword': keyword, 'volume': rng.randint(10, 50000)})
+        yield {'seed': seed, 'keywords': keywords}
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return (statistics.median(samples) * 1e6, samples[int(len(samples) * 0.99)] * 1e6)
+
+
+def timed(fn, arguments):
+    samples = []
+    for argument in arguments:
+        start = time.perf_counter()
+        fn(argument)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def main():
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as directory:
+        index = KeywordIndex(directory, compact_bytes=1 << 40)
+        lists = list(keyword_lists(rng))
+
+        start = time.perf_counter()
+        index.import_lists(lists)
+        imported = time.perf_counter() - start
+        start = time.perf_counter()
+        index.compact()
+        compacted = time.perf_counter() - start
+        stats = index.stats()
+        size = os.path.getsize(index.segment_path)
+        print(f"{stats['terms']:,} terms, {stats['edges']:,} co-occurrence edges, {size / 1e6:.1f} MB segment")
+        print(f"import {imported:.2f} s, compaction {compacted:.2f} s\n")
+
+        terms = [keyword['keyword'] for item in lists for keyword in item['keywords']]
+        prefixes = []
+        for term in rng.sample(terms, LOOKUPS):
+            prefixes.append(term[:rng.randint(1, len(term))])
+        seeds = [item['seed'] for item in rng.sample(lists, LOOKUPS)]
+
+        print(f"{'microseconds':<34} {'p50':>8} {'p99':>8}")
+        for label, fn, arguments in (
+            ('suggest (prefix + related)', index.suggest, prefixes),
+            ('expansions of a warm seed', lambda seed: index.expansions(seed, 5), seeds),
+        ):
+            p50, p99 = timed(fn, arguments)
+            print(f"{label:<34} {p50:>8.1f} {p99:>8.1f}")
+
+        # Fold-backs land in the log and the in-memory delta; lookups then merge both
+        new_lists = [(f'new seed {n}', [f'new seed {n} keyword {k}' for k in range(5)]) for n in range(200)]
+        p50, p99 = timed(lambda item: index.add(*item), new_lists)
+        print(f"{'fold back 5 generated keywords':<34} {p50:>8.1f} {p99:>8.1f}")
+        p50, p99 = timed(index.suggest, prefixes)
+        print(f"{'suggest, with recent fold-backs':<34} {p50:>8.1f} {p99:>8.1f}")
+
+        os.environ['KEYWORD_INDEX_DIR'] = os.path.join(directory, 'service')
+        from services.openai_service import OpenAIService
+
+        service = OpenAIService()
+        service.client = FakeOpenAIClient(latency=UPSTREAM_LATENCY)
+        service.cache = None
+        service.similar = None
+        print(f"\ngenerate_keywords, upstream latency {UPSTREAM_LATENCY * 1000:.0f} ms")
+        for label in ('cold seed', 'same seed, warm'):
+            start = time.perf_counter()
+            service.generate_keywords('marketing automation for startups', native=True)
+            print(f"  {label:<32} {(time.perf_counter() - start) * 1000:>9.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Compare one long completion with section-by-section long-form generation.
+
+The fake client's latency grows with max_tokens, like a real completion,
+so a 2,000-word article written in one request waits for the whole
+article while the long-form mode waits for the introduction, the slowest
+section and the consistency pass. Run from the llm-service directory:
+
+    python -m benchmarks.bench_long_form
+"""
+import time
+
+from benchmarks.fakes import FakeOpenAIClient
+from services.article_pipeline import ArticlePipeline
+from services.openai_service import OpenAIService
+from services.seo_scorer import SEOScorer
+
+WORD_COUNT = 2000
+SECTIONS = 8
+BASE_LATENCY = 0.2
+TOKEN_LATENCY = 0.0005  # 2 s for a 4,000-token completion
+
+OUTLINE = {
+    'title': 'Long guide',
+    'sections': [
+        {'heading': f'Part {n}', 'points': ['first point', 'second point', 'third point']}
+        for n in range(1, SECTIONS + 1)
+    ]
+}
+
+
+def make_service() -> OpenAIService:
+    service = OpenAIService()
+    service.client = FakeOpenAIClient(latency=BASE_LATENCY, token_latency=TOKEN_LATENCY)
+    service.cache = None
+    service.similar = None
+    return service
+
+
+def main():
+    service = make_service()
+    start = time.perf_counter()
+    service.generate_content('Long guide', 'crm tools', OUTLINE, 'blog_post', WORD_COUNT)
+    single = time.perf_counter() - start
+
+    pipeline = ArticlePipeline(make_service(), SEOScorer())
+    results = {}
+    for consistency_pass in (False, True):
+        start = time.perf_counter()
+        article = pipeline.write_long_form('Long guide', 'crm tools', OUTLINE, WORD_COUNT,
+                                           consistency_pass=consistency_pass)
+        results[consistency_pass] = time.perf_counter() - start
+        assert article['consistency_pass'] == consistency_pass
+        assert [section['heading'] for section in article['sections']] == \
+            [section['heading'] for section in OUTLINE['sections']]
+
+    print(f"{WORD_COUNT} words, {SECTIONS} sections")
+    print(f"{'single completion':<32} {single:>6.2f}s")
+    print(f"{'long-form':<32} {results[False]:>6.2f}s")
+    print(f"{'long-form + consistency pass':<32} {results[True]:>6.2f}s")
+    pipeline.executor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
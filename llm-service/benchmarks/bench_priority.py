@@ -0,0 +1,102 @@
+"""Interactive latency while bulk generation saturates the upstream slots.
+
+Editors call generate_titles (short completions) while a bulk run keeps
+every concurrency slot busy with long generate_content calls. Run three
+ways: no bulk load, bulk load queued in the same class as the editors
+(first come, first served, as before priority classes), and bulk load
+queued as batch. With classes, interactive p95 should stay close to the
+idle figure. Run from the llm-service directory:
+
+    python -m benchmarks.bench_priority
+"""
+import os
+import statistics
+import threading
+import time
+
+from benchmarks.fakes import FakeOpenAIClient
+from services.priority import priority_scope
+
+SLOTS = 8
+BULK_THREADS = 32
+INTERACTIVE_THREADS = 2
+INTERACTIVE_CALLS = 40
+BASE_LATENCY = 0.05
+TOKEN_LATENCY = 0.0002  # 0.06 s for titles, 0.45 s for a 1,000-word section
+
+
+def make_service():
+    os.environ.update({
+        'LLM_CONCURRENCY_INITIAL': str(SLOTS),
+        'LLM_CONCURRENCY_MIN': str(SLOTS),
+        'LLM_CONCURRENCY_MAX': str(SLOTS),
+        'LLM_LATENCY_TARGET': '60',
+    })
+    from services.openai_service import OpenAIService
+
+    service = OpenAIService()
+    service.client = FakeOpenAIClient(latency=BASE_LATENCY, token_latency=TOKEN_LATENCY)
+    service.cache = None
+    service.similar = None
+    return service
+
+
+def run(label: str, bulk_class):
+    service = make_service()
+    stop = threading.Event()
+    bulk_done = []
+
+    def bulk(worker: int):
+        with priority_scope(bulk_class):
+            n = 0
+            while not stop.is_set():
+                service.generate_content(f'Bulk {worker}-{n}', 'crm tools', None, 'blog_post', 1000,
+                                         use_cache=False)
+                bulk_done.append(1)
+                n += 1
+
+    latencies = []
+
+    def interactive(worker: int):
+        with priority_scope('interactive'):
+            for n in range(INTERACTIVE_CALLS):
+                start = time.perf_counter()
+                service.generate_titles(f'editor keyword {worker}-{n}', use_cache=False)
+                latencies.append(time.perf_counter() - start)
+
+    bulk_threads = [threading.Thread(target=bulk, args=(n,)) for n in range(BULK_THREADS if bulk_class else 0)]
+    for thread in bulk_threads:
+        thread.start()
+    time.sleep(0.5)  # let the bulk run fill every slot
+
+    start = time.perf_counter()
+    editors = [threading.Thread(target=interactive, args=(n,)) for n in range(INTERACTIVE_THREADS)]
+    for thread in editors:
+        thread.start()
+    for thread in editors:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for thread in bulk_threads:
+        thread.join()
+
+    latencies.sort()
+    waits = service.scheduler.stats()['priorities']
+    print(f"{label:<30} interactive p50 {statistics.median(latencies) * 1000:>5.0f} ms  "
+          f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:>5.0f} ms  "
+          f"bulk {len(bulk_done) / elapsed:>5.1f} calls/s  "
+          f"queue wait p95: " + ', '.join(
+              f"{name} {stats['wait_p95'] * 1000:.0f} ms"
+              for name, stats in waits.items() if stats['wait_p95'] is not None
+          ))
+
+
+def main():
+    print(f"{SLOTS} upstream slots, {BULK_THREADS} bulk workers, {INTERACTIVE_THREADS} editors")
+    run('no bulk load', None)
+    run('bulk load, same class', 'interactive')
+    run('bulk load, batch class', 'batch')
+
+
+if __name__ == '__main__':
+    main()
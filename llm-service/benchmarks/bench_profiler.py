@@ -0,0 +1,89 @@
+"""Overhead of the per-request sampling profiler on SEO analysis.
+
+Times SEOScorer.analyze_content on a long draft three ways: plain (what
+every request pays with PROFILE_ENABLED unset, since no hook is
+installed), enabled but not picked (the wants() header check), and
+profiled at the default 5 ms interval, including writing the profile.
+Also prints the hottest frames of one profile, as a flamegraph would show
+them. Run from the llm-service directory:
+
+    python -m benchmarks.bench_profiler
+"""
+import random
+import statistics
+import tempfile
+import time
+
+from services.profiler import Profiler
+from services.seo_scorer import SEOScorer
+
+RUNS = 20
+WORDS = 40000
+VOCABULARY = ('crm tools help small sales teams track every customer conversation pipeline '
+              'report forecast email lead contact automation pricing integration').split()
+
+
+def draft(seed: int) -> str:
+    rng = random.Random(seed)
+    paragraphs = []
+    for _ in range(WORDS // 120):
+        sentences = [' '.join(rng.choice(VOCABULARY) for _ in range(rng.randint(8, 20))).capitalize() + '.'
+                     for _ in range(8)]
+        paragraphs.append(' '.join(sentences))
+    return '# CRM tools for small teams\n\n' + '\n\n'.join(paragraphs)
+
+
+def timed(fn) -> float:
+    """Median milliseconds over RUNS calls"""
+    samples = []
+    for n in range(RUNS):
+        start = time.perf_counter()
+        fn(n)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    scorer = SEOScorer()
+    drafts = [draft(n) for n in range(RUNS)]
+    headers = {'Content-Type': 'application/json'}
+
+    def analyze(n: int):
+        scorer.analyze_content(drafts[n], 'crm tools', 'CRM tools for small teams', ['sales pipeline'])
+
+    with tempfile.TemporaryDirectory() as directory:
+        profiler = Profiler(directory, max_profiles=RUNS)
+        analyze(0)  # build regexes and caches before timing
+
+        def checked(n: int):
+            if profiler.wants(headers):
+                raise AssertionError('a request without X-Profile was picked')
+            analyze(n)
+
+        def profiled(n: int):
+            session = profiler.start('/analyze-seo', 'POST')
+            analyze(n)
+            profiler.finish(session, 200)
+
+        plain = timed(analyze)
+        check = timed(checked)
+        sampled = timed(profiled)
+        print(f"{WORDS}-word draft, median of {RUNS}, milliseconds")
+        print(f"{'profiling disabled':<28} {plain:>8.2f}")
+        print(f"{'enabled, not picked':<28} {check:>8.2f}  ({(check / plain - 1) * 100:+.1f}%)")
+        print(f"{'profiled every 5 ms':<28} {sampled:>8.2f}  ({(sampled / plain - 1) * 100:+.1f}%)")
+
+        latest = profiler.list(1)[0]
+        with open(profiler.path(latest['id']), encoding='utf-8') as f:
+            stacks = [line.rsplit(' ', 1) for line in f.read().splitlines()]
+        leaves = {}
+        for stack, count in stacks:
+            leaf = stack.rsplit(';', 1)[-1]
+            leaves[leaf] = leaves.get(leaf, 0) + int(count)
+        print(f"\nprofile {latest['id']}: {latest['samples']} samples; hottest leaf frames:")
+        for leaf, count in sorted(leaves.items(), key=lambda item: -item[1])[:5]:
+            print(f"  {count:>4}  {leaf}")
+
+
+if __name__ == '__main__':
+    main()
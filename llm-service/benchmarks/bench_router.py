@@ -0,0 +1,73 @@
+"""Drive the upstream router against several local fake servers.
+
+Three fake OpenAI servers run in-process: a fast one, a slow one and one
+that fails every request for the first phase and then recovers. The
+router should send most traffic to the fast target, eject the failing one
+within a few calls, and take it back after a probe once it recovers. Run
+from the llm-service directory:
+
+    python -m benchmarks.bench_router
+"""
+import json
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_openai_server import FakeUpstream, serve
+
+PROFILES = {
+    'fast': {'latency': 0.05},
+    'slow': {'latency': 0.3},
+    'flaky': {'latency': 0.05, 'error_rate': 1.0},
+}
+REQUESTS_PER_PHASE = 150
+CONCURRENCY = 12
+
+
+def start_servers() -> dict:
+    upstreams = {}
+    for port, (name, profile) in enumerate(PROFILES.items(), start=18301):
+        upstream = FakeUpstream(latency_distribution='fixed', tokens_per_second=0, seed=port, **profile)
+        server = serve(upstream, port=port)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        upstreams[name] = (upstream, f'http://127.0.0.1:{port}/v1')
+    return upstreams
+
+
+def run_phase(service, label: str, offset: int):
+    def call(n: int) -> float:
+        start = time.perf_counter()
+        service.generate_content(f'Title {offset + n}', 'crm tools', None, 'blog_intro', 50, use_cache=False)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(CONCURRENCY) as pool:
+        latencies = sorted(pool.map(call, range(REQUESTS_PER_PHASE)))
+    print(f"\n{label}: p50 {statistics.median(latencies) * 1000:.0f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.0f} ms")
+    for target in service.router.stats()['targets']:
+        print(f"  {target['name']:<6} requests {target['requests']:>4}  failures {target['failures']:>3}  "
+              f"ejections {target['ejections']}  healthy {target['healthy']}  latency {target['latency_ewma']}")
+
+
+def main():
+    upstreams = start_servers()
+    os.environ['LLM_UPSTREAMS'] = json.dumps([
+        {'name': name, 'base_url': url, 'api_key': 'fake'} for name, (_, url) in upstreams.items()
+    ])
+    os.environ['LLM_UPSTREAM_EJECT_SECONDS'] = '1'
+    os.environ['LLM_RETRY_BASE_DELAY'] = '0.01'
+    os.environ['LLM_CACHE_ENABLED'] = 'false'
+    from services.openai_service import OpenAIService
+
+    service = OpenAIService()
+    run_phase(service, 'flaky target failing', 0)
+
+    upstreams['flaky'][0].configure({'error_rate': 0.0})
+    time.sleep(1.5)  # let the ejection run out so the next call probes it
+    run_phase(service, 'flaky target recovered', REQUESTS_PER_PHASE)
+
+
+if __name__ == '__main__':
+    main()
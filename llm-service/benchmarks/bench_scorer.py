@@ -0,0 +1,102 @@
+"""Micro-benchmarks for SEOScorer over synthetic documents.
+
+Times analyze_content end to end, document tokenization, and every
+scoring/readability helper at sizes from 100 to 50k words. Run from the
+llm-service directory:
+
+    python -m benchmarks.bench_scorer
+"""
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.bench_seo_document import KEYWORD, make_content
+from services.seo_document import SEODocument
+from services.seo_scorer import SEOScorer
+
+SIZES = [100, 500, 1000, 5000, 10000, 50000]
+TITLE = 'Digital Marketing Guide: Best Practices for Growth'
+SECONDARY_KEYWORDS = ['content strategy', 'search engine', 'traffic']
+
+
+def measure(fn: Callable[[], object], min_time: float = 0.2, repeat: int = 5) -> Dict:
+    """Per-call time in microseconds over `repeat` rounds of at least min_time/repeat each"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeat or number >= 1_000_000:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / repeat / elapsed) + 1))
+
+    rounds = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - start) / number)
+    return {
+        'median_us': round(statistics.median(rounds) * 1e6, 3),
+        'min_us': round(min(rounds) * 1e6, 3),
+        'loops': number
+    }
+
+
+def helper_calls(scorer: SEOScorer, doc: SEODocument) -> Dict[str, Callable[[], object]]:
+    """Every _score_* and readability helper, fed values taken from doc"""
+    density = doc.keyword_count(KEYWORD) / doc.word_count * 100 if doc.word_count else 0
+    readability = scorer._calculate_readability_score(doc)
+    calls = {
+        '_score_keyword_density': lambda: scorer._score_keyword_density(density),
+        '_score_title_length': lambda: scorer._score_title_length(len(TITLE)),
+        '_score_content_length': lambda: scorer._score_content_length(doc.word_count),
+        '_score_section_length': lambda: scorer._score_section_length(doc.word_count),
+        '_score_sentence_length': lambda: scorer._score_sentence_length(readability['avg_sentence_length']),
+        '_score_reading_ease': lambda: scorer._score_reading_ease(readability['flesch_reading_ease']),
+        '_score_readability': lambda: scorer._score_readability(readability),
+        '_calculate_readability_score': lambda: scorer._calculate_readability_score(doc),
+        '_get_readability_feedback': lambda: scorer._get_readability_feedback(readability),
+    }
+    # New helpers must be benchmarked too - fail loudly rather than skip them
+    expected = {name for name in dir(scorer) if name.startswith('_score_') or 'readability' in name}
+    missing = expected - set(calls)
+    if missing:
+        raise RuntimeError(f"no benchmark inputs for: {', '.join(sorted(missing))}")
+    return calls
+
+
+def run(sizes: List[int] = SIZES, min_time: float = 0.2) -> Dict:
+    scorer = SEOScorer()
+    results = {}
+    for size in sizes:
+        content = make_content(size)
+        doc = SEODocument(content)
+        timings = {
+            'analyze_content': measure(lambda: scorer.analyze_content(content, KEYWORD, TITLE), min_time),
+            'analyze_content_secondary': measure(
+                lambda: scorer.analyze_content(content, KEYWORD, TITLE, SECONDARY_KEYWORDS), min_time
+            ),
+            'tokenize': measure(lambda: SEODocument(content), min_time),
+        }
+        for name, call in helper_calls(scorer, doc).items():
+            timings[name] = measure(call, min_time)
+        results[str(size)] = timings
+    return results
+
+
+def print_results(results: Dict):
+    names = list(next(iter(results.values())))
+    width = max(len(name) for name in names)
+    print(f"{'median us':<{width}} " + ' '.join(f'{size:>10}' for size in results))
+    for name in names:
+        print(f'{name:<{width}} ' + ' '.join(f"{results[size][name]['median_us']:>10.2f}" for size in results))
+
+
+def main():
+    print_results(run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Benchmark the single-pass SEODocument against the old multi-pass scan.
+
+Run from the llm-service directory:
+
+    python -m benchmarks.bench_seo_document
+"""
+import random
+import re
+import time
+
+from services.seo_document import SEODocument
+from services.seo_scorer import SEOScorer
+
+VOCABULARY = [
+    'content', 'marketing', 'search', 'engine', 'ranking', 'strategy', 'audience',
+    'traffic', 'digital', 'growth', 'keyword', 'research', 'quality', 'links',
+    'page', 'users', 'results', 'business', 'online', 'tools', 'data', 'the',
+    'a', 'to', 'and', 'of', 'for', 'with', 'your', 'is'
+]
+KEYWORD = 'digital marketing'
+SIZES = [1000, 5000, 10000, 50000]
+REPEATS = 5
+
+
+def make_content(word_count: int, seed: int = 42) -> str:
+    rng = random.Random(seed)
+    words = []
+    while len(words) < word_count:
+        sentence = [rng.choice(VOCABULARY) for _ in range(rng.randint(8, 24))]
+        if rng.random() < 0.2:
+            sentence[rng.randrange(len(sentence))] = KEYWORD
+        words.extend(sentence)
+        words[-1] += rng.choice('..!?')
+    return ' '.join(words[:word_count])
+
+
+def legacy_passes(content: str, keyword: str) -> tuple:
+    """The tokenization work analyze_content did before SEODocument"""
+    keyword_count = len(re.findall(re.escape(keyword.lower()), content.lower()))
+    word_count = len(content.split())
+    averages = []
+    # value, score and feedback each re-split sentences and words
+    for _ in range(3):
+        sentences = [s.strip() for s in re.split(r'[.!?]+', content) if s.strip()]
+        words = content.split()
+        averages.append(len(words) / len(sentences) if sentences else 0)
+    return keyword_count, word_count, averages[0]
+
+
+def single_pass(content: str, keyword: str) -> tuple:
+    doc = SEODocument(content)
+    return doc.keyword_count(keyword), doc.word_count, doc.avg_sentence_length
+
+
+def best_of(fn, *args) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    scorer = SEOScorer()
+    title = 'Digital Marketing Guide: Best Practices for Growth'
+
+    print(f"{'words':>8} {'legacy ms':>10} {'doc ms':>10} {'speedup':>8} {'analyze ms':>11}")
+    for size in SIZES:
+        content = make_content(size)
+        assert legacy_passes(content, KEYWORD) == single_pass(content, KEYWORD)
+
+        legacy = best_of(legacy_passes, content, KEYWORD)
+        current = best_of(single_pass, content, KEYWORD)
+        analyze = best_of(scorer.analyze_content, content, KEYWORD, title)
+        print(f"{size:>8} {legacy * 1000:>10.2f} {current * 1000:>10.2f} "
+              f"{legacy / current:>7.2f}x {analyze * 1000:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Compare peak memory and time of whole-string and streamed analysis.
+
+A Markdown guide with many H2 sections is analyzed once as a single
+string (analyze_content) and once fed in 64 KB pieces (analyze_stream).
+Streaming peak memory should stay flat as the document grows. Run from
+the llm-service directory:
+
+    python -m benchmarks.bench_seo_stream
+"""
+import time
+import tracemalloc
+
+from benchmarks.bench_seo_document import KEYWORD, make_content
+from services.seo_scorer import SEOScorer
+
+TITLE = 'Digital marketing: the complete guide for growing teams'
+SECTION_WORDS = 600
+SIZES = [50, 500, 2000]  # sections
+PIECE_BYTES = 64 * 1024
+
+
+def make_guide(sections: int) -> str:
+    body = make_content(SECTION_WORDS)
+    return ''.join(f'## Part {n}: {KEYWORD} basics\n\n{body}\n\n' for n in range(sections))
+
+
+def pieces(data: bytes):
+    for start in range(0, len(data), PIECE_BYTES):
+        yield data[start:start + PIECE_BYTES]
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    scorer = SEOScorer()
+    print(f"{'sections':>9} {'MB':>7} {'string ms':>10} {'string peak MB':>15} "
+          f"{'stream ms':>10} {'stream peak MB':>15}")
+    for sections in SIZES:
+        text = make_guide(sections)
+        # The document itself is not counted: the string path gets it already
+        # decoded, the stream path only ever sees one piece of it
+        data = text.encode('utf-8')
+        whole, whole_s, whole_peak = measure(lambda: scorer.analyze_content(text, KEYWORD, TITLE))
+        streamed, stream_s, stream_peak = measure(lambda: scorer.analyze_stream(pieces(data), KEYWORD, TITLE))
+        assert len(streamed['sections']) == sections
+        print(f"{sections:>9} {len(data) / 1e6:>7.1f} {whole_s * 1000:>10.1f} {whole_peak / 1e6:>15.1f} "
+              f"{stream_s * 1000:>10.1f} {stream_peak / 1e6:>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Show that concurrent identical prompts reach the upstream API once.
+
+Fires N threads at OpenAIService.generate_keywords with the same seed
+against a slow fake client, with the completion cache disabled so only
+request coalescing can deduplicate them. Run from the llm-service directory:
+
+    python -m benchmarks.bench_single_flight
+"""
+import threading
+import time
+
+from benchmarks.fakes import FakeOpenAIClient
+from services.openai_service import OpenAIService
+
+CONCURRENCY = 50
+UPSTREAM_LATENCY = 0.5
+
+
+def fire(service: OpenAIService, seeds) -> tuple:
+    results = [None] * len(seeds)
+    barrier = threading.Barrier(len(seeds))
+
+    def worker(index: int):
+        barrier.wait()
+        try:
+            results[index] = service.generate_keywords(seeds[index])
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(seeds))]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def make_service(client: FakeOpenAIClient) -> OpenAIService:
+    service = OpenAIService()
+    service.client = client
+    service.cache = None
+    service.similar = None
+    service.keyword_index = None
+    return service
+
+
+def main():
+    client = FakeOpenAIClient(latency=UPSTREAM_LATENCY)
+    service = make_service(client)
+
+    results, elapsed = fire(service, ['crm tools'] * CONCURRENCY)
+    print(f"{CONCURRENCY} identical requests: {client.calls} upstream call(s) in {elapsed:.2f}s")
+    assert client.calls == 1, 'identical in-flight prompts must share one upstream call'
+    assert len(set(results)) == 1
+
+    client = FakeOpenAIClient(latency=UPSTREAM_LATENCY)
+    service = make_service(client)
+    _, elapsed = fire(service, [f'seed {n}' for n in range(CONCURRENCY)])
+    print(f"{CONCURRENCY} distinct requests: {client.calls} upstream call(s) in {elapsed:.2f}s")
+    assert client.calls == CONCURRENCY
+
+    # The shared error reaches every waiter and is not remembered, so the
+    # next request goes upstream again
+    client = FakeOpenAIClient(latency=UPSTREAM_LATENCY, error=RuntimeError('upstream 500'))
+    service = make_service(client)
+    results, _ = fire(service, ['crm tools'] * CONCURRENCY)
+    assert all(isinstance(result, Exception) for result in results)
+    client.chat.completions.error = None
+    service.generate_keywords('crm tools')
+    print(f"failed flight then retry: {client.calls} upstream call(s)")
+    assert client.calls == 2
+    assert service.inflight.in_flight() == 0
+
+
+if __name__ == '__main__':
+    main()
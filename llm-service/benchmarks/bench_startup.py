@@ -0,0 +1,111 @@
+"""Measure cold start: importing each app, and gunicorn until it serves.
+
+Every sample runs in a fresh interpreter, as an autoscaled or serverless
+instance would. Importing the app must not load the OpenAI SDK; that is
+checked, not just timed. The gunicorn figure (skipped when gunicorn is
+not installed) is the time from launching gunicorn.conf.py with two
+workers to the first /health answer. Run from the llm-service directory:
+
+    python -m benchmarks.bench_startup
+
+benchmarks.suite includes these timings, so --baseline catches regressions.
+"""
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, Optional
+
+RUNS = 5
+GUNICORN_PORT = 18391
+
+IMPORT_SCRIPT = '''
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+assert 'openai' not in sys.modules, 'importing {module} loaded the OpenAI SDK'
+print(elapsed)
+'''
+
+
+def environment(directory: str) -> Dict:
+    env = dict(os.environ)
+    env.update({
+        'OPENAI_API_KEY': 'sk-bench',
+        'OPENAI_BASE_URL': 'http://127.0.0.1:9/v1',  # nothing listens there; prewarm just fails
+        'JOB_WORKERS': '0',
+        'JOB_QUEUE_PATH': os.path.join(directory, 'jobs.sqlite3'),
+        'LLM_CACHE_PATH': os.path.join(directory, 'completions.sqlite3'),
+        'KEYWORD_INDEX_DIR': os.path.join(directory, 'keywords'),
+    })
+    env.pop('LLM_UPSTREAMS', None)
+    return env
+
+
+def import_time(module: str, env: Dict) -> float:
+    """Best-of-RUNS seconds to import `module` in a fresh interpreter"""
+    samples = []
+    for _ in range(RUNS):
+        output = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT.format(module=module)],
+                                env=env, capture_output=True, text=True, check=True).stdout
+        samples.append(float(output.strip().splitlines()[-1]))
+    return min(samples)
+
+
+def gunicorn_ready(env: Dict) -> Optional[float]:
+    """Best-of-RUNS seconds from launching gunicorn (2 workers) to the first /health answer"""
+    if shutil.which('gunicorn') is None:
+        return None
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        process = subprocess.Popen(['gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+                                   env={**env, 'PORT': str(GUNICORN_PORT), 'WEB_CONCURRENCY': '2'},
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            while True:
+                try:
+                    urllib.request.urlopen(f'http://127.0.0.1:{GUNICORN_PORT}/health', timeout=1).read()
+                    break
+                except (OSError, socket.timeout):
+                    if process.poll() is not None:
+                        raise RuntimeError('gunicorn exited before serving')
+                    time.sleep(0.01)
+            samples.append(time.perf_counter() - start)
+        finally:
+            process.terminate()
+            process.wait()
+    return min(samples)
+
+
+def run() -> Dict:
+    with tempfile.TemporaryDirectory() as directory:
+        env = environment(directory)
+        results = {
+            'import_app_ms': import_time('app', env) * 1000,
+            'import_asgi_ms': import_time('asgi', env) * 1000,
+        }
+        ready = gunicorn_ready(env)
+        if ready is not None:
+            results['gunicorn_ready_ms'] = ready * 1000
+    return {name: round(value, 1) for name, value in results.items()}
+
+
+def print_results(results: Dict):
+    for name, value in results.items():
+        print(f"{name:<20} {value:>8.1f}")
+
+
+def main():
+    # Noise only ever adds time, so the fastest run is the steadiest figure
+    print(f"best of {RUNS} fresh processes, milliseconds")
+    print_results(run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+"""OpenAI-compatible chat completions stand-in for local load testing.
+
+Unlike the _get_mock_* methods it behaves like a real upstream: responses
+take time (drawn from a configurable latency distribution), streams are
+paced at a tokens-per-second rate, max_tokens truncates output, and 429s,
+5xx errors and malformed JSON can be injected. Point the LLM service at it:
+
+    python -m benchmarks.fake_openai_server --port 8099 --latency 0.8 --tokens-per-second 40
+    OPENAI_API_KEY=fake OPENAI_BASE_URL=http://127.0.0.1:8099/v1 python app.py
+
+Settings can be changed while it runs with POST /_fake/config (same names
+as the command-line flags, with underscores) and counters are served from
+GET /_fake/stats.
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, Tuple
+
+from benchmarks.fakes import FakeChatCompletions
+
+DISTRIBUTIONS = ('fixed', 'uniform', 'normal', 'lognormal', 'exponential')
+
+
+class FakeUpstream:
+    """Settings, injected failures and counters shared by all request threads"""
+
+    def __init__(self, latency: float = 0.5, latency_distribution: str = 'lognormal',
+                 latency_stddev: float = 0.25, tokens_per_second: float = 50.0,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, malformed_rate: float = 0.0,
+                 requests_per_minute: float = 0.0, retry_after: float = 1.0, seed=None):
+        self.latency = latency
+        self.latency_distribution = latency_distribution
+        self.latency_stddev = latency_stddev
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.malformed_rate = malformed_rate
+        self.requests_per_minute = requests_per_minute
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = []
+        self.stats = {'requests': 0, 'streams': 0, 'ok': 0, 'rate_limited': 0, 'errors': 0,
+                      'malformed': 0, 'truncated': 0, 'completion_tokens': 0}
+
+    def configure(self, settings: Dict):
+        with self._lock:
+            for name, value in settings.items():
+                if name in ('stats', 'rng') or name.startswith('_') or not hasattr(self, name):
+                    raise ValueError(f'unknown setting: {name}')
+                setattr(self, name, value)
+
+    def settings(self) -> Dict:
+        return {name: value for name, value in vars(self).items()
+                if name not in ('stats', 'rng') and not name.startswith('_')}
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def sample_latency(self) -> float:
+        mean, stddev = self.latency, self.latency_stddev
+        with self._lock:
+            rng = self.rng
+            if self.latency_distribution == 'uniform':
+                value = rng.uniform(max(0.0, mean - stddev), mean + stddev)
+            elif self.latency_distribution == 'normal':
+                value = rng.gauss(mean, stddev)
+            elif self.latency_distribution == 'lognormal' and mean > 0:
+                # Parameterised so the samples have the requested mean and stddev
+                sigma_squared = math.log(1 + (stddev / mean) ** 2)
+                value = rng.lognormvariate(math.log(mean) - sigma_squared / 2, math.sqrt(sigma_squared))
+            elif self.latency_distribution == 'exponential' and mean > 0:
+                value = rng.expovariate(1 / mean)
+            else:
+                value = mean
+        return max(0.0, value)
+
+    def admit(self) -> Tuple[int, str]:
+        """(status, message) for the injected outcome of one request; 200 means serve it"""
+        now = time.monotonic()
+        with self._lock:
+            if self.requests_per_minute:
+                self._window = [t for t in self._window if now - t < 60]
+                if len(self._window) >= self.requests_per_minute:
+                    return 429, 'Rate limit reached for requests'
+                self._window.append(now)
+            roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            return 429, 'Rate limit reached (injected)'
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500, 'The server had an error while processing your request (injected)'
+        return 200, ''
+
+    def reply(self, prompt: str, max_tokens) -> Tuple[str, str]:
+        """(content, finish_reason) shaped for the prompt, truncated to max_tokens words"""
+        content = FakeChatCompletions._reply(prompt)
+        with self._lock:
+            malformed = self.rng.random() < self.malformed_rate
+        if malformed:
+            self.count('malformed')
+            content = content[:max(1, len(content) // 2)] + ' ,,}'
+        words = content.split(' ')
+        if max_tokens and len(words) > max_tokens:
+            self.count('truncated')
+            return ' '.join(words[:max_tokens]), 'length'
+        return content, 'stop'
+
+
+def make_handler(upstream: FakeUpstream):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path == '/_fake/stats':
+                return self._json(200, {**upstream.stats, 'settings': upstream.settings()})
+            if self.path.rstrip('/') in ('/v1/models', '/models'):
+                return self._json(200, {'object': 'list', 'data': [{'id': 'fake-model', 'object': 'model'}]})
+            self._json(404, {'error': {'message': 'not found'}})
+
+        def do_POST(self):
+            body = self._body()
+            if self.path == '/_fake/config':
+                try:
+                    upstream.configure(body)
+                except ValueError as e:
+                    return self._json(400, {'error': str(e)})
+                return self._json(200, upstream.settings())
+            if self.path.rstrip('/') not in ('/v1/chat/completions', '/chat/completions'):
+                return self._json(404, {'error': {'message': 'not found'}})
+
+            upstream.count('requests')
+            status, message = upstream.admit()
+            if status != 200:
+                upstream.count('rate_limited' if status == 429 else 'errors')
+                headers = {'retry-after': str(upstream.retry_after)} if status == 429 else {}
+                return self._json(status, {'error': {'message': message, 'type': 'fake_error'}}, headers)
+
+            time.sleep(upstream.sample_latency())
+            prompt = ' '.join(str(message.get('content', '')) for message in body.get('messages', []))
+            content, finish_reason = upstream.reply(prompt, body.get('max_tokens'))
+            usage = {
+                'prompt_tokens': len(prompt.split()),
+                'completion_tokens': len(content.split()),
+                'total_tokens': len(prompt.split()) + len(content.split())
+            }
+            upstream.count('completion_tokens', usage['completion_tokens'])
+            upstream.count('ok')
+
+            if body.get('stream'):
+                upstream.count('streams')
+                include_usage = bool((body.get('stream_options') or {}).get('include_usage'))
+                return self._stream(body, content, finish_reason, usage if include_usage else None)
+
+            # A non-streamed answer arrives once the whole completion is "generated"
+            if upstream.tokens_per_second:
+                time.sleep(usage['completion_tokens'] / upstream.tokens_per_second)
+            self._json(200, {
+                'id': f'chatcmpl-{uuid.uuid4().hex}',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': body.get('model', 'fake-model'),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': content},
+                    'finish_reason': finish_reason
+                }],
+                'usage': usage
+            })
+
+        def _stream(self, body: Dict, content: str, finish_reason: str, usage):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+
+            try:
+                for chunk in stream_chunks(body, content, finish_reason, usage, upstream.tokens_per_second):
+                    self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode('utf-8'))
+                    self.wfile.flush()
+                self.wfile.write(b'data: [DONE]\n\n')
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def _body(self) -> Dict:
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                return json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                return {}
+
+        def _json(self, status: int, payload: Dict, headers: Dict = None):
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+    return Handler
+
+
+def stream_chunks(body: Dict, content: str, finish_reason: str, usage, tokens_per_second: float) -> Iterator[Dict]:
+    """chat.completion.chunk objects, one word per chunk, paced at tokens_per_second"""
+    base = {
+        'id': f'chatcmpl-{uuid.uuid4().hex}',
+        'object': 'chat.completion.chunk',
+        'created': int(time.time()),
+        'model': body.get('model', 'fake-model')
+    }
+    delay = 1 / tokens_per_second if tokens_per_second else 0
+    words = content.split(' ')
+    yield {**base, 'choices': [{'index': 0, 'delta': {'role': 'assistant', 'content': ''}, 'finish_reason': None}]}
+    for index, word in enumerate(words):
+        if delay:
+            time.sleep(delay)
+        text = word if index == len(words) - 1 else word + ' '
+        yield {**base, 'choices': [{'index': 0, 'delta': {'content': text}, 'finish_reason': None}]}
+    yield {**base, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': finish_reason}]}
+    if usage is not None:
+        yield {**base, 'choices': [], 'usage': usage}
+
+
+def serve(upstream: FakeUpstream, host: str = '127.0.0.1', port: int = 8099) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), make_handler(upstream))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake OpenAI-compatible chat completions server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=float, default=0.5, help='mean time before the first token, seconds')
+    parser.add_argument('--latency-distribution', choices=DISTRIBUTIONS, default='lognormal')
+    parser.add_argument('--latency-stddev', type=float, default=0.25)
+    parser.add_argument('--tokens-per-second', type=float, default=50.0, help='streaming pace; 0 = unpaced')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='fraction answered with 429')
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help='fraction with broken JSON content')
+    parser.add_argument('--requests-per-minute', type=float, default=0.0, help='hard RPM limit; 0 = none')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After seconds sent with 429s')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    settings = vars(args)
+    host, port = settings.pop('host'), settings.pop('port')
+    server = serve(FakeUpstream(**settings), host, port)
+    print(f'Fake OpenAI server on http://{host}:{port}/v1')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""In-process stand-ins for the OpenAI client used by the benchmarks."""
+import json
+import re
+import threading
+import time
+
+
+class _Namespace:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class FakeChatCompletions:
+    def __init__(self, latency: float = 0.0, error: Exception = None, token_latency: float = 0.0):
+        self.latency = latency
+        self.error = error
+        # Per max_tokens of completion, so long generations take longer like the real thing
+        self.token_latency = token_latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def create(self, model, messages, temperature=None, max_tokens=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency + self.token_latency * (max_tokens or 0))
+        if self.error is not None:
+            raise self.error
+
+        prompt = messages[-1]['content']
+        content = self._reply(prompt)
+        usage = _Namespace(
+            prompt_tokens=len(prompt.split()),
+            completion_tokens=len(content.split()),
+            total_tokens=len(prompt.split()) + len(content.split())
+        )
+        if kwargs.get('stream'):
+            return self._stream(content, usage)
+        return _Namespace(
+            choices=[_Namespace(message=_Namespace(content=content), finish_reason='stop')],
+            usage=usage
+        )
+
+    @staticmethod
+    def _stream(content: str, usage):
+        # One chunk per word, then a usage-only chunk like stream_options include_usage
+        for word in content.split(' '):
+            yield _Namespace(choices=[_Namespace(delta=_Namespace(content=word + ' '))], usage=None)
+        yield _Namespace(choices=[], usage=usage)
+
+    @staticmethod
+    def _reply(prompt: str) -> str:
+        """Plausible, correctly shaped output for each OpenAIService prompt"""
+        if 'blog outlines' in prompt:
+            outline = {
+                'title': 'Fake outline',
+                'sections': [
+                    {'heading': f'Section {n}', 'points': ['point one', 'point two']}
+                    for n in range(1, 4)
+                ]
+            }
+            return '```json\n' + json.dumps([outline, outline]) + '\n```'
+        if 'blog titles' in prompt:
+            return json.dumps(['Fake Title One', 'Fake Title Two', 'Fake Title Three'])
+        if 'were written separately' in prompt:
+            count = int(re.search(r'\((\d+) in total', prompt).group(1))
+            return json.dumps({
+                'transitions': [f'Fake transition {n}.' for n in range(count)],
+                'conclusion': 'Fake conclusion.'
+            })
+        if 'keywords related to' in prompt:
+            return json.dumps(['fake keyword one', 'fake keyword two', 'fake keyword three'])
+        return ' '.join(['Fake generated content sentence.'] * 40)
+
+
+class FakeOpenAIClient:
+    """Duck-types openai.OpenAI closely enough for OpenAIService"""
+
+    def __init__(self, latency: float = 0.0, error: Exception = None, token_latency: float = 0.0):
+        self.chat = _Namespace(completions=FakeChatCompletions(latency, error, token_latency))
+
+    @property
+    def calls(self) -> int:
+        return self.chat.completions.calls
@@ -0,0 +1,153 @@
+"""Drive LLM service routes at a target request rate and report percentiles.
+
+Open-loop: requests are sent on a fixed (or Poisson) schedule whether or
+not earlier ones have finished, and latency is measured from the moment a
+request was due, so a stalled server cannot hide its queueing delay.
+Run from the llm-service directory against a running service:
+
+    python -m benchmarks.loadgen --url http://localhost:5001 --route keywords --rps 20 --duration 30
+    python -m benchmarks.loadgen --route mix --rps 50 --duration 60 --output load.json
+"""
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.bench_seo_document import KEYWORD, make_content
+from benchmarks.stats import percentile, summarize
+
+OUTLINE = {
+    'title': 'Overview',
+    'sections': [{'heading': 'Getting started', 'points': ['Basics', 'First steps']}]
+}
+SEO_CONTENT = make_content(800)
+
+
+def payloads(unique: bool) -> Dict[str, Tuple[str, Callable[[int], Dict]]]:
+    """route name -> (path, fn(request number) -> JSON body)"""
+    def seed(n: int) -> str:
+        # A distinct prompt per request keeps the completion cache out of the measurement
+        return f'crm software {n}' if unique else 'crm software'
+
+    return {
+        'keywords': ('/generate-keywords', lambda n: {'seed_keyword': seed(n)}),
+        'titles': ('/generate-titles', lambda n: {'keyword': seed(n)}),
+        'topics': ('/generate-topics', lambda n: {'title': 'CRM Guide', 'keyword': seed(n)}),
+        'content': ('/generate-content', lambda n: {
+            'title': 'CRM Guide', 'keyword': seed(n), 'outline': OUTLINE
+        }),
+        'stream': ('/generate-content/stream', lambda n: {
+            'title': 'CRM Guide', 'keyword': seed(n), 'outline': OUTLINE
+        }),
+        'article': ('/generate-article', lambda n: {'seed_keyword': seed(n)}),
+        'analyze-seo': ('/analyze-seo', lambda n: {
+            'content': SEO_CONTENT, 'keyword': KEYWORD, 'title': 'Digital Marketing Guide'
+        }),
+    }
+
+
+def send(url: str, body: Dict, timeout: float) -> Tuple[int, float]:
+    """(status, seconds until the first body byte); reads the whole body"""
+    request = urllib.request.Request(url, data=json.dumps(body).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read(1)
+            first_byte = time.perf_counter() - start
+            response.read()
+            return response.status, first_byte
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code, time.perf_counter() - start
+
+
+def run(base_url: str, routes: List[str], rps: float, duration: float, concurrency: int = 256,
+        timeout: float = 120, poisson: bool = False, unique: bool = True) -> Dict:
+    specs = payloads(unique)
+    rng = random.Random(0)
+    lock = threading.Lock()
+    records = {route: {'latencies': [], 'first_byte': [], 'statuses': {}, 'errors': 0} for route in routes}
+    counter = itertools.count()
+
+    def fire(route: str, due: float):
+        path, body = specs[route]
+        record = records[route]
+        try:
+            status, first_byte = send(base_url.rstrip('/') + path, body(next(counter)), timeout)
+        except Exception as e:
+            status, first_byte = type(e).__name__, None
+        latency = time.perf_counter() - due
+        with lock:
+            record['statuses'][str(status)] = record['statuses'].get(str(status), 0) + 1
+            if status == 200:
+                record['latencies'].append(latency)
+                record['first_byte'].append(first_byte)
+            else:
+                record['errors'] += 1
+
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    start = time.perf_counter()
+    due = start
+    sent = 0
+    while due - start < duration:
+        now = time.perf_counter()
+        if due > now:
+            time.sleep(due - now)
+        pool.submit(fire, routes[sent % len(routes)], due)
+        sent += 1
+        due += rng.expovariate(rps) if poisson else 1 / rps
+    pool.shutdown(wait=True)
+    elapsed = time.perf_counter() - start
+
+    results = {}
+    for route, record in records.items():
+        summary = summarize(record['latencies'], elapsed, record['errors'])
+        summary['statuses'] = record['statuses']
+        summary['first_byte_p50_ms'] = round(percentile(record['first_byte'], 50) * 1000, 3)
+        results[route] = summary
+    return {'target_rps': rps, 'sent': sent, 'elapsed': round(elapsed, 3), 'routes': results}
+
+
+def print_results(results: Dict):
+    print(f"sent {results['sent']} requests in {results['elapsed']:.1f}s "
+          f"(target {results['target_rps']} rps)")
+    print(f"{'route':<12} {'ok rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ttfb p50':>9}  statuses")
+    for route, summary in results['routes'].items():
+        print(f"{route:<12} {summary['throughput_rps']:>8.1f} {summary['p50_ms']:>9.1f} "
+              f"{summary['p95_ms']:>9.1f} {summary['p99_ms']:>9.1f} {summary['first_byte_p50_ms']:>9.1f}  "
+              f"{summary['statuses']}")
+
+
+def main():
+    routes = list(payloads(True))
+    parser = argparse.ArgumentParser(description='Open-loop load generator for the LLM service')
+    parser.add_argument('--url', default='http://localhost:5001', help='LLM service base URL')
+    parser.add_argument('--route', default='keywords', choices=routes + ['mix'],
+                        help='route to drive; mix rotates through all of them')
+    parser.add_argument('--rps', type=float, default=10, help='target requests per second')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to send for')
+    parser.add_argument('--concurrency', type=int, default=256, help='max requests in flight')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--poisson', action='store_true', help='exponential inter-arrival times')
+    parser.add_argument('--repeat-prompts', action='store_true',
+                        help='send identical prompts so the cache and coalescing can absorb load')
+    parser.add_argument('--output', help='write results JSON here')
+    args = parser.parse_args()
+
+    results = run(args.url, routes if args.route == 'mix' else [args.route], args.rps, args.duration,
+                  args.concurrency, args.timeout, args.poisson, not args.repeat_prompts)
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
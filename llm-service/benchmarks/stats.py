@@ -0,0 +1,28 @@
+"""Latency summaries shared by the benchmarks and the load generator."""
+import math
+import statistics
+from typing import Dict, Sequence
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0-100) of unsorted values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies: Sequence[float], elapsed: float, errors: int = 0) -> Dict:
+    """Throughput and latency percentiles, latencies in seconds, reported in ms"""
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered) + errors,
+        'errors': errors,
+        'throughput_rps': round(len(ordered) / elapsed, 2) if elapsed > 0 else 0.0,
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3) if ordered else 0.0,
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3) if ordered else 0.0
+    }
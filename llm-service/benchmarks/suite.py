@@ -0,0 +1,144 @@
+"""Run the scorer, endpoint and startup benchmarks and write the results as JSON.
+
+Run from the llm-service directory:
+
+    python -m benchmarks.suite --output bench-results.json
+    python -m benchmarks.suite --baseline bench-results.json --threshold 0.15
+
+With --baseline, every timing is compared against the stored run and the
+command exits with status 1 when any of them regressed by more than the
+threshold (a fraction, 0.15 = 15% slower).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict, Iterator, List, Tuple
+
+from benchmarks import bench_endpoints, bench_scorer, bench_startup
+
+QUICK_SIZES = [100, 1000, 10000]
+# Sub-microsecond helpers are mostly timer noise; they are reported but never fail a run
+NOISE_FLOOR_US = 1.0
+
+# (metric, True when higher is better)
+COMPARED_FIELDS = {
+    'micro': [('median_us', False)],
+    'endpoints': [('throughput_rps', True), ('p50_ms', False), ('p99_ms', False)]
+}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def environment() -> Dict:
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def flatten(results: Dict) -> Iterator[Tuple[str, float, bool]]:
+    """(name, value, higher_is_better) for every compared timing in a results file"""
+    for size, timings in results.get('micro', {}).items():
+        for name, timing in timings.items():
+            for field, higher_is_better in COMPARED_FIELDS['micro']:
+                yield f'micro {size:>6} words {name} {field}', timing[field], higher_is_better
+    for route, summary in results.get('endpoints', {}).items():
+        for field, higher_is_better in COMPARED_FIELDS['endpoints']:
+            yield f'endpoint {route} {field}', summary[field], higher_is_better
+    for name, value in results.get('startup', {}).items():
+        yield f'startup {name}', value, False
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """Relative change per timing; positive `change` always means slower"""
+    previous = {name: value for name, value, _ in flatten(baseline)}
+    rows = []
+    for name, value, higher_is_better in flatten(current):
+        before = previous.get(name)
+        if not before or not value:
+            continue
+        change = (before / value - 1) if higher_is_better else (value / before - 1)
+        rows.append({
+            'name': name,
+            'baseline': before,
+            'current': value,
+            'change': round(change, 4),
+            'regressed': change > threshold and not (name.endswith('_us') and before < NOISE_FLOOR_US)
+        })
+    return rows
+
+
+def print_comparison(rows: List[Dict], threshold: float):
+    width = max((len(row['name']) for row in rows), default=10)
+    print(f"\n{'vs baseline':<{width}} {'baseline':>12} {'current':>12} {'change':>8}")
+    for row in rows:
+        flag = '  REGRESSED' if row['regressed'] else ''
+        print(f"{row['name']:<{width}} {row['baseline']:>12.3f} {row['current']:>12.3f} "
+              f"{row['change'] * 100:>+7.1f}%{flag}")
+    regressed = sum(row['regressed'] for row in rows)
+    print(f"\n{regressed} of {len(rows)} timings more than {threshold:.0%} slower than the baseline")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SEOScorer and LLM service benchmark suite')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--baseline', help='results JSON from an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.15, help='allowed slowdown before failing')
+    parser.add_argument('--quick', action='store_true', help='fewer sizes and requests')
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--skip-endpoints', action='store_true')
+    parser.add_argument('--skip-startup', action='store_true')
+    parser.add_argument('--requests', type=int, default=200, help='requests per route')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--upstream-latency', type=float, default=0.0, help='fake OpenAI latency in seconds')
+    args = parser.parse_args()
+
+    results = {'environment': environment()}
+    if not args.skip_micro:
+        sizes = QUICK_SIZES if args.quick else bench_scorer.SIZES
+        results['micro'] = bench_scorer.run(sizes, min_time=0.05 if args.quick else 0.2)
+        bench_scorer.print_results(results['micro'])
+    if not args.skip_endpoints:
+        results['endpoints'] = bench_endpoints.run(
+            50 if args.quick else args.requests, args.concurrency, args.upstream_latency
+        )
+        results['settings'] = {
+            'concurrency': args.concurrency,
+            'upstream_latency': args.upstream_latency
+        }
+        print()
+        bench_endpoints.print_results(results['endpoints'])
+    if not args.skip_startup:
+        results['startup'] = bench_startup.run()
+        print()
+        bench_startup.print_results(results['startup'])
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'\nResults written to {args.output}')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.threshold)
+        print_comparison(rows, args.threshold)
+        if any(row['regressed'] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
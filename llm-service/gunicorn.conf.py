@@ -0,0 +1,41 @@
+"""Production launch mode: preforked workers that share the app loaded once.
+
+    gunicorn -c gunicorn.conf.py app:app
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+
+The master imports the app, the OpenAI SDK and the optional numeric
+libraries, runs a sample analysis to warm the scorer, then freezes the
+heap and forks. Workers start with all of it shared copy-on-write, so
+adding one costs a fork instead of a cold start. Each worker then starts
+its job queue threads and opens a keep-alive connection to every upstream
+(LLM_PREWARM=false skips that).
+"""
+import gc
+import multiprocessing
+import os
+
+from services import startup
+
+startup.enable_prefork()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+# app:app is synchronous: each worker serves this many requests at once
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', 8))
+preload_app = True
+timeout = int(os.getenv('WEB_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+
+def when_ready(server):
+    # Everything loaded so far becomes immortal to the collector, so the
+    # workers' GC passes do not write to (and un-share) the preloaded pages
+    gc.freeze()
+    timings = startup.STARTUP.snapshot()
+    server.log.info(f"App preloaded in {timings['ready_seconds']}s: {timings['phases']}")
+
+
+def post_fork(server, worker):
+    startup.worker_booted()
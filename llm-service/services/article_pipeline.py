@@ -0,0 +1,414 @@
+import asyncio
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from .schemas import LONG_FORM_OUTLINE_SCHEMA, SchemaError, validate
+
+# Long-form mode: introduction length cap and the smallest section worth a request
+LONG_FORM_INTRO_WORDS = 150
+LONG_FORM_MIN_SECTION_WORDS = 80
+LONG_FORM_MAX_SECTIONS = int(os.getenv('LONG_FORM_MAX_SECTIONS', 40))
+
+
+def long_form_error(outline, intro=None) -> Optional[str]:
+    """Why a long-form request cannot be written, or None when it can"""
+    try:
+        validate(outline, LONG_FORM_OUTLINE_SCHEMA, 'outline')
+    except SchemaError as e:
+        return str(e)
+    if not outline['sections']:
+        return 'outline must have at least one section'
+    if len(outline['sections']) > LONG_FORM_MAX_SECTIONS:
+        return f'outline may have at most {LONG_FORM_MAX_SECTIONS} sections'
+    if intro is not None and not isinstance(intro, str):
+        return 'intro must be a string'
+    return None
+
+
+class _StageTimer:
+    """Records when each stage started and how long it took, relative to the run"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.stages: Dict[str, Dict] = {}
+
+    def start(self) -> float:
+        return time.perf_counter()
+
+    def stop(self, name: str, started: float):
+        self.stages[name] = {
+            'started_at': round(started - self.origin, 4),
+            'duration': round(time.perf_counter() - started, 4)
+        }
+
+
+class ArticlePipeline:
+    """Runs keywords -> titles -> outlines -> content server-side in one request.
+
+    Stages only wait for what they depend on: outlines for every title are
+    requested at once, content for every content type starts as soon as the
+    chosen title's outline is ready, and when the caller already knows the
+    keyword, keyword research runs alongside the whole pipeline and is only
+    waited for at the end.
+    When a stage the article needs fails, the work it started that is
+    still queued or (for the async service) in flight is cancelled.
+    Outlines for the titles that were not chosen, and keyword research when
+    the keyword was given, feed nothing else, so their failures are
+    reported in the result instead of failing the article.
+    """
+
+    def __init__(self, openai_service, seo_scorer, max_workers: Optional[int] = None):
+        self.openai_service = openai_service
+        self.seo_scorer = seo_scorer
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or int(os.getenv('PIPELINE_MAX_WORKERS', 16)),
+            thread_name_prefix='pipeline'
+        )
+
+    def _submit(self, fn, *args, **kwargs):
+        # Pool threads do not inherit context, and with it the request's priority class
+        return self.executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+    def run(self, seed_keyword: str, keyword: Optional[str] = None, title: Optional[str] = None,
+            tone: str = 'professional', content_types: Optional[List[str]] = None,
+            word_count: int = 150, analyze: bool = True, use_cache: bool = True) -> Dict:
+        service = self.openai_service
+        timer = _StageTimer()
+        content_types = content_types or ['blog_intro']
+        futures = []
+
+        def timed(name, fn, *args, **kwargs):
+            started = timer.start()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                timer.stop(name, started)
+
+        def submit(*args, **kwargs):
+            future = self._submit(*args, **kwargs)
+            futures.append(future)
+            return future
+
+        try:
+            keywords_future = submit(
+                timed, 'keywords', service.generate_keywords, seed_keyword, use_cache=use_cache, native=True
+            )
+            # The caller's keyword drives everything else, so research is only reported
+            research_only = bool(keyword)
+            if not research_only:
+                keywords = keywords_future.result()
+                keyword = keywords[0] if keywords else seed_keyword
+            titles_future = submit(
+                timed, 'titles', service.generate_titles, keyword, tone, use_cache=use_cache, native=True
+            )
+
+            titles = titles_future.result()
+            title = title or titles[0]
+            outline_titles = list(dict.fromkeys([title] + titles))
+            topic_futures = {
+                name: submit(
+                    timed, f'topics[{index}]', service.generate_topics, name, keyword,
+                    use_cache=use_cache, native=True
+                )
+                for index, name in enumerate(outline_titles)
+            }
+
+            # Content only waits for the chosen title's outline
+            outlines = topic_futures[title].result()
+            outline = outlines[0] if outlines else None
+            content_futures = {
+                content_type: submit(
+                    timed, f'content[{content_type}]', service.generate_content,
+                    title, keyword, outline, content_type, word_count, use_cache=use_cache
+                )
+                for content_type in content_types
+            }
+
+            contents = {content_type: _outcome(future.result) for content_type, future in content_futures.items()}
+            # Outlines of the other titles are extras; one failing does not fail the article
+            topics = {name: _outcome(future.result) for name, future in topic_futures.items()}
+            if research_only:
+                keywords = _outcome(keywords_future.result)
+        except BaseException:
+            # A stage the article needs failed: drop the queued work nobody will read
+            for future in futures:
+                future.cancel()
+            raise
+
+        return self._assemble(timer, seed_keyword, keyword, keywords, title, titles,
+                              topics, outline, contents, analyze)
+
+    async def arun(self, seed_keyword: str, keyword: Optional[str] = None, title: Optional[str] = None,
+                   tone: str = 'professional', content_types: Optional[List[str]] = None,
+                   word_count: int = 150, analyze: bool = True, use_cache: bool = True) -> Dict:
+        """Same pipeline for an async service, fanned out with asyncio tasks"""
+        service = self.openai_service
+        timer = _StageTimer()
+        content_types = content_types or ['blog_intro']
+        tasks = []
+
+        async def timed(name, coroutine):
+            started = timer.start()
+            try:
+                return await coroutine
+            finally:
+                timer.stop(name, started)
+
+        def spawn(name, coroutine):
+            task = asyncio.ensure_future(timed(name, coroutine))
+            tasks.append(task)
+            return task
+
+        try:
+            keywords_task = spawn(
+                'keywords', service.generate_keywords(seed_keyword, use_cache=use_cache, native=True)
+            )
+            research_only = bool(keyword)
+            if not research_only:
+                keywords = await keywords_task
+                keyword = keywords[0] if keywords else seed_keyword
+            titles_task = spawn(
+                'titles', service.generate_titles(keyword, tone, use_cache=use_cache, native=True)
+            )
+
+            titles = await titles_task
+            title = title or titles[0]
+            outline_titles = list(dict.fromkeys([title] + titles))
+            topic_tasks = {
+                name: spawn(f'topics[{index}]', service.generate_topics(
+                    name, keyword, use_cache=use_cache, native=True
+                ))
+                for index, name in enumerate(outline_titles)
+            }
+
+            outlines = await topic_tasks[title]
+            outline = outlines[0] if outlines else None
+            content_tasks = [
+                spawn(f'content[{content_type}]', service.generate_content(
+                    title, keyword, outline, content_type, word_count, use_cache=use_cache
+                ))
+                for content_type in content_types
+            ]
+
+            results = await asyncio.gather(*content_tasks, return_exceptions=True)
+            contents = dict(zip(content_types, results))
+            outlines_by_title = await asyncio.gather(*topic_tasks.values(), return_exceptions=True)
+            topics = dict(zip(topic_tasks, outlines_by_title))
+            if research_only:
+                (keywords,) = await asyncio.gather(keywords_task, return_exceptions=True)
+        except BaseException:
+            # Failed or cancelled: siblings would only spend upstream capacity on a dead request
+            for task in tasks:
+                task.cancel()
+            raise
+
+        # SEO analysis is CPU-bound; keep it off the event loop
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self._assemble, timer, seed_keyword, keyword, keywords, title, titles,
+            topics, outline, contents, analyze
+        )
+
+    def write_long_form(self, title: str, keyword: str, outline: Dict, word_count: int = 1500,
+                        intro: Optional[str] = None, consistency_pass: bool = False,
+                        analyze: bool = False, use_cache: bool = True) -> Dict:
+        """Long-form content written one outline section per request, all sections at once.
+
+        The introduction is written first (unless given) and shared with
+        every section prompt. Each section then gets a thread of its own, so
+        sections never queue in the shared pipeline pool; the upstream
+        concurrency limit (LLM_CONCURRENCY_INITIAL, 8 at start, then adapted)
+        is what bounds them. With n sections and k free upstream slots,
+        wall-clock time is the introduction plus ceil(n / k) section rounds
+        plus the optional consistency pass - the slowest section only while
+        n <= k - rather than one completion as long as the whole article.
+        """
+        service = self.openai_service
+        timer = _StageTimer()
+        sections = outline['sections']
+
+        def timed(name, fn, *args, **kwargs):
+            started = timer.start()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                timer.stop(name, started)
+
+        intro_words, section_words = self._long_form_budget(word_count, len(sections), intro)
+        if intro is None:
+            intro = timed('intro', service.generate_content, title, keyword, outline, 'blog_intro',
+                          intro_words, use_cache=use_cache)
+
+        with ThreadPoolExecutor(max_workers=len(sections), thread_name_prefix='long-form') as pool:
+            section_futures = [
+                pool.submit(contextvars.copy_context().run, timed, f'sections[{index}]', service.generate_section,
+                            title, keyword, outline, index, intro, section_words, use_cache=use_cache)
+                for index in range(len(sections))
+            ]
+            bodies = [future.result() for future in section_futures]
+
+        transitions = None
+        if consistency_pass:
+            headings = [section['heading'] for section in sections]
+            try:
+                transitions = timed('consistency', service.generate_transitions,
+                                    title, keyword, headings, bodies, use_cache=use_cache)
+            except Exception as e:
+                # The sections are already written; the bridges are optional
+                transitions = e
+
+        return self._assemble_long_form(timer, title, keyword, intro, sections, bodies, transitions, analyze)
+
+    async def awrite_long_form(self, title: str, keyword: str, outline: Dict, word_count: int = 1500,
+                               intro: Optional[str] = None, consistency_pass: bool = False,
+                               analyze: bool = False, use_cache: bool = True) -> Dict:
+        """write_long_form for an async service, with the sections gathered on the loop.
+
+        Every section is in flight at once; as in write_long_form, only the
+        upstream concurrency limit bounds them.
+        """
+        service = self.openai_service
+        timer = _StageTimer()
+        sections = outline['sections']
+
+        async def timed(name, coroutine):
+            started = timer.start()
+            try:
+                return await coroutine
+            finally:
+                timer.stop(name, started)
+
+        intro_words, section_words = self._long_form_budget(word_count, len(sections), intro)
+        if intro is None:
+            intro = await timed('intro', service.generate_content(
+                title, keyword, outline, 'blog_intro', intro_words, use_cache=use_cache
+            ))
+
+        sections_task = asyncio.gather(*(
+            timed(f'sections[{index}]', service.generate_section(
+                title, keyword, outline, index, intro, section_words, use_cache=use_cache
+            ))
+            for index in range(len(sections))
+        ))
+        try:
+            bodies = await sections_task
+        except BaseException:
+            # One section failed (or the caller left): the others can no longer be used
+            sections_task.cancel()
+            raise
+
+        transitions = None
+        if consistency_pass:
+            headings = [section['heading'] for section in sections]
+            try:
+                transitions = await timed('consistency', service.generate_transitions(
+                    title, keyword, headings, list(bodies), use_cache=use_cache
+                ))
+            except Exception as e:
+                transitions = e
+
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self._assemble_long_form, timer, title, keyword, intro, sections, list(bodies), transitions, analyze
+        )
+
+    @staticmethod
+    def _long_form_budget(word_count: int, section_count: int, intro: Optional[str]) -> tuple:
+        """(introduction words, words per section) for a target article length"""
+        intro_words = len(intro.split()) if intro is not None else \
+            min(LONG_FORM_INTRO_WORDS, word_count // (section_count + 1))
+        section_words = max(LONG_FORM_MIN_SECTION_WORDS, (word_count - intro_words) // section_count)
+        return intro_words, section_words
+
+    def _assemble_long_form(self, timer: _StageTimer, title: str, keyword: str, intro: str,
+                            sections: List[Dict], bodies: List[str], transitions, analyze: bool) -> Dict:
+        """Stitch the sections in outline order as Markdown under their headings"""
+        bridges = [''] * len(sections)
+        conclusion = None
+        if isinstance(transitions, dict):
+            bridges = transitions['transitions'] + ['']
+            conclusion = transitions['conclusion']
+
+        parts = [intro.strip()]
+        for section, body, bridge in zip(sections, bodies, bridges):
+            parts.append(f"## {section['heading']}\n\n{_strip_heading(body, section['heading'])}")
+            if bridge:
+                parts.append(bridge.strip())
+        if conclusion:
+            parts.append(f'## Conclusion\n\n{conclusion.strip()}')
+        content = '\n\n'.join(parts)
+
+        result = {
+            'title': title,
+            'keyword': keyword,
+            'content': content,
+            'sections': [
+                {'heading': section['heading'], 'words': len(body.split())}
+                for section, body in zip(sections, bodies)
+            ],
+            'word_count': len(content.split()),
+            'consistency_pass': isinstance(transitions, dict)
+        }
+        if isinstance(transitions, Exception):
+            result['consistency_error'] = str(transitions)
+        if analyze:
+            started = timer.start()
+            # Per-heading scores come from the section-aware streaming analyzer
+            result['seo_analysis'] = self.seo_scorer.analyze_stream([content], keyword, title)
+            timer.stop('seo', started)
+        result['timings'] = timer.stages
+        result['processing_time'] = round(time.perf_counter() - timer.origin, 4)
+        return result
+
+    def _assemble(self, timer: _StageTimer, seed_keyword: str, keyword: str, keywords: List,
+                  title: str, titles: List, topics: Dict, outline: Optional[Dict],
+                  contents: Dict, analyze: bool) -> Dict:
+        content = {}
+        for content_type, result in contents.items():
+            if isinstance(result, Exception):
+                # One failed content type does not discard the rest of the article
+                content[content_type] = {'error': str(result)}
+                continue
+            content[content_type] = {'content': result}
+            if analyze:
+                started = timer.start()
+                content[content_type]['seo_analysis'] = self.seo_scorer.analyze_content(result, keyword, title)
+                timer.stop(f'seo[{content_type}]', started)
+
+        result = {
+            'seed_keyword': seed_keyword,
+            'keywords': [] if isinstance(keywords, Exception) else keywords,
+            'keyword': keyword,
+            'titles': titles,
+            'title': title,
+            'topics': [
+                {'title': name, 'error': str(outlines)} if isinstance(outlines, Exception)
+                else {'title': name, 'outlines': outlines}
+                for name, outlines in topics.items()
+            ],
+            'outline': outline,
+            'content': content,
+            'timings': timer.stages,
+            'processing_time': round(time.perf_counter() - timer.origin, 4)
+        }
+        if isinstance(keywords, Exception):
+            result['keywords_error'] = str(keywords)
+        return result
+
+
+def _outcome(result: Callable[[], Any]) -> Any:
+    """A future's result, or the exception it raised"""
+    try:
+        return result()
+    except Exception as e:
+        return e
+
+
+def _strip_heading(body: str, heading: str) -> str:
+    """Drop a first line that just repeats the section heading"""
+    body = body.strip()
+    first, _, rest = body.partition('\n')
+    if first.lstrip('#').strip().strip('*').strip().lower() == heading.strip().lower():
+        return rest.strip()
+    return body
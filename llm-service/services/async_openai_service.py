@@ -0,0 +1,240 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from . import json_codec
+from .completion_cache import CompletionCache
+from .metrics import MOCK_FALLBACKS, SIMILAR_CACHE_HITS, UPSTREAM_SECONDS, record_usage
+from .openai_service import OpenAIService
+from .schemas import KEYWORDS_SCHEMA, TITLES_SCHEMA, TOPICS_SCHEMA, TRANSITIONS_SCHEMA
+from .single_flight import AsyncSingleFlight
+from .startup import LazyClient
+from .upstream_scheduler import UpstreamError
+
+
+class AsyncOpenAIService(OpenAIService):
+    """OpenAIService for the ASGI app.
+
+    Prompts, parsing, caching and mock fallbacks are shared with the sync
+    service; upstream calls are awaited on an AsyncOpenAI client so a single
+    event loop can hold hundreds of generations in flight.
+    """
+
+    asynchronous = True
+
+    def __init__(self):
+        super().__init__()
+        self.inflight = AsyncSingleFlight()
+
+    def _create_client(self, api_key: str, base_url: Optional[str] = None):
+        def build():
+            import openai
+            return openai.AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url or os.getenv('OPENAI_BASE_URL') or None,
+                max_retries=0,
+                timeout=float(os.getenv('OPENAI_TIMEOUT', 60))
+            )
+        return LazyClient(build)
+
+    @staticmethod
+    async def _offload(fn, *args):
+        """Run cache and keyword index I/O (SQLite, log appends) on a thread, off the loop"""
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def _complete(self, endpoint: str, prompt: str, temperature: float, max_tokens: int,
+                        schema: Optional[Dict] = None, use_cache: bool = True,
+                        similar: Optional[Tuple[str, str]] = None) -> Any:
+        cache = self.cache if endpoint not in self.cache_disabled_endpoints else None
+        key = CompletionCache.make_key(endpoint, self.model, prompt, temperature, max_tokens)
+
+        if cache and use_cache:
+            cached = await self._offload(cache.get, key)
+            if cached is not None:
+                return json_codec.loads(cached) if schema else cached
+
+        near = self._near_key(endpoint, temperature, max_tokens, similar)
+        if near and use_cache:
+            stored = self.similar.get(*near)
+            if stored is not None:
+                SIMILAR_CACHE_HITS.inc(endpoint=endpoint)
+                return json_codec.loads(stored) if schema else stored
+
+        async def fetch() -> Any:
+            with UPSTREAM_SECONDS.time(endpoint=endpoint):
+                response = await self.scheduler.acall(
+                    lambda: self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=temperature,
+                        max_tokens=max_tokens
+                    ),
+                    self._estimate_tokens(prompt, max_tokens)
+                )
+            record_usage(endpoint, getattr(response, 'usage', None))
+            content = response.choices[0].message.content.strip()
+            return await self._offload(self._store, cache, key, endpoint, content, schema, near)
+
+        return await asyncio.wait_for(self.inflight.do(key, fetch), self.coalesce_timeout)
+
+    async def generate_keywords(self, seed_keyword: str, use_cache: bool = True, native: bool = False):
+        keywords = await self._offload(self._indexed_keywords, seed_keyword, use_cache)
+        if keywords is None and not self.client:
+            keywords = self._get_mock_keywords(seed_keyword)
+        elif keywords is None:
+            prompt = self._keywords_prompt(seed_keyword)
+            try:
+                keywords = await self._complete(
+                    'generate_keywords', prompt, 0.7, 200, KEYWORDS_SCHEMA, use_cache, (seed_keyword, '')
+                )
+                await self._offload(self._fold_keywords, seed_keyword, keywords)
+            except Exception as e:
+                keywords = self._fallback('generate_keywords', e, self._get_mock_keywords, seed_keyword)
+
+        return keywords if native else json.dumps(keywords)
+
+    async def generate_titles(self, keyword: str, tone: str = "professional", use_cache: bool = True,
+                              native: bool = False):
+        if not self.client:
+            titles = self._get_mock_titles(keyword, tone)
+        else:
+            prompt = self._titles_prompt(keyword, tone)
+            try:
+                titles = await self._complete(
+                    'generate_titles', prompt, 0.8, 300, TITLES_SCHEMA, use_cache, (keyword, tone)
+                )
+            except Exception as e:
+                titles = self._fallback('generate_titles', e, self._get_mock_titles, keyword, tone)
+
+        return titles if native else json.dumps(titles)
+
+    async def generate_topics(self, title: str, keyword: str, use_cache: bool = True, native: bool = False):
+        if not self.client:
+            topics = self._get_mock_topics(title, keyword)
+        else:
+            prompt = self._topics_prompt(title, keyword)
+            try:
+                topics = await self._complete('generate_topics', prompt, 0.7, 800, TOPICS_SCHEMA, use_cache)
+            except Exception as e:
+                topics = self._fallback('generate_topics', e, self._get_mock_topics, title, keyword)
+
+        return topics if native else json.dumps(topics)
+
+    async def generate_content(self, title: str, keyword: str, outline: Dict,
+                               content_type: str = 'blog_intro', word_count: int = 150,
+                               use_cache: bool = True) -> str:
+        if not self.client:
+            return self._get_mock_content(title, keyword, content_type, word_count)
+
+        prompt = self._content_prompt(title, keyword, outline, content_type, word_count)
+        try:
+            return await self._complete('generate_content', prompt, 0.7, word_count * 2, use_cache=use_cache)
+        except Exception as e:
+            return self._fallback(
+                'generate_content', e, self._get_mock_content, title, keyword, content_type, word_count
+            )
+
+    async def generate_section(self, title: str, keyword: str, outline: Dict, index: int, intro: str,
+                               word_count: int = 300, use_cache: bool = True) -> str:
+        section = outline['sections'][index]
+        if not self.client:
+            return self._get_mock_section(keyword, section, word_count)
+
+        prompt = self._section_prompt(title, keyword, outline, index, intro, word_count)
+        try:
+            return await self._complete('generate_section', prompt, 0.7, word_count * 2, use_cache=use_cache)
+        except Exception as e:
+            return self._fallback('generate_section', e, self._get_mock_section, keyword, section, word_count)
+
+    async def generate_transitions(self, title: str, keyword: str, headings: List[str], bodies: List[str],
+                                   use_cache: bool = True) -> Dict:
+        if not self.client:
+            return self._get_mock_transitions(keyword, headings)
+
+        prompt = self._transitions_prompt(title, keyword, headings, bodies)
+        max_tokens = 60 * len(headings) + 200
+        try:
+            transitions = await self._complete(
+                'generate_transitions', prompt, 0.5, max_tokens, TRANSITIONS_SCHEMA, use_cache
+            )
+        except Exception as e:
+            return self._fallback('generate_transitions', e, self._get_mock_transitions, keyword, headings)
+        if len(transitions['transitions']) != len(headings) - 1:
+            raise UpstreamError(
+                f"malformed model output: expected {len(headings) - 1} transitions, "
+                f"got {len(transitions['transitions'])}", 502
+            )
+        return transitions
+
+    async def generate_content_stream(self, title: str, keyword: str, outline: Dict,
+                                      content_type: str = 'blog_intro', word_count: int = 150,
+                                      use_cache: bool = True) -> AsyncIterator[Dict]:
+        prompt = self._content_prompt(title, keyword, outline, content_type, word_count)
+        if not self.client:
+            async for event in self._stream_mock_content(prompt, title, keyword, content_type, word_count):
+                yield event
+            return
+
+        cache = self.cache if 'generate_content' not in self.cache_disabled_endpoints else None
+        key = CompletionCache.make_key('generate_content', self.model, prompt, 0.7, word_count * 2)
+        if cache and use_cache:
+            cached = await self._offload(cache.get, key)
+            if cached is not None:
+                yield {'type': 'token', 'content': cached}
+                yield {'type': 'usage', 'usage': {'cached': True}}
+                return
+
+        parts = []
+        usage = None
+        started = time.perf_counter()
+        stream = self.scheduler.astream(
+            lambda: self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.7,
+                max_tokens=word_count * 2,
+                stream=True,
+                stream_options={"include_usage": True}
+            ),
+            self._estimate_tokens(prompt, word_count * 2)
+        )
+        try:
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield {'type': 'token', 'content': chunk.choices[0].delta.content}
+        except Exception as e:
+            if parts or not self.mock_fallback:
+                raise
+            print(f"OpenAI API error: {e}")
+            MOCK_FALLBACKS.inc(endpoint='generate_content_stream')
+            async for event in self._stream_mock_content(prompt, title, keyword, content_type, word_count):
+                yield event
+            return
+        finally:
+            await stream.aclose()
+
+        # The whole stream counts as upstream time
+        UPSTREAM_SECONDS.observe(time.perf_counter() - started, endpoint='generate_content_stream')
+        record_usage('generate_content_stream', usage)
+        if cache:
+            await self._offload(cache.set, key, ''.join(parts).strip(), 'generate_content')
+        yield {'type': 'usage', 'usage': {
+            'prompt_tokens': usage.prompt_tokens if usage else None,
+            'completion_tokens': usage.completion_tokens if usage else None,
+            'total_tokens': usage.total_tokens if usage else None
+        }}
+
+    async def _stream_mock_content(self, prompt: str, title: str, keyword: str,
+                                   content_type: str, word_count: int) -> AsyncIterator[Dict]:
+        tokens, usage = self._mock_stream_parts(prompt, title, keyword, content_type, word_count)
+        delay = float(os.getenv('MOCK_STREAM_DELAY', 0.02))
+        for token in tokens:
+            if delay:
+                await asyncio.sleep(delay)
+            yield {'type': 'token', 'content': token}
+        yield {'type': 'usage', 'usage': usage}
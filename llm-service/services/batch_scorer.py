@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .seo_scorer import SEOScorer
+
+# One scorer per worker process, created lazily on first use
+_worker_scorer = None
+
+
+def analyze(content: str, keyword: str, title: str, secondary_keywords=None) -> Dict:
+    """SEOScorer.analyze_content on the calling process's shared scorer"""
+    global _worker_scorer
+    if _worker_scorer is None:
+        _worker_scorer = SEOScorer()
+    return _worker_scorer.analyze_content(content, keyword, title, secondary_keywords)
+
+
+def _score_item(index: int, item) -> Dict:
+    """Score one batch item, turning any failure into an error record"""
+    try:
+        if not isinstance(item, dict):
+            raise ValueError('item must be an object with content, keyword and title')
+
+        content = item.get('content')
+        keyword = item.get('keyword')
+        title = item.get('title')
+        if not content or not keyword or not title:
+            raise ValueError('content, keyword, and title are required')
+
+        analysis = analyze(content, keyword, title, item.get('secondary_keywords'))
+        return {'index': index, 'analysis': analysis}
+    except Exception as e:
+        return {'index': index, 'error': str(e)}
+
+
+def _score_chunk(start: int, items: List) -> List[Dict]:
+    return [_score_item(start + offset, item) for offset, item in enumerate(items)]
+
+
+class BatchScorer:
+    """Spreads SEOScorer work for many documents across a process pool.
+
+    A batch keeps at most one chunk per worker in the pool, so when a worker
+    dies (e.g. killed for memory) only the chunks being scored fail; the
+    pool is replaced and the rest of the batch goes to the new one.
+    """
+
+    ORDERS = ('input', 'completion')
+
+    def __init__(self, max_workers: Optional[int] = None, chunk_size: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv('SEO_BATCH_WORKERS', os.cpu_count() or 1))
+        self.chunk_size = chunk_size or int(os.getenv('SEO_BATCH_CHUNK_SIZE', 16))
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        # Created on first batch so importing the app never forks workers
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def submit(self, fn, *args) -> Future:
+        """Run fn(*args) in the pool, replacing the pool first if a worker died"""
+        executor = self.executor
+        try:
+            return executor.submit(fn, *args)
+        except BrokenProcessPool:
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False)
+            return self.executor.submit(fn, *args)
+
+    def score(self, items: List, order: str = 'input') -> Iterator[Dict]:
+        """Yield one result per item, in input or completion order"""
+        if order not in self.ORDERS:
+            raise ValueError(f"order must be one of: {', '.join(self.ORDERS)}")
+        # Validation happens eagerly; chunks are submitted as results stream
+        return self._collect(items, order)
+
+    def _collect(self, items: List, order: str) -> Iterator[Dict]:
+        # Small chunks amortize pickling without delaying the first result much
+        starts = deque(range(0, len(items), self.chunk_size))
+        running = {}
+        finished = {}
+        next_start = 0
+        try:
+            while starts or running:
+                while starts and len(running) < self.max_workers:
+                    start = starts.popleft()
+                    running[self.submit(_score_chunk, start, items[start:start + self.chunk_size])] = start
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    start = running.pop(future)
+                    finished[start] = self._results(future, start, len(items[start:start + self.chunk_size]))
+                if order == 'completion':
+                    for start in list(finished):
+                        yield from finished.pop(start)
+                else:
+                    while next_start in finished:
+                        yield from finished.pop(next_start)
+                        next_start += self.chunk_size
+        finally:
+            # Client went away mid-stream - drop work that has not started yet
+            for future in running:
+                future.cancel()
+
+    @staticmethod
+    def _results(future: Future, start: int, size: int) -> List[Dict]:
+        try:
+            return future.result()
+        except Exception as e:
+            # The worker scoring this chunk died - fail only its items
+            return [{'index': index, 'error': f'worker failed: {e}'} for index in range(start, start + size)]
+
+    def score_ndjson(self, items: List, order: str = 'input') -> Iterable[str]:
+        return (json.dumps(result) + '\n' for result in self.score(items, order))
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Disk hits buffer their recency updates and write this many at a time
+TOUCH_BATCH = 64
+# Other workers write to the same file, so the running byte total is re-read this often
+RESYNC_WRITES = 256
+# Eviction frees enough least recently used rows to get this far under the budget
+EVICT_TO = 0.9
+
+
+class CompletionCache:
+    """Two-tier cache for chat completion output.
+
+    A small in-memory LRU sits in front of a SQLite table so repeated
+    prompts survive restarts and are shared by every worker on the box.
+    Memory hits never wait on disk I/O. The table's byte total is kept as
+    a running count, and when it passes the budget the least recently used
+    rows are evicted in one batch. Recency updates from disk hits are
+    written in batches too, so a disk hit costs one indexed read.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, memory_entries: int = 1024,
+                 ttl_seconds: float = 86400, disk_max_bytes: int = 256 * 1024 * 1024):
+        self.memory_entries = memory_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()  # memory tier and stats
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+
+        self.db_path = db_path
+        self._disk_lock = threading.Lock()  # the SQLite connection and the fields below
+        self._connection = None
+        self._connection_pid = None
+        self._disk_bytes = 0
+        self._writes_since_resync = 0
+        self._touched: Dict[str, float] = {}
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connect()
+
+    @property
+    def _db(self) -> Optional[sqlite3.Connection]:
+        # A SQLite connection must not cross fork(): preforked workers open their own
+        if self.db_path and self._connection_pid != os.getpid():
+            self._connect()
+        return self._connection
+
+    def _connect(self):
+        self._connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._connection_pid = os.getpid()
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS completions ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, endpoint TEXT, '
+            'expires_at REAL NOT NULL, last_access REAL NOT NULL, size INTEGER NOT NULL)'
+        )
+        self._connection.execute('CREATE INDEX IF NOT EXISTS completions_last_access ON completions (last_access)')
+        self._connection.commit()
+        self._disk_bytes = self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM completions').fetchone()[0]
+        self._writes_since_resync = 0
+        self._touched = {}
+
+    @classmethod
+    def from_env(cls) -> Optional['CompletionCache']:
+        if os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'false':
+            return None
+        return cls(
+            db_path=os.getenv('LLM_CACHE_PATH', os.path.join('cache', 'completions.sqlite3')) or None,
+            memory_entries=int(os.getenv('LLM_CACHE_MEMORY_ENTRIES', 1024)),
+            ttl_seconds=float(os.getenv('LLM_CACHE_TTL', 86400)),
+            disk_max_bytes=int(os.getenv('LLM_CACHE_DISK_MAX_BYTES', 256 * 1024 * 1024))
+        )
+
+    @staticmethod
+    def make_key(method: str, model: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        """Content address of a completion request"""
+        payload = json.dumps([method, model, prompt, temperature, max_tokens], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats['memory_hits'] += 1
+                    return value
+                del self._memory[key]
+
+        row = None
+        if self.db_path:
+            with self._disk_lock:
+                db = self._db
+                row = db.execute('SELECT value, expires_at FROM completions WHERE key = ?', (key,)).fetchone()
+                if row is not None and row[1] > now:
+                    self._touched[key] = now
+                    if len(self._touched) >= TOUCH_BATCH:
+                        self._flush_touched()
+                        db.commit()
+
+        with self._lock:
+            if row is not None and row[1] > now:
+                self._remember(key, row[0], row[1])
+                self._stats['disk_hits'] += 1
+                return row[0]
+            self._stats['misses'] += 1
+            return None
+
+    def set(self, key: str, value: str, endpoint: str = ''):
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self._stats['writes'] += 1
+        if not self.db_path:
+            return
+
+        size = len(value.encode('utf-8'))
+        evicted = 0
+        with self._disk_lock:
+            db = self._db
+            replaced = db.execute('SELECT size FROM completions WHERE key = ?', (key,)).fetchone()
+            db.execute(
+                'INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?, ?)',
+                (key, value, endpoint, expires_at, now, size)
+            )
+            self._disk_bytes += size - (replaced[0] if replaced else 0)
+            self._writes_since_resync += 1
+            self._flush_touched()
+            if self._disk_bytes > self.disk_max_bytes or self._writes_since_resync >= RESYNC_WRITES:
+                evicted = self._evict_disk(now)
+            db.commit()
+        if evicted:
+            with self._lock:
+                self._stats['evictions'] += evicted
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+        if self.db_path:
+            with self._disk_lock:
+                count, size = self._db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions').fetchone()
+            stats['disk_entries'] = count
+            stats['disk_bytes'] = size
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 4) if lookups else 0
+        return stats
+
+    def _remember(self, key: str, value: str, expires_at: float):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def _flush_touched(self):
+        """Write buffered last_access updates; called with the disk lock held, before a commit"""
+        if self._touched:
+            self._db.executemany(
+                'UPDATE completions SET last_access = ? WHERE key = ?',
+                [(accessed, key) for key, accessed in self._touched.items()]
+            )
+            self._touched = {}
+
+    def _evict_disk(self, now: float) -> int:
+        """Re-read the byte total, then drop expired rows and, over budget, the least recently used.
+
+        Called with the disk lock held; returns the number of rows deleted.
+        """
+        db = self._db
+        self._writes_since_resync = 0
+        deleted = db.execute('DELETE FROM completions WHERE expires_at <= ?', (now,)).rowcount
+        total = db.execute('SELECT COALESCE(SUM(size), 0) FROM completions').fetchone()[0]
+        if total > self.disk_max_bytes:
+            excess = total - int(self.disk_max_bytes * EVICT_TO)
+            victims, freed = [], 0
+            cursor = db.execute('SELECT key, size FROM completions ORDER BY last_access')
+            while freed < excess:
+                row = cursor.fetchone()
+                if row is None:
+                    break
+                victims.append((row[0],))
+                freed += row[1]
+            cursor.close()
+            db.executemany('DELETE FROM completions WHERE key = ?', victims)
+            total -= freed
+            deleted += len(victims)
+        self._disk_bytes = total
+        return deleted
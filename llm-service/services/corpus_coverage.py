@@ -0,0 +1,266 @@
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+from .keyword_matcher import tokenize
+
+# NumPy (and SciPy for sparse matrices) are optional: with them every draft
+# in a batch is scored in a few matrix products, without them the same math
+# runs over dicts. Install with: pip install numpy scipy
+# Both are imported by load_numeric() on first use, not with the app.
+np = None
+sparse = None
+_numeric_loaded = False
+
+STOPWORDS = frozenset(
+    'a about above after again against all also am an and any are as at be because been before being '
+    'below between both but by can could did do does doing down during each few for from further had '
+    'has have having he her here hers him his how i if in into is it its itself just me more most my no '
+    'nor not now of off on once only or other our ours out over own same she should so some such than '
+    'that the their theirs them then there these they this those through to too under until up very was '
+    'we were what when where which while who whom why will with would you your yours'.split()
+)
+
+IMPORTANT_TERMS = int(os.getenv('SEO_CORPUS_IMPORTANT_TERMS', 50))
+MISSING_TERMS = 10
+# Covering this share of the important terms' weight earns a full score
+FULL_COVERAGE = 0.7
+
+
+def load_numeric():
+    global np, sparse, _numeric_loaded
+    if _numeric_loaded:
+        return
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    try:
+        from scipy import sparse
+    except ImportError:
+        sparse = None
+    _numeric_loaded = True
+
+
+def extract_terms(text: str) -> Counter:
+    """Unigram and bigram counts, without stopwords, numbers and two-letter words"""
+    tokens = tokenize(text)
+    keep = [len(token) > 2 and token not in STOPWORDS and not token.isdigit() for token in tokens]
+    terms = Counter(token for token, kept in zip(tokens, keep) if kept)
+    terms.update(
+        f'{first} {second}' for first, second, kept_first, kept_second
+        in zip(tokens, tokens[1:], keep, keep[1:]) if kept_first and kept_second
+    )
+    return terms
+
+
+class CorpusIndex:
+    """TF-IDF model of the reference pages for one keyword.
+
+    Built once per corpus: sublinear term frequency times smoothed IDF,
+    rows L2-normalized. The important terms are the ones weighing most in
+    the corpus centroid, i.e. used widely and often by the reference pages.
+    score() rates any number of drafts against it in one batch.
+    """
+
+    def __init__(self, keyword: str, documents: Sequence[str], max_terms: int = 5000,
+                 important_terms: int = IMPORTANT_TERMS):
+        if not documents:
+            raise ValueError('a corpus needs at least one reference document')
+        load_numeric()
+        self.keyword = keyword
+        self.size = len(documents)
+        counts = [extract_terms(document) for document in documents]
+        document_frequency = Counter(term for count in counts for term in count)
+        # With a handful of pages a term has to recur to say anything about the topic
+        min_df = 2 if self.size >= 4 else 1
+        self.terms = [term for term, df in document_frequency.most_common(max_terms) if df >= min_df]
+        if not self.terms:
+            raise ValueError('the reference documents share no terms')
+        self.term_index = {term: index for index, term in enumerate(self.terms)}
+        self.idf = [math.log((1 + self.size) / (1 + document_frequency[term])) + 1 for term in self.terms]
+
+        rows = [self._row(count) for count in counts]
+        centroid = [0.0] * len(self.terms)
+        for row in rows:
+            for index, value in row.items():
+                centroid[index] += value / self.size
+        self.centroid = _normalized(dict(enumerate(centroid)))
+        ranked = sorted(self.centroid, key=self.centroid.get, reverse=True)
+        self.important = [index for index in ranked[:important_terms] if self.centroid[index] > 0]
+        self.important_weight = sum(self.centroid[index] for index in self.important)
+
+        self._rows = rows
+        if np is not None:
+            self._idf_vector = np.array(self.idf)
+            self._matrix = self._to_matrix(counts)
+            self._centroid_vector = np.zeros(len(self.terms))
+            for index, value in self.centroid.items():
+                self._centroid_vector[index] = value
+            self._important_vector = np.array(self.important, dtype=np.int64)
+            self._important_weights = self._centroid_vector[self._important_vector]
+
+    def important_terms(self, limit: int = 20) -> List[Dict]:
+        return [{'term': self.terms[index], 'weight': round(self.centroid[index], 4)}
+                for index in self.important[:limit]]
+
+    def score(self, drafts: Sequence[str]) -> List[Dict]:
+        """Coverage of the important terms, similarity and missing terms for every draft"""
+        counts = [extract_terms(draft) for draft in drafts]
+        if np is not None:
+            return self._score_matrix(self._to_matrix(counts), len(counts))
+        return [self._score_row(self._row(count)) for count in counts]
+
+    def _row(self, count: Counter) -> Dict[int, float]:
+        """Sparse L2-normalized TF-IDF vector over the corpus vocabulary"""
+        row = {}
+        for term, occurrences in count.items():
+            index = self.term_index.get(term)
+            if index is not None:
+                row[index] = (1 + math.log(occurrences)) * self.idf[index]
+        return _normalized(row)
+
+    def _to_matrix(self, counts: List[Counter]):
+        """L2-normalized TF-IDF matrix, one row per term count, weighted in bulk"""
+        row_ids, col_ids, occurrences = [], [], []
+        term_index = self.term_index
+        for position, count in enumerate(counts):
+            for term, occurrence in count.items():
+                index = term_index.get(term)
+                if index is not None:
+                    row_ids.append(position)
+                    col_ids.append(index)
+                    occurrences.append(occurrence)
+        row_ids = np.array(row_ids, dtype=np.int64)
+        col_ids = np.array(col_ids, dtype=np.int64)
+        values = (1 + np.log(np.array(occurrences, dtype=np.float64))) * self._idf_vector[col_ids]
+        norms = np.sqrt(np.bincount(row_ids, weights=values * values, minlength=len(counts)))
+        values /= norms[row_ids]
+
+        shape = (len(counts), len(self.terms))
+        if sparse is not None:
+            return sparse.csr_matrix((values, (row_ids, col_ids)), shape=shape)
+        matrix = np.zeros(shape)
+        matrix[row_ids, col_ids] = values
+        return matrix
+
+    def _score_matrix(self, drafts, count: int) -> List[Dict]:
+        similarity = np.asarray(drafts @ self._centroid_vector).ravel()
+        pairwise = drafts @ self._matrix.T
+        pairwise = pairwise.toarray() if sparse is not None else pairwise
+        best_match = pairwise.max(axis=1)
+        important = drafts[:, self._important_vector]
+        present = (important.toarray() if sparse is not None else important) > 0
+        coverage = present @ self._important_weights / self.important_weight
+
+        results = []
+        for position in range(count):
+            # self.important is ordered by weight, so the first gaps matter most
+            missing = self._important_vector[~present[position]][:MISSING_TERMS]
+            results.append(self._result(
+                float(coverage[position]), float(similarity[position]), float(best_match[position]),
+                int(present[position].sum()), [int(index) for index in missing]
+            ))
+        return results
+
+    def _score_row(self, row: Dict[int, float]) -> Dict:
+        similarity = sum(value * self.centroid.get(index, 0.0) for index, value in row.items())
+        best_match = max(sum(value * reference.get(index, 0.0) for index, value in row.items())
+                         for reference in self._rows)
+        covered = [index for index in self.important if index in row]
+        missing = [index for index in self.important if index not in row][:MISSING_TERMS]
+        coverage = sum(self.centroid[index] for index in covered) / self.important_weight
+        return self._result(coverage, similarity, best_match, len(covered), missing)
+
+    def _result(self, coverage: float, similarity: float, best_match: float, covered: int,
+                missing: List[int]) -> Dict:
+        return {
+            'coverage': round(coverage * 100, 1),
+            'similarity': round(similarity, 4),
+            'best_match_similarity': round(best_match, 4),
+            'terms_covered': covered,
+            'terms_total': len(self.important),
+            'missing_terms': [self.terms[index] for index in missing]
+        }
+
+
+def _normalized(vector: Dict[int, float]) -> Dict[int, float]:
+    norm = math.sqrt(sum(value * value for value in vector.values()))
+    if not norm:
+        return {}
+    return {index: value / norm for index, value in vector.items() if value}
+
+
+def coverage_score(coverage: float) -> float:
+    """0-100 score for a coverage percentage; FULL_COVERAGE and above is 100"""
+    return round(min(100.0, coverage / FULL_COVERAGE), 1)
+
+
+class CorpusStore:
+    """Built CorpusIndex objects by id, bounded by count (LRU) and idle time (TTL).
+
+    The id is a hash of the keyword and documents, so uploading the same
+    corpus again reuses the index instead of rebuilding it.
+    """
+
+    def __init__(self, max_corpora: int = 100, ttl_seconds: float = 86400):
+        self.max_corpora = max_corpora
+        self.ttl_seconds = ttl_seconds
+        self._corpora: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'CorpusStore':
+        return cls(
+            max_corpora=int(os.getenv('SEO_CORPUS_MAX', 100)),
+            ttl_seconds=float(os.getenv('SEO_CORPUS_TTL', 86400))
+        )
+
+    @staticmethod
+    def corpus_id(keyword: str, documents: Sequence[str]) -> str:
+        digest = hashlib.sha256(keyword.lower().encode('utf-8'))
+        for document in documents:
+            digest.update(b'\0' + document.encode('utf-8'))
+        return digest.hexdigest()[:32]
+
+    def build(self, keyword: str, documents: Sequence[str]) -> tuple:
+        """(corpus_id, index, created) for the corpus, building it only if it is not cached"""
+        corpus_id = self.corpus_id(keyword, documents)
+        index = self.get(corpus_id)
+        if index is not None:
+            return corpus_id, index, False
+        index = CorpusIndex(keyword, documents)
+        with self._lock:
+            self._corpora[corpus_id] = (index, time.monotonic())
+            self._evict()
+        return corpus_id, index, True
+
+    def get(self, corpus_id: str) -> Optional[CorpusIndex]:
+        with self._lock:
+            entry = self._corpora.get(corpus_id)
+            if entry is None:
+                return None
+            index, last_used = entry
+            if time.monotonic() - last_used > self.ttl_seconds:
+                del self._corpora[corpus_id]
+                return None
+            self._corpora[corpus_id] = (index, time.monotonic())
+            self._corpora.move_to_end(corpus_id)
+            return index
+
+    def delete(self, corpus_id: str) -> bool:
+        with self._lock:
+            return self._corpora.pop(corpus_id, None) is not None
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._corpora:
+            corpus_id, (_, last_used) = next(iter(self._corpora.items()))
+            if len(self._corpora) > self.max_corpora or now - last_used > self.ttl_seconds:
+                del self._corpora[corpus_id]
+            else:
+                break
@@ -0,0 +1,414 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from .priority import PRIORITIES, priority_scope
+from .upstream_scheduler import UpstreamError
+
+STATUSES = ('queued', 'running', 'succeeded', 'failed')
+
+# Payload fields each job kind needs, mirroring the synchronous endpoints
+REQUIRED_FIELDS = {
+    'keywords': ('seed_keyword',),
+    'titles': ('keyword',),
+    'topics': ('title', 'keyword'),
+    'content': ('title', 'keyword'),
+    'article': ('seed_keyword',),
+    'long_form': ('title', 'keyword', 'outline'),
+}
+
+
+def generation_handlers(openai_service, article_pipeline) -> Dict[str, Callable[[Dict], Any]]:
+    """Job kind -> handler for the generation endpoints.
+
+    With the async service the handlers return coroutines, which the queue
+    runs on the app's event loop.
+    """
+    service = openai_service
+    is_async = asyncio.iscoroutinefunction(service.generate_keywords)
+    run_article = article_pipeline.arun if is_async else article_pipeline.run
+    write_long_form = article_pipeline.awrite_long_form if is_async else article_pipeline.write_long_form
+
+    return {
+        'keywords': lambda p: service.generate_keywords(
+            p['seed_keyword'], use_cache=p.get('cache', True), native=True
+        ),
+        'titles': lambda p: service.generate_titles(
+            p['keyword'], p.get('tone', 'professional'), use_cache=p.get('cache', True), native=True
+        ),
+        'topics': lambda p: service.generate_topics(
+            p['title'], p['keyword'], use_cache=p.get('cache', True), native=True
+        ),
+        'content': lambda p: service.generate_content(
+            p['title'], p['keyword'], p.get('outline'), p.get('content_type', 'blog_intro'),
+            p.get('word_count', 150), use_cache=p.get('cache', True)
+        ),
+        'article': lambda p: run_article(
+            p['seed_keyword'],
+            keyword=p.get('keyword'),
+            title=p.get('title'),
+            tone=p.get('tone', 'professional'),
+            content_types=p.get('content_types'),
+            word_count=p.get('word_count', 150),
+            analyze=p.get('analyze', True),
+            use_cache=p.get('cache', True)
+        ),
+        'long_form': lambda p: write_long_form(
+            p['title'],
+            p['keyword'],
+            p['outline'],
+            word_count=p.get('word_count', 1500),
+            intro=p.get('intro'),
+            consistency_pass=p.get('consistency_pass', False),
+            analyze=p.get('analyze', False),
+            use_cache=p.get('cache', True)
+        ),
+    }
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """Durable generation jobs in SQLite, run by a bounded pool of worker threads.
+
+    Workers claim the highest-priority queued job (FIFO within a priority)
+    and hold a lease on it that a heartbeat keeps extending. A job whose
+    lease runs out - because the process that held it died or restarted -
+    is picked up again by the next worker, so nothing submitted is lost.
+    Several processes can share one database file. Upstream calls made by
+    jobs queue as `priority_class` (batch by default) unless the payload
+    names another one, so bulk runs yield to interactive requests.
+    """
+
+    def __init__(self, db_path: str, handlers: Dict[str, Callable[[Dict], Any]], workers: int = 4,
+                 lease_seconds: float = 300, max_attempts: int = 3, retry_delay: float = 30,
+                 poll_interval: float = 1.0, priority_class: str = 'batch'):
+        self.handlers = handlers
+        self.priority_class = priority_class
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self._threads: List[threading.Thread] = []
+        self._stopping = threading.Event()
+        self._wakeup = threading.Condition()
+        self._lock = threading.Lock()
+
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connect()
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        # A SQLite connection must not cross fork(): preforked workers open
+        # their own, and claim jobs under their own pid
+        if self._connection_pid != os.getpid():
+            self._connect()
+        return self._connection
+
+    def _connect(self):
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        # Autocommit mode; claims take an explicit write lock with BEGIN IMMEDIATE
+        self._connection = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30,
+                                           isolation_level=None)
+        self._connection_pid = os.getpid()
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT UNIQUE NOT NULL, batch_id TEXT, '
+            'kind TEXT NOT NULL, payload TEXT NOT NULL, priority INTEGER NOT NULL DEFAULT 0, '
+            'status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, result TEXT, error TEXT, '
+            'owner TEXT, lease_expires_at REAL, available_at REAL NOT NULL, '
+            'created_at REAL NOT NULL, started_at REAL, finished_at REAL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority DESC, seq)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS jobs_batch ON jobs (batch_id, seq)')
+
+    @classmethod
+    def from_env(cls, handlers: Dict[str, Callable[[Dict], Any]]) -> 'JobQueue':
+        return cls(
+            db_path=os.getenv('JOB_QUEUE_PATH', os.path.join('cache', 'jobs.sqlite3')),
+            handlers=handlers,
+            workers=int(os.getenv('JOB_WORKERS', 4)),
+            lease_seconds=float(os.getenv('JOB_LEASE_SECONDS', 300)),
+            max_attempts=int(os.getenv('JOB_MAX_ATTEMPTS', 3)),
+            retry_delay=float(os.getenv('JOB_RETRY_DELAY', 30)),
+            priority_class=os.getenv('JOB_PRIORITY_CLASS', 'batch')
+        )
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Start the workers (and the lease heartbeat). Safe to call more than once."""
+        if loop is not None:
+            self.loop = loop
+        if self._threads:
+            return
+        self._stopping.clear()
+        self._release_dead_owners()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'job-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat, name='job-heartbeat', daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop claiming new jobs. Jobs still running are resumed by the next start."""
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _release_dead_owners(self):
+        """Expire leases held by processes on this host that no longer exist.
+
+        Jobs of a crashed process resume right after a restart instead of
+        waiting out the lease.
+        """
+        hostname = socket.gethostname()
+        with self._lock:
+            owners = [row[0] for row in self._db.execute(
+                "SELECT DISTINCT owner FROM jobs WHERE status = 'running' AND owner LIKE ?", (f'{hostname}:%',)
+            )]
+            for owner in owners:
+                pid = int(owner.split(':')[1])
+                if pid != os.getpid() and not _pid_alive(pid):
+                    self._db.execute(
+                        "UPDATE jobs SET lease_expires_at = 0 WHERE status = 'running' AND owner = ?", (owner,)
+                    )
+
+    def validate(self, kind: str, payload: Dict):
+        if kind not in self.handlers:
+            raise ValueError(f"unknown job kind '{kind}', expected one of: {', '.join(self.handlers)}")
+        if not isinstance(payload, dict):
+            raise ValueError('payload must be an object')
+        missing = [field for field in REQUIRED_FIELDS.get(kind, ()) if not payload.get(field)]
+        if missing:
+            raise ValueError(f"{kind} jobs require {', '.join(missing)}")
+        if payload.get('priority_class', self.priority_class) not in PRIORITIES:
+            raise ValueError(f"priority_class must be one of: {', '.join(PRIORITIES)}")
+
+    def submit_many(self, jobs: List[Dict], batch_id: Optional[str] = None) -> List[Dict]:
+        """Queue `{kind, payload, priority}` dicts atomically; all are validated first"""
+        for job in jobs:
+            if not isinstance(job, dict):
+                raise ValueError('each job must be an object')
+            self.validate(job.get('kind'), job.get('payload'))
+            if not isinstance(job.get('priority', 0), int):
+                raise ValueError('priority must be an integer')
+
+        batch_id = batch_id or uuid.uuid4().hex
+        now = time.time()
+        rows = [
+            (uuid.uuid4().hex, batch_id, job['kind'], json.dumps(job['payload']),
+             int(job.get('priority', 0)), 'queued', now, now)
+            for job in jobs
+        ]
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                self._db.executemany(
+                    'INSERT INTO jobs (id, batch_id, kind, payload, priority, status, available_at, created_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows
+                )
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+
+        with self._wakeup:
+            self._wakeup.notify_all()
+        return [{'id': row[0], 'batch_id': batch_id, 'kind': row[2], 'status': 'queued'} for row in rows]
+
+    def submit(self, kind: str, payload: Dict, priority: int = 0, batch_id: Optional[str] = None) -> Dict:
+        return self.submit_many([{'kind': kind, 'payload': payload, 'priority': priority}], batch_id)[0]
+
+    def get(self, job_id: str, include_result: bool = True) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute(f'SELECT {self._columns(include_result)} FROM jobs WHERE id = ?',
+                                   (job_id,)).fetchone()
+        return self._to_dict(row, include_result) if row else None
+
+    def list(self, status: Optional[str] = None, batch_id: Optional[str] = None,
+             after: int = 0, limit: int = 100, include_result: bool = False) -> List[Dict]:
+        """Jobs in submission order; pass the last `seq` seen as `after` to page"""
+        clauses, params = ['seq > ?'], [after]
+        if status:
+            clauses.append('status = ?')
+            params.append(status)
+        if batch_id:
+            clauses.append('batch_id = ?')
+            params.append(batch_id)
+        params.append(limit)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {self._columns(include_result)} FROM jobs WHERE {' AND '.join(clauses)} "
+                'ORDER BY seq LIMIT ?', params
+            ).fetchall()
+        return [self._to_dict(row, include_result) for row in rows]
+
+    def results(self, ids: List[str]) -> List[Dict]:
+        """Full records for many jobs in one query, in the order asked for"""
+        if not ids:
+            return []
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {self._columns(True)} FROM jobs WHERE id IN ({', '.join('?' * len(ids))})", ids
+            ).fetchall()
+        jobs = {job['id']: job for job in (self._to_dict(row, True) for row in rows)}
+        return [jobs.get(job_id, {'id': job_id, 'status': 'not_found'}) for job_id in ids]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            rows = self._db.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        counts = {status: 0 for status in STATUSES}
+        counts.update(dict(rows))
+        counts['workers'] = self.workers
+        return counts
+
+    def run_next(self) -> bool:
+        """Claim and run one job on the calling thread; False when nothing is ready"""
+        job = self._claim()
+        if job is None:
+            return False
+        try:
+            self._execute(job)
+        except Exception as e:
+            # e.g. the outcome could not be recorded; fail the job rather than the worker
+            self._finish(job['id'], 'failed', error=f'{type(e).__name__}: {e}')
+        return True
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                if self.run_next():
+                    continue
+            except Exception as e:
+                # A worker thread that dies takes its share of the pool with it
+                print(f"Job queue error: {e!r}")
+            with self._wakeup:
+                if not self._stopping.is_set():
+                    self._wakeup.wait(self.poll_interval)
+
+    def _heartbeat(self):
+        while not self._stopping.wait(self.lease_seconds / 3):
+            try:
+                with self._lock:
+                    self._db.execute(
+                        "UPDATE jobs SET lease_expires_at = ? WHERE status = 'running' AND owner = ?",
+                        (time.time() + self.lease_seconds, self.owner)
+                    )
+            except sqlite3.Error as e:
+                print(f"Job queue heartbeat error: {e}")
+
+    def _claim(self) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                while True:
+                    # Abandoned jobs (lease expired) first, so restarts resume in order
+                    row = self._db.execute(
+                        "SELECT id, kind, payload, attempts FROM jobs "
+                        "WHERE status = 'running' AND lease_expires_at < ? ORDER BY priority DESC, seq LIMIT 1",
+                        (now,)
+                    ).fetchone() or self._db.execute(
+                        "SELECT id, kind, payload, attempts FROM jobs "
+                        "WHERE status = 'queued' AND available_at <= ? ORDER BY priority DESC, seq LIMIT 1",
+                        (now,)
+                    ).fetchone()
+                    if row is None:
+                        self._db.execute('COMMIT')
+                        return None
+
+                    job_id, kind, payload, attempts = row
+                    if attempts < self.max_attempts:
+                        break
+                    # Died mid-run on every attempt; do not let it take the pool down again
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, owner = NULL, lease_expires_at = NULL, "
+                        "finished_at = ? WHERE id = ?",
+                        (f'abandoned after {attempts} attempts', now, job_id)
+                    )
+
+                self._db.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, owner = ?, "
+                    "lease_expires_at = ?, started_at = ? WHERE id = ?",
+                    (self.owner, now + self.lease_seconds, now, job_id)
+                )
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+        return {'id': job_id, 'kind': kind, 'payload': json.loads(payload), 'attempts': attempts + 1}
+
+    def _execute(self, job: Dict):
+        try:
+            with priority_scope(job['payload'].get('priority_class', self.priority_class)):
+                result = self.handlers[job['kind']](job['payload'])
+                if asyncio.iscoroutine(result):
+                    result = self._await(result)
+            encoded = json.dumps(result)
+        except UpstreamError as e:
+            retryable = e.retry_after is not None or e.status_code in (None, 408, 429, 500, 503, 504)
+            if retryable and job['attempts'] < self.max_attempts:
+                delay = max(e.retry_after or 0, self.retry_delay * job['attempts'])
+                self._finish(job['id'], 'queued', error=str(e), available_at=time.time() + delay)
+            else:
+                self._finish(job['id'], 'failed', error=str(e))
+        except Exception as e:
+            self._finish(job['id'], 'failed', error=str(e))
+        else:
+            self._finish(job['id'], 'succeeded', result=encoded)
+
+    def _await(self, coroutine) -> Any:
+        if self.loop is not None and self.loop.is_running():
+            return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+        return asyncio.run(coroutine)
+
+    def _finish(self, job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None,
+                available_at: Optional[float] = None):
+        now = time.time()
+        with self._lock:
+            # Only the current lease holder may record an outcome
+            self._db.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = ?, owner = NULL, lease_expires_at = NULL, '
+                'finished_at = ?, available_at = COALESCE(?, available_at) WHERE id = ? AND owner = ?',
+                (status, result, error, None if status == 'queued' else now, available_at, job_id, self.owner)
+            )
+
+    @staticmethod
+    def _columns(include_result: bool) -> str:
+        columns = 'seq, id, batch_id, kind, priority, status, attempts, error, created_at, started_at, finished_at'
+        return columns + (', payload, result' if include_result else '')
+
+    @staticmethod
+    def _to_dict(row: tuple, include_result: bool) -> Dict:
+        keys = ['seq', 'id', 'batch_id', 'kind', 'priority', 'status', 'attempts', 'error',
+                'created_at', 'started_at', 'finished_at']
+        job = dict(zip(keys, row))
+        if include_result:
+            job['payload'] = json.loads(row[11])
+            job['result'] = json.loads(row[12]) if row[12] is not None else None
+        return job
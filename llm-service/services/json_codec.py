@@ -0,0 +1,45 @@
+import gzip
+import json
+import os
+from typing import Any, Dict, Tuple
+
+# orjson is optional: several times faster on large outlines when installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+GZIP_MIN_BYTES = int(os.getenv('RESPONSE_GZIP_MIN_BYTES', 1024))
+GZIP_LEVEL = int(os.getenv('RESPONSE_GZIP_LEVEL', 5))
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def loads(data) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    for coding in accept_encoding.lower().split(','):
+        name, _, params = coding.strip().partition(';')
+        if name.strip() in ('gzip', '*'):
+            # "gzip;q=0" means the client refuses it
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def encode_response(payload: Any, accept_encoding: str = '') -> Tuple[bytes, Dict[str, str]]:
+    """Body and headers for a v2 response: compact JSON, gzipped when the client accepts it"""
+    body = dumps(payload)
+    headers = {'Vary': 'Accept-Encoding'}
+    if len(body) >= GZIP_MIN_BYTES and accepts_gzip(accept_encoding):
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+        headers['Content-Encoding'] = 'gzip'
+    return body, headers
@@ -0,0 +1,624 @@
+import heapq
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from itertools import combinations
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+MAGIC = b'KWIX'
+# Version 2 adds each term's display form (its casing as first seen)
+VERSION = 2
+# magic, version, generation, term count, edge count, string blob bytes
+HEADER = struct.Struct('=4sIIIII')
+MAX_TERM_CHARS = 80
+MAX_WEIGHT = 2 ** 32 - 1
+# A list longer than this is not one topic, so its keywords are not linked pairwise
+MAX_GROUP = 50
+
+
+# Without fcntl the index locks only hold within one process
+_LOCAL_LOCKS: Dict[str, threading.Lock] = {}
+_LOCAL_LOCKS_GUARD = threading.Lock()
+
+
+def normalize_keyword(text: str) -> str:
+    """Lowercase, single-spaced, without surrounding punctuation"""
+    return ' '.join(text.lower().split()).strip(' .,;:!?"\'')[:MAX_TERM_CHARS].rstrip()
+
+
+def display_keyword(text: str) -> str:
+    """normalize_keyword, keeping the original casing"""
+    return ' '.join(text.split()).strip(' .,;:!?"\'')[:MAX_TERM_CHARS].rstrip()
+
+
+@contextmanager
+def _locked(path: str, shared: bool = False, blocking: bool = True) -> Iterator[bool]:
+    """flock path for the block; yields False when blocking=False and the lock is taken"""
+    if fcntl is None:
+        with _LOCAL_LOCKS_GUARD:
+            lock = _LOCAL_LOCKS.setdefault(path, threading.Lock())
+        acquired = lock.acquire(blocking)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                lock.release()
+        return
+
+    with open(path, 'a') as f:
+        operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        try:
+            fcntl.flock(f, operation if blocking else operation | fcntl.LOCK_NB)
+            acquired = True
+        except BlockingIOError:
+            acquired = False
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def fold(record: Dict, bump: Callable[[str, int, str], None], link: Callable[[str, str], None]):
+    """Apply one log record.
+
+    Every keyword gets its weight (1 unless imported with a volume) and
+    its display form. Each keyword co-occurs with the seed, and with the
+    other keywords of a list up to MAX_GROUP long.
+    """
+    seed = normalize_keyword(record.get('seed') or '')
+    weights = record.get('weights') or [1] * len(record.get('keywords', ()))
+    keywords = {}
+    displays = {}
+    for keyword, weight in zip(record.get('keywords', ()), weights):
+        term = normalize_keyword(keyword)
+        if term and term != seed:
+            keywords[term] = keywords.get(term, 0) + max(int(weight), 1)
+            displays.setdefault(term, display_keyword(keyword))
+    if seed:
+        bump(seed, 1, display_keyword(record['seed']))
+    for keyword, weight in keywords.items():
+        bump(keyword, weight, displays[keyword])
+        if seed:
+            link(seed, keyword)
+    if len(keywords) <= MAX_GROUP:
+        for a, b in combinations(keywords, 2):
+            link(a, b)
+
+
+class _Terms:
+    """Sorted term bytes of a segment as a sequence, for bisect"""
+
+    def __init__(self, segment: 'KeywordSegment'):
+        self._segment = segment
+
+    def __len__(self) -> int:
+        return self._segment.count
+
+    def __getitem__(self, i: int) -> bytes:
+        return self._segment.key(i)
+
+
+class KeywordSegment:
+    """One immutable index file, memory-mapped.
+
+    Terms are stored sorted, so the keywords sharing a prefix form one
+    contiguous range, and a segment tree of each range's heaviest term ranks
+    that range without scanning it. Each term also lists its strongest
+    co-occurring terms and its display form. Nothing is parsed on open;
+    the OS pages the file in as lookups touch it, and forked workers share
+    those pages.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.generation = 0
+        self.count = 0
+        self.edge_count = 0
+        self._offsets = self._weights = self._tree = ()
+        self._edge_offsets = self._targets = self._edge_weights = ()
+        self._display_offsets = None
+        self._blob = b''
+        self._terms = _Terms(self)
+        if path is None:
+            return
+
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.generation, count, edges, blob_bytes = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version not in (1, VERSION):
+            raise ValueError(f'{path} is not a version {VERSION} keyword index')
+        view = memoryview(self._mmap)
+        position = HEADER.size
+
+        def take(items: int) -> memoryview:
+            nonlocal position
+            part = view[position:position + 4 * items].cast('I')
+            position += 4 * items
+            return part
+
+        self._offsets = take(count + 1)
+        self._weights = take(count)
+        self._tree = take(2 * count)
+        self._edge_offsets = take(count + 1)
+        self._targets = take(edges)
+        self._edge_weights = take(edges)
+        if version >= 2:
+            self._display_offsets = take(count + 1)
+        self._blob = view[position:position + blob_bytes]
+        self.count = count
+        self.edge_count = edges
+
+    @staticmethod
+    def write(path: str, generation: int, weights: Dict[str, int], edges: Dict[str, Dict[str, int]],
+              max_neighbors: int = 32, displays: Optional[Dict[str, str]] = None):
+        """Write a segment to path atomically (readers see the old file or the new one)"""
+        displays = displays or {}
+        terms = sorted(weights)
+        index = {term: i for i, term in enumerate(terms)}
+        count = len(terms)
+
+        blob = bytearray()
+        offsets = array('I', [0])
+        for term in terms:
+            blob += term.encode('utf-8')
+            offsets.append(len(blob))
+        term_weights = array('I', (min(weights[term], MAX_WEIGHT) for term in terms))
+
+        # tree[count + i] is term i; every node above holds the heavier of its
+        # children, ties going to the alphabetically first
+        tree = array('I', bytes(8 * count))
+        for i in range(count):
+            tree[count + i] = i
+        for node in range(count - 1, 0, -1):
+            a, b = tree[2 * node], tree[2 * node + 1]
+            tree[node] = a if (term_weights[a], -a) >= (term_weights[b], -b) else b
+
+        edge_offsets = array('I', [0])
+        targets = array('I')
+        edge_weights = array('I')
+        for term in terms:
+            strongest = sorted(edges.get(term, {}).items(), key=lambda item: (-item[1], item[0]))
+            for other, weight in strongest[:max_neighbors]:
+                if other in index:
+                    targets.append(index[other])
+                    edge_weights.append(min(weight, MAX_WEIGHT))
+            edge_offsets.append(len(targets))
+
+        display_offsets = array('I', [len(blob)])
+        for term in terms:
+            blob += displays.get(term, term).encode('utf-8')
+            display_offsets.append(len(blob))
+
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, generation, count, len(targets), len(blob)))
+            for part in (offsets, term_weights, tree, edge_offsets, targets, edge_weights, display_offsets):
+                part.tofile(f)
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+
+    def key(self, i: int) -> bytes:
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]])
+
+    def term(self, i: int) -> str:
+        return self.key(i).decode('utf-8')
+
+    def display(self, i: int) -> str:
+        """The term as first seen, before lowercasing"""
+        if self._display_offsets is None:
+            return self.term(i)
+        return bytes(self._blob[self._display_offsets[i]:self._display_offsets[i + 1]]).decode('utf-8')
+
+    def weight(self, i: int) -> int:
+        return self._weights[i]
+
+    def find(self, term: str) -> Optional[int]:
+        key = term.encode('utf-8')
+        i = bisect_left(self._terms, key)
+        return i if i < self.count and self.key(i) == key else None
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        key = prefix.encode('utf-8')
+        lo = bisect_left(self._terms, key)
+        # 0xff never occurs in UTF-8, so it sorts after every term with this prefix
+        return lo, bisect_left(self._terms, key + b'\xff', lo)
+
+    def top(self, lo: int, hi: int, k: int) -> List[int]:
+        """Indexes of the k heaviest terms in [lo, hi), heaviest first"""
+        if lo >= hi or k <= 0:
+            return []
+        weights = self._weights
+        best = self._heaviest(lo, hi)
+        heap = [(-weights[best], best, lo, hi)]
+        result = []
+        while heap and len(result) < k:
+            _, i, start, end = heapq.heappop(heap)
+            result.append(i)
+            for a, b in ((start, i), (i + 1, end)):
+                if a < b:
+                    j = self._heaviest(a, b)
+                    heapq.heappush(heap, (-weights[j], j, a, b))
+        return result
+
+    def neighbors(self, i: int, displays: Optional[Dict[str, str]] = None) -> List[Tuple[str, int]]:
+        """(term, co-occurrences) for term i; fills displays with their display forms when given"""
+        neighbors = []
+        for j in range(self._edge_offsets[i], self._edge_offsets[i + 1]):
+            term = self.term(self._targets[j])
+            neighbors.append((term, self._edge_weights[j]))
+            if displays is not None:
+                displays[term] = self.display(self._targets[j])
+        return neighbors
+
+    def items(self) -> Iterable[Tuple[str, str, int, List[Tuple[str, int]]]]:
+        """(term, display form, weight, neighbors) for every term"""
+        for i in range(self.count):
+            yield self.term(i), self.display(i), self._weights[i], self.neighbors(i)
+
+    def _heaviest(self, lo: int, hi: int) -> int:
+        tree, weights = self._tree, self._weights
+        best = -1
+        lo += self.count
+        hi += self.count
+        while lo < hi:
+            if lo & 1:
+                candidate = tree[lo]
+                if best < 0 or (weights[candidate], -candidate) > (weights[best], -best):
+                    best = candidate
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                candidate = tree[hi]
+                if best < 0 or (weights[candidate], -candidate) > (weights[best], -best):
+                    best = candidate
+            lo >>= 1
+            hi >>= 1
+        return best
+
+
+class KeywordIndex:
+    """Local keyword index for autocomplete and expansions without the LLM.
+
+    A memory-mapped KeywordSegment holds everything up to the last
+    compaction. Generated keywords and imported lists are appended to a log
+    since then. Every worker process tails that log into a small in-memory
+    delta, so a fold-back reaches all workers within `refresh_seconds`. Once
+    the log passes `compact_bytes`, one worker merges it into a new segment
+    in the background. A keyword's weight counts how often it was generated,
+    plus any imported volume. Two keywords co-occur when they were generated
+    for the same seed or imported in the same list. Keywords are matched
+    lowercased, and handed back in the casing they were first seen with.
+    Workers coordinate through flock; without fcntl (Windows) from_env()
+    leaves the index off, and the locks only cover a single process.
+    """
+
+    def __init__(self, directory: str, min_results: int = 3, max_neighbors: int = 32,
+                 compact_bytes: int = 1024 * 1024, refresh_seconds: float = 1.0):
+        self.directory = directory
+        self.min_results = min_results
+        self.max_neighbors = max_neighbors
+        self.compact_bytes = compact_bytes
+        self.refresh_seconds = refresh_seconds
+        os.makedirs(directory, exist_ok=True)
+        self.segment_path = os.path.join(directory, 'keywords.idx')
+        # Shared by log appends, exclusive while a compaction swaps segments
+        self._write_lock_path = os.path.join(directory, 'keywords.lock')
+        # Held for a whole compaction, so only one worker runs one
+        self._compact_lock_path = os.path.join(directory, 'keywords.compact.lock')
+
+        self._lock = threading.RLock()
+        self._segment = KeywordSegment()
+        self._segment_stamp = None
+        self._log_offset = 0
+        self._checked = 0.0
+        self._compacting = False
+        self._stats = {'warm': 0, 'cold': 0, 'folded': 0, 'compactions': 0}
+        self._reset_delta()
+        self._refresh(force=True)
+
+    @classmethod
+    def from_env(cls) -> Optional['KeywordIndex']:
+        if os.getenv('KEYWORD_INDEX_ENABLED', 'true').lower() == 'false':
+            return None
+        if fcntl is None:
+            print("Warning: fcntl is not available, keyword index disabled")
+            return None
+        return cls(
+            directory=os.getenv('KEYWORD_INDEX_DIR', os.path.join('cache', 'keywords')),
+            min_results=int(os.getenv('KEYWORD_INDEX_MIN_RESULTS', 3)),
+            compact_bytes=int(os.getenv('KEYWORD_INDEX_COMPACT_BYTES', 1024 * 1024)),
+            refresh_seconds=float(os.getenv('KEYWORD_INDEX_REFRESH_SECONDS', 1))
+        )
+
+    def prefix(self, query: str, limit: int = 10,
+               displays: Optional[Dict[str, str]] = None) -> List[Tuple[str, int]]:
+        """Heaviest keywords starting with query, as (keyword, weight).
+
+        `displays`, when given, collects the display forms the segment
+        lookups came across, which spares looking each one up again.
+        """
+        query = normalize_keyword(query)
+        if not query:
+            return []
+        with self._lock:
+            self._refresh()
+            segment = self._segment
+            lo, hi = segment.prefix_range(query)
+            candidates = {}
+            for i in segment.top(lo, hi, limit):
+                term = segment.term(i)
+                candidates[term] = segment.weight(i)
+                if displays is not None:
+                    displays[term] = segment.display(i)
+            # Terms folded in since the last compaction are few, and carry their full weight
+            for term in self._delta_terms[bisect_left(self._delta_terms, query):]:
+                if not term.startswith(query):
+                    break
+                candidates[term] = self._delta_weights[term]
+        return sorted(candidates.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    def related(self, keyword: str, limit: int = 10,
+                displays: Optional[Dict[str, str]] = None) -> List[Tuple[str, int]]:
+        """Keywords most often seen together with keyword, as (keyword, co-occurrences);
+        `displays` as for prefix()"""
+        keyword = normalize_keyword(keyword)
+        with self._lock:
+            self._refresh()
+            i = self._segment.find(keyword)
+            counts = Counter(dict(self._segment.neighbors(i, displays))) if i is not None else Counter()
+            counts.update(self._delta_edges.get(keyword, {}))
+        return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    def suggest(self, query: str, limit: int = 10) -> Dict:
+        """Autocomplete for query: completions, and keywords related to it"""
+        normalized = normalize_keyword(query)
+        completions = [item for item in self.prefix(normalized, limit + 1) if item[0] != normalized]
+        related = self.related(normalized, limit)
+        return {
+            'query': normalized,
+            'prefix': [{'keyword': term, 'weight': weight} for term, weight in completions[:limit]],
+            'related': [{'keyword': term, 'cooccurrences': count} for term, count in related]
+        }
+
+    def expansions(self, seed: str, limit: int) -> Optional[List[str]]:
+        """Up to limit keywords for seed in their display form, or None while it is cold
+        (fewer than min_results, or than limit when that is smaller)"""
+        seed = normalize_keyword(seed)
+        seen = {seed}
+        keywords = []
+        displays: Dict[str, str] = {}
+        for term, _ in self.related(seed, limit, displays) + self.prefix(seed, limit + 1, displays):
+            if term not in seen:
+                seen.add(term)
+                keywords.append(term)
+        warm = len(keywords) >= min(self.min_results, limit)
+        with self._lock:
+            self._stats['warm' if warm else 'cold'] += 1
+            if not warm:
+                return None
+            # Terms new since the compaction are not in the segment, so displays lacks them
+            return [self._delta_displays.get(term) or displays.get(term) or self._display(term)
+                    for term in keywords[:limit]]
+
+    def add(self, seed: str, keywords: List[str]):
+        """Fold keywords generated for seed back into the index"""
+        self._append([{'seed': seed, 'keywords': list(keywords)}])
+
+    def import_list(self, keywords: List[Tuple[str, int]], seed: Optional[str] = None) -> int:
+        """Import (keyword, weight) pairs as one list; returns how many were accepted"""
+        record = self._import_record(keywords, seed)
+        if record['keywords']:
+            self._append([record])
+        return len(record['keywords'])
+
+    def import_lists(self, lists: List[Dict]) -> int:
+        """Import [{seed?, keywords: [keyword or {keyword, volume}]}, ...]; all are checked first"""
+        parsed = []
+        for item in lists:
+            keywords = item.get('keywords') if isinstance(item, dict) else None
+            if not isinstance(keywords, list):
+                raise ValueError('every list needs a keywords array')
+            seed = item.get('seed')
+            if seed is not None and not isinstance(seed, str):
+                raise ValueError('seed must be a string')
+            entries = []
+            for keyword in keywords:
+                volume = 1
+                if isinstance(keyword, dict):
+                    keyword, volume = keyword.get('keyword'), keyword.get('volume', 1)
+                if not isinstance(keyword, str) or not isinstance(volume, int) or volume < 0:
+                    raise ValueError('keywords must be strings or {keyword, volume} objects')
+                entries.append((keyword, volume))
+            parsed.append((seed, entries))
+        records = [self._import_record(entries, seed) for seed, entries in parsed]
+        self._append([record for record in records if record['keywords']])
+        return sum(len(record['keywords']) for record in records)
+
+    def compact(self) -> bool:
+        """Merge the log into a new segment; False when another worker is already doing so"""
+        with _locked(self._compact_lock_path, blocking=False) as acquired:
+            if not acquired:
+                return False
+            segment = KeywordSegment(self.segment_path) if os.path.exists(self.segment_path) else KeywordSegment()
+            log_path = self._log_path(segment.generation)
+
+            weights: Dict[str, int] = {}
+            edges: Dict[str, Counter] = {}
+            displays: Dict[str, str] = {}
+            for term, display, weight, neighbors in segment.items():
+                weights[term] = weight
+                displays[term] = display
+                if neighbors:
+                    edges[term] = Counter(dict(neighbors))
+
+            def bump(term: str, weight: int, display: str):
+                weights[term] = weights.get(term, 0) + weight
+                displays.setdefault(term, display)
+
+            def link(a: str, b: str):
+                edges.setdefault(a, Counter())[b] += 1
+                edges.setdefault(b, Counter())[a] += 1
+
+            # Merge what is logged so far without blocking writers...
+            merged = self._read_log(log_path, 0, lambda record: fold(record, bump, link))
+            temporary = f'{self.segment_path}.next'
+            KeywordSegment.write(temporary, segment.generation + 1, weights, edges, self.max_neighbors, displays)
+            # ...then, with them held off, carry over what was appended meanwhile and swap
+            with _locked(self._write_lock_path):
+                tail = b''
+                if os.path.exists(log_path):
+                    with open(log_path, 'rb') as f:
+                        f.seek(merged)
+                        tail = f.read()
+                if tail:
+                    with open(self._log_path(segment.generation + 1), 'ab') as f:
+                        f.write(tail)
+                os.replace(temporary, self.segment_path)
+                if os.path.exists(log_path):
+                    os.remove(log_path)
+        with self._lock:
+            self._stats['compactions'] += 1
+            self._refresh(force=True)
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._refresh()
+            return {
+                'generation': self._segment.generation,
+                'terms': self._segment.count,
+                'edges': self._segment.edge_count,
+                'recent_terms': len(self._delta_terms),
+                'log_bytes': self._log_offset,
+                **self._stats
+            }
+
+    def _log_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f'keywords.{generation}.log')
+
+    def _disk_generation(self) -> int:
+        try:
+            with open(self.segment_path, 'rb') as f:
+                header = f.read(HEADER.size)
+        except FileNotFoundError:
+            return 0
+        return HEADER.unpack(header)[2] if len(header) == HEADER.size else 0
+
+    @staticmethod
+    def _import_record(keywords: List[Tuple[str, int]], seed: Optional[str]) -> Dict:
+        keywords = [(keyword, weight) for keyword, weight in keywords if normalize_keyword(keyword)]
+        return {
+            'seed': seed,
+            'keywords': [keyword for keyword, _ in keywords],
+            'weights': [weight for _, weight in keywords]
+        }
+
+    def _append(self, records: List[Dict]):
+        if not records:
+            return
+        lines = ''.join(json.dumps(record) + '\n' for record in records).encode('utf-8')
+        with _locked(self._write_lock_path, shared=True):
+            # Append to the generation on disk now, which may be newer than the one loaded
+            with open(self._log_path(self._disk_generation()), 'ab') as f:
+                f.write(lines)
+        with self._lock:
+            self._stats['folded'] += len(records)
+            self._refresh(force=True)
+            compact = self._log_offset >= self.compact_bytes and not self._compacting
+            if compact:
+                self._compacting = True
+        if compact:
+            threading.Thread(target=self._compact_in_background, name='keyword-index-compact',
+                             daemon=True).start()
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    def _reset_delta(self):
+        self._delta_terms: List[str] = []  # sorted
+        self._new_terms: List[str] = []  # not yet merged into _delta_terms
+        self._delta_weights: Dict[str, int] = {}  # full weight: segment's plus recent
+        self._delta_edges: Dict[str, Counter] = {}
+        self._delta_displays: Dict[str, str] = {}  # only for terms the segment lacks
+        self._log_offset = 0
+
+    def _bump(self, term: str, weight: int, display: str):
+        if term not in self._delta_weights:
+            self._new_terms.append(term)
+            i = self._segment.find(term)
+            self._delta_weights[term] = self._segment.weight(i) if i is not None else 0
+            if i is None:
+                self._delta_displays[term] = display
+        self._delta_weights[term] += weight
+
+    def _display(self, term: str) -> str:
+        if term in self._delta_displays:
+            return self._delta_displays[term]
+        i = self._segment.find(term)
+        return self._segment.display(i) if i is not None else term
+
+    def _link(self, a: str, b: str):
+        self._delta_edges.setdefault(a, Counter())[b] += 1
+        self._delta_edges.setdefault(b, Counter())[a] += 1
+
+    def _refresh(self, force: bool = False):
+        """Pick up a new segment from a compaction, and log lines from any worker"""
+        now = time.monotonic()
+        if not force and now - self._checked < self.refresh_seconds:
+            return
+        self._checked = now
+        try:
+            stat = os.stat(self.segment_path)
+            stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if stamp != self._segment_stamp:
+            self._segment = KeywordSegment(self.segment_path) if stamp is not None else KeywordSegment()
+            self._segment_stamp = stamp
+            self._reset_delta()
+        self._log_offset = self._read_log(
+            self._log_path(self._segment.generation), self._log_offset,
+            lambda record: fold(record, self._bump, self._link)
+        )
+        if self._new_terms:
+            # One sort per refresh: timsort merges the sorted run with the new terms
+            self._delta_terms.extend(self._new_terms)
+            self._delta_terms.sort()
+            self._new_terms = []
+
+    @staticmethod
+    def _read_log(path: str, offset: int, apply: Callable[[Dict], None]) -> int:
+        """Apply complete records after offset; returns the offset just past the last one"""
+        try:
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return offset
+        # A line still being appended is picked up on a later read
+        end = chunk.rfind(b'\n') + 1
+        for line in chunk[:end].splitlines():
+            try:
+                apply(json.loads(line))
+            except ValueError:
+                continue
+        return offset + end
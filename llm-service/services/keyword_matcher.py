@@ -0,0 +1,86 @@
+import os
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple
+
+# Words are runs of letters/digits/underscores; punctuation and whitespace
+# between them are ignored, so "digital-marketing" matches "digital marketing"
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over word tokens for a fixed set of keywords.
+
+    Matching on whole tokens instead of characters means every hit is
+    word-boundary correct and the scan does one step per word, not per char.
+    """
+
+    def __init__(self, keywords: Sequence[str]):
+        self.keywords = list(keywords)
+        self.lengths = [len(tokenize(keyword)) for keyword in self.keywords]
+
+        # State 0 is the root; goto[state] maps a token to the next state
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[int]] = [[]]
+
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for token in tokenize(keyword):
+                next_state = self.goto[state].get(token)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][token] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            if state:
+                self.output[state].append(index)
+
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(token, 0)
+                # Inherit shorter keywords that end at the same token
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def find_positions(self, tokens: Sequence[str]) -> List[List[int]]:
+        """Word-index start positions of every keyword, in one pass over tokens.
+
+        Hits of the same keyword never overlap, mirroring re.findall.
+        """
+        positions: List[List[int]] = [[] for _ in self.keywords]
+        next_free = [0] * len(self.keywords)
+        goto, fail, output, lengths = self.goto, self.fail, self.output, self.lengths
+
+        state = 0
+        for position, token in enumerate(tokens):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for index in output[state]:
+                start = position - lengths[index] + 1
+                if start >= next_free[index]:
+                    positions[index].append(start)
+                    next_free[index] = position + 1
+        return positions
+
+
+@lru_cache(maxsize=int(os.getenv('KEYWORD_MATCHER_CACHE_SIZE', 256)))
+def get_matcher(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    """Compiled automata are reused for keyword sets that repeat"""
+    return KeywordMatcher(keywords)
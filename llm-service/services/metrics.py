@@ -0,0 +1,276 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Request and upstream latencies (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# In-process work such as parsing and scoring
+FAST_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return super().render() + [
+            f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}' for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+        lines = super().render()
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Gauge(_Metric):
+    """Read at scrape time from a callback.
+
+    The callback returns a number, or a dict keyed by label value tuples
+    for labelled gauges.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, collect: Callable[[], object],
+                 labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        values = self.collect()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return super().render() + [
+            f'{self.name}{_format_labels(self.labelnames, key if isinstance(key, tuple) else (key,))} '
+            f'{_format_value(value)}'
+            for key, value in sorted(values.items())
+        ]
+
+
+class Registry:
+    """Metrics for one process, rendered in the Prometheus text format"""
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        # Re-registering a name replaces it, so re-imported apps do not clash
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, collect: Callable[[], object],
+              labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, collect, labelnames))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # One broken gauge callback should not take the whole scrape down
+                lines.append(f'# {metric.name} unavailable: {_escape(e)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'llm_service_request_duration_seconds', 'HTTP request latency by route',
+    ['route', 'method', 'status']
+)
+REQUEST_ERRORS = REGISTRY.counter(
+    'llm_service_request_errors_total', 'Responses with a 5xx status by route',
+    ['route', 'status']
+)
+UPSTREAM_SECONDS = REGISTRY.histogram(
+    'llm_upstream_duration_seconds',
+    'Time spent getting a completion upstream, including rate-limit waits and retries',
+    ['endpoint']
+)
+UPSTREAM_ATTEMPT_SECONDS = REGISTRY.histogram(
+    'llm_upstream_attempt_duration_seconds', 'Latency of single upstream attempts by outcome',
+    ['outcome']
+)
+UPSTREAM_ERRORS = REGISTRY.counter(
+    'llm_upstream_errors_total', 'Upstream calls that failed for good, by HTTP status',
+    ['status']
+)
+UPSTREAM_QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    'llm_upstream_queue_wait_seconds', 'Time calls waited for an upstream slot, by priority class',
+    ['priority']
+)
+UPSTREAM_SHED = REGISTRY.counter(
+    'llm_upstream_shed_total', 'Calls dropped after waiting past their deadline for an upstream slot',
+    ['priority']
+)
+UPSTREAM_TARGET_REQUESTS = REGISTRY.counter(
+    'llm_upstream_target_requests_total', 'Upstream attempts per routed target by outcome',
+    ['target', 'outcome']
+)
+PARSE_SECONDS = REGISTRY.histogram(
+    'llm_response_parse_duration_seconds', 'Cleanup and JSON parsing of model output',
+    ['endpoint'], FAST_BUCKETS
+)
+TOKENS = REGISTRY.counter(
+    'llm_tokens_total', 'Tokens reported by the upstream API', ['endpoint', 'type']
+)
+SIMILAR_CACHE_HITS = REGISTRY.counter(
+    'llm_similar_cache_hits_total', 'Completions served for a near-duplicate earlier input', ['endpoint']
+)
+KEYWORD_INDEX_LOOKUPS = REGISTRY.counter(
+    'llm_keyword_index_lookups_total',
+    'Keyword seeds answered from the local keyword index (warm) or sent upstream (cold)', ['result']
+)
+MOCK_FALLBACKS = REGISTRY.counter(
+    'llm_mock_fallbacks_total', 'Failed upstream calls answered with mock output', ['endpoint']
+)
+SEO_METRIC_SECONDS = REGISTRY.histogram(
+    'seo_metric_duration_seconds', 'SEOScorer compute time per metric', ['metric'], FAST_BUCKETS
+)
+
+
+def record_usage(endpoint: str, usage):
+    """Count prompt/completion tokens from an API usage object, if present"""
+    if usage is None:
+        return
+    for kind in ('prompt', 'completion'):
+        tokens = getattr(usage, f'{kind}_tokens', None)
+        if isinstance(tokens, int):
+            TOKENS.inc(tokens, endpoint=endpoint, type=kind)
+
+
+def record_request(route: str, method: str, status: int, duration: float):
+    REQUEST_SECONDS.observe(duration, route=route, method=method, status=status)
+    if status >= 500:
+        REQUEST_ERRORS.inc(route=route, status=status)
+
+
+def register_service_gauges(registry: Registry, openai_service, job_queue: Optional[object] = None):
+    """Queue depth and in-flight gauges for an app's service objects"""
+    from .startup import STARTUP
+
+    registry.gauge('llm_startup_phase_seconds', 'Duration of each import and startup phase of this process',
+                   STARTUP.gauge, ['phase'])
+    scheduler = openai_service.scheduler
+    registry.gauge('llm_upstream_in_flight', 'Upstream calls currently holding a concurrency slot',
+                   lambda: scheduler.limiter.in_flight)
+    registry.gauge('llm_upstream_concurrency_limit', 'Current adaptive upstream concurrency limit',
+                   lambda: int(scheduler.limiter.limit))
+    registry.gauge('llm_upstream_queued', 'Calls waiting for an upstream slot, by priority class',
+                   scheduler.queue.depths, ['priority'])
+    registry.gauge('llm_coalesced_in_flight', 'Distinct completion requests in flight after coalescing',
+                   openai_service.inflight.in_flight)
+    router = getattr(openai_service, 'router', None)
+    if router is not None:
+        registry.gauge('llm_upstream_target_healthy', 'Whether a routed upstream target is taking traffic',
+                       router.healthy, ['target'])
+    if job_queue is not None:
+        def queue_depth() -> Dict:
+            stats = job_queue.stats()
+            return {(status,): stats[status] for status in ('queued', 'running')}
+        registry.gauge('llm_job_queue_depth', 'Generation jobs waiting or running, by status',
+                       queue_depth, ['status'])
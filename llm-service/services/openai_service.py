@@ -1,60 +1,391 @@
-import openai
 import os
 import json
-from typing import List, Dict, Any
+import re
+import time
+from typing import Callable, Iterator, List, Dict, Any, Optional, Tuple
+from . import json_codec
+from .completion_cache import CompletionCache
+from .keyword_index import KeywordIndex
+from .metrics import (KEYWORD_INDEX_LOOKUPS, MOCK_FALLBACKS, PARSE_SECONDS, SIMILAR_CACHE_HITS,
+                      UPSTREAM_SECONDS, record_usage)
+from .schemas import KEYWORDS_SCHEMA, TITLES_SCHEMA, TOPICS_SCHEMA, TRANSITIONS_SCHEMA, validate
+from .similarity_cache import SimilarityCache
+from .single_flight import SingleFlight
+from .startup import LazyClient
+from .upstream_router import UpstreamRouter
+from .upstream_scheduler import UpstreamError, UpstreamScheduler, is_upstream_failure
+
+# How much of the introduction each section prompt carries as shared context
+INTRO_CONTEXT_CHARS = 1200
+# Keywords per generate_keywords answer, from the model or from the keyword index
+KEYWORD_COUNT = 5
+
+
+def excerpt(text: str, limit: int) -> str:
+    text = ' '.join(text.split())
+    return text if len(text) <= limit else text[:limit].rsplit(' ', 1)[0] + '...'
+
+
+def first_sentence(text: str) -> str:
+    match = re.search(r'.+?[.!?](?=\s|$)', ' '.join(text.split()))
+    return match.group(0) if match else text
+
+
+def last_sentence(text: str) -> str:
+    sentences = re.findall(r'[^.!?]+[.!?]+', ' '.join(text.split()))
+    return sentences[-1].strip() if sentences else text
+
 
 class OpenAIService:
+    asynchronous = False
+    
     def __init__(self):
+        # LLM_UPSTREAMS spreads calls over several endpoints/keys; the router
+        # takes the client's place, so nothing downstream needs to know
+        self.router = UpstreamRouter.from_env(self._create_client, asynchronous=self.asynchronous)
         api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
+        if self.router is not None:
+            self.client = self.router
+        elif not api_key:
             print("Warning: OPENAI_API_KEY not found, service will use mock responses")
             self.client = None
         else:
-            self.client = openai.OpenAI(api_key=api_key)
+            self.client = self._create_client(api_key)
+        
+        self.model = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+        
+        # Completion cache - LLM_CACHE_DISABLED_ENDPOINTS opts single methods out
+        self.cache = CompletionCache.from_env()
+        self.cache_disabled_endpoints = {
+            name.strip() for name in os.getenv('LLM_CACHE_DISABLED_ENDPOINTS', '').split(',') if name.strip()
+        }
+        # Near-duplicate inputs ("best CRM tools" / "crm tools best") reuse earlier output
+        self.similar = SimilarityCache.from_env()
+        # Seeds the local keyword index already knows well are answered without a completion
+        self.keyword_index = KeywordIndex.from_env()
+        
+        # Identical prompts already in flight share one upstream request
+        self.inflight = SingleFlight()
+        self.coalesce_timeout = float(os.getenv('LLM_COALESCE_TIMEOUT', 120))
+        
+        # Rate limits, adaptive concurrency and retries for every upstream call.
+        # Upstream failures only turn into mock output when explicitly enabled.
+        self.scheduler = UpstreamScheduler.from_env()
+        self.mock_fallback = os.getenv('LLM_MOCK_FALLBACK', 'false').lower() == 'true'
+    
+    def _create_client(self, api_key: str, base_url: Optional[str] = None):
+        # Retries are owned by the scheduler, not the SDK. Each client pools
+        # its own keep-alive connections. The SDK is imported on first use.
+        def build():
+            import openai
+            return openai.OpenAI(
+                api_key=api_key,
+                base_url=base_url or os.getenv('OPENAI_BASE_URL') or None,
+                max_retries=0,
+                timeout=float(os.getenv('OPENAI_TIMEOUT', 60))
+            )
+        return LazyClient(build)
+    
+    def _estimate_tokens(self, prompt: str, max_tokens: int) -> int:
+        """Tokens-per-minute reservation: ~4 chars per prompt token plus the completion cap"""
+        return len(prompt) // 4 + max_tokens
+    
+    def _fallback(self, endpoint: str, error: Exception, mock: Callable[..., Any], *args) -> Any:
+        """Serve mock output for a failed call only when LLM_MOCK_FALLBACK=true.
+
+        Only upstream and transport failures count; anything else is a bug
+        here and is re-raised as it is, to surface as a 500.
+        """
+        if not is_upstream_failure(error):
+            raise error
+        if not self.mock_fallback:
+            if isinstance(error, UpstreamError):
+                raise error
+            raise UpstreamError(str(error)) from error
+        print(f"OpenAI API error: {error}")
+        MOCK_FALLBACKS.inc(endpoint=endpoint)
+        return mock(*args)
+    
+    def _complete(self, endpoint: str, prompt: str, temperature: float, max_tokens: int,
+                  schema: Optional[Dict] = None, use_cache: bool = True,
+                  similar: Optional[Tuple[str, str]] = None) -> Any:
+        """Run one chat completion and parse it, going through the cache.
+
+        With a schema the output is parsed as JSON, validated and returned as
+        native data; without one the text is returned as is.
+        similar is (user input, extra scope) for endpoints that may reuse the
+        output of a near-identical earlier input; see SimilarityCache.
+        use_cache=False skips the lookup but still refreshes the stored entry.
+        Only parsed, successful output is cached. Concurrent callers with the
+        same fingerprint wait on a single upstream call and share its result.
+        """
+        cache = self.cache if endpoint not in self.cache_disabled_endpoints else None
+        key = CompletionCache.make_key(endpoint, self.model, prompt, temperature, max_tokens)
+        
+        if cache and use_cache:
+            cached = cache.get(key)
+            if cached is not None:
+                return json_codec.loads(cached) if schema else cached
+        
+        near = self._near_key(endpoint, temperature, max_tokens, similar)
+        if near and use_cache:
+            stored = self.similar.get(*near)
+            if stored is not None:
+                SIMILAR_CACHE_HITS.inc(endpoint=endpoint)
+                return json_codec.loads(stored) if schema else stored
+        
+        def fetch() -> Any:
+            with UPSTREAM_SECONDS.time(endpoint=endpoint):
+                response = self.scheduler.call(
+                    lambda: self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=temperature,
+                        max_tokens=max_tokens
+                    ),
+                    self._estimate_tokens(prompt, max_tokens)
+                )
+            record_usage(endpoint, getattr(response, 'usage', None))
+            content = response.choices[0].message.content.strip()
+            return self._store(cache, key, endpoint, content, schema, near)
+        
+        return self.inflight.do(key, fetch, timeout=self.coalesce_timeout)
+    
+    def _near_key(self, endpoint: str, temperature: float, max_tokens: int,
+                  similar: Optional[Tuple[str, str]]) -> Optional[Tuple[str, str, str]]:
+        """(endpoint, scope, text) for the similarity cache, or None when it does not apply"""
+        if similar is None or self.similar is None or not self.similar.enabled(endpoint):
+            return None
+        text, extra = similar
+        return endpoint, f'{self.model}|{temperature}|{max_tokens}|{extra}', text
+    
+    def _store(self, cache: Optional[CompletionCache], key: str, endpoint: str,
+               content: str, schema: Optional[Dict], near: Optional[Tuple[str, str, str]] = None) -> Any:
+        """Parse and validate model output, then cache it (JSON text for structured endpoints)"""
+        if schema is None:
+            result = content
+        else:
+            try:
+                with PARSE_SECONDS.time(endpoint=endpoint):
+                    result = self._parse_json(content, schema)
+            except ValueError as e:
+                raise UpstreamError(f'malformed model output: {e}', 502) from e
+        stored = content if schema is None else json_codec.dumps(result).decode('utf-8')
+        if cache:
+            cache.set(key, stored, endpoint)
+        if near:
+            self.similar.set(*near, stored)
+        return result
+    
+    def _parse_json(self, content: str, schema: Dict) -> Any:
+        """Strip markdown fences, parse the JSON and check it against schema"""
+        # Clean up the response to ensure it's valid JSON
+        if content.startswith('```json'):
+            content = content.replace('```json', '').replace('```', '').strip()
+        return validate(json_codec.loads(content), schema)
+    
+    def generate_keywords(self, seed_keyword: str, use_cache: bool = True, native: bool = False):
+        """Generate SEO keywords based on seed keyword.
+
+        Returns a JSON string (v1 format), or the list itself with native=True.
+        """
+        keywords = self._indexed_keywords(seed_keyword, use_cache)
+        if keywords is None and not self.client:
+            keywords = self._get_mock_keywords(seed_keyword)
+        elif keywords is None:
+            prompt = self._keywords_prompt(seed_keyword)
+            try:
+                keywords = self._complete(
+                    'generate_keywords', prompt, 0.7, 200, KEYWORDS_SCHEMA, use_cache, (seed_keyword, '')
+                )
+                self._fold_keywords(seed_keyword, keywords)
+            except Exception as e:
+                keywords = self._fallback('generate_keywords', e, self._get_mock_keywords, seed_keyword)
+        
+        return keywords if native else json.dumps(keywords)
+    
+    def _indexed_keywords(self, seed_keyword: str, use_cache: bool) -> Optional[List[str]]:
+        """Keywords for a warm seed from the local index; None means ask the model"""
+        if self.keyword_index is None or not use_cache:
+            return None
+        keywords = self.keyword_index.expansions(seed_keyword, KEYWORD_COUNT)
+        KEYWORD_INDEX_LOOKUPS.inc(result='cold' if keywords is None else 'warm')
+        return keywords
+    
+    def _fold_keywords(self, seed_keyword: str, keywords: List[str]):
+        """Add generated keywords to the local index, so the seed warms up"""
+        if self.keyword_index is not None:
+            self.keyword_index.add(seed_keyword, keywords)
+    
+    def generate_titles(self, keyword: str, tone: str = "professional", use_cache: bool = True,
+                        native: bool = False):
+        """Generate SEO-optimized titles (a JSON string, or a list with native=True)"""
+        if not self.client:
+            titles = self._get_mock_titles(keyword, tone)
+        else:
+            prompt = self._titles_prompt(keyword, tone)
+            try:
+                titles = self._complete(
+                    'generate_titles', prompt, 0.8, 300, TITLES_SCHEMA, use_cache, (keyword, tone)
+                )
+            except Exception as e:
+                titles = self._fallback('generate_titles', e, self._get_mock_titles, keyword, tone)
+        
+        return titles if native else json.dumps(titles)
     
-    def generate_keywords(self, seed_keyword: str) -> str:
-        """Generate SEO keywords based on seed keyword"""
+    def generate_topics(self, title: str, keyword: str, use_cache: bool = True, native: bool = False):
+        """Generate topic outlines (a JSON string, or a list of outlines with native=True)"""
         if not self.client:
-            return self._get_mock_keywords(seed_keyword)
+            topics = self._get_mock_topics(title, keyword)
+        else:
+            prompt = self._topics_prompt(title, keyword)
+            try:
+                topics = self._complete('generate_topics', prompt, 0.7, 800, TOPICS_SCHEMA, use_cache)
+            except Exception as e:
+                topics = self._fallback('generate_topics', e, self._get_mock_topics, title, keyword)
         
-        prompt = f"""
-        Generate 5 SEO-focused keywords related to: "{seed_keyword}"
+        return topics if native else json.dumps(topics)
+    
+    def generate_content(self, title: str, keyword: str, outline: Dict, 
+                        content_type: str = 'blog_intro', word_count: int = 150,
+                        use_cache: bool = True) -> str:
+        """Generate content based on parameters"""
+        if not self.client:
+            return self._get_mock_content(title, keyword, content_type, word_count)
         
-        Requirements:
-        - Include long-tail keywords
-        - Focus on commercial intent when appropriate
-        - Avoid overly competitive terms
-        - Return as JSON array only
+        prompt = self._content_prompt(title, keyword, outline, content_type, word_count)
         
-        Format: ["keyword1", "keyword2", "keyword3", "keyword4", "keyword5"]
+        try:
+            # max_tokens of twice the word count allows for some flexibility
+            return self._complete('generate_content', prompt, 0.7, word_count * 2, use_cache=use_cache)
+        except Exception as e:
+            return self._fallback(
+                'generate_content', e, self._get_mock_content, title, keyword, content_type, word_count
+            )
+    
+    def generate_section(self, title: str, keyword: str, outline: Dict, index: int, intro: str,
+                         word_count: int = 300, use_cache: bool = True) -> str:
+        """Body of outline['sections'][index], written to fit between its neighbours"""
+        section = outline['sections'][index]
+        if not self.client:
+            return self._get_mock_section(keyword, section, word_count)
+        
+        prompt = self._section_prompt(title, keyword, outline, index, intro, word_count)
+        try:
+            return self._complete('generate_section', prompt, 0.7, word_count * 2, use_cache=use_cache)
+        except Exception as e:
+            return self._fallback('generate_section', e, self._get_mock_section, keyword, section, word_count)
+    
+    def generate_transitions(self, title: str, keyword: str, headings: List[str], bodies: List[str],
+                             use_cache: bool = True) -> Dict:
+        """Consistency pass over separately written sections.
+
+        Only the first and last sentence of each section are sent, and the
+        model returns one bridging sentence per section boundary plus a short
+        conclusion, so the pass stays cheap however long the article is.
         """
+        if not self.client:
+            return self._get_mock_transitions(keyword, headings)
         
+        prompt = self._transitions_prompt(title, keyword, headings, bodies)
+        max_tokens = 60 * len(headings) + 200
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
+            transitions = self._complete(
+                'generate_transitions', prompt, 0.5, max_tokens, TRANSITIONS_SCHEMA, use_cache
+            )
+        except Exception as e:
+            return self._fallback('generate_transitions', e, self._get_mock_transitions, keyword, headings)
+        # The article is stitched with these, so their count has to match
+        if len(transitions['transitions']) != len(headings) - 1:
+            raise UpstreamError(
+                f"malformed model output: expected {len(headings) - 1} transitions, "
+                f"got {len(transitions['transitions'])}", 502
+            )
+        return transitions
+    
+    def generate_content_stream(self, title: str, keyword: str, outline: Dict,
+                                content_type: str = 'blog_intro', word_count: int = 150,
+                                use_cache: bool = True) -> Iterator[Dict]:
+        """Stream content as it is generated.
+
+        Yields {'type': 'token', 'content': ...} events followed by one
+        {'type': 'usage', 'usage': ...} event with token counts.
+        """
+        prompt = self._content_prompt(title, keyword, outline, content_type, word_count)
+        if not self.client:
+            yield from self._stream_mock_content(prompt, title, keyword, content_type, word_count)
+            return
+        
+        cache = self.cache if 'generate_content' not in self.cache_disabled_endpoints else None
+        key = CompletionCache.make_key('generate_content', self.model, prompt, 0.7, word_count * 2)
+        if cache and use_cache:
+            cached = cache.get(key)
+            if cached is not None:
+                yield {'type': 'token', 'content': cached}
+                yield {'type': 'usage', 'usage': {'cached': True}}
+                return
+        
+        parts = []
+        usage = None
+        started = time.perf_counter()
+        # The upstream slot is held until the stream ends; only opening it is retried
+        stream = self.scheduler.stream(
+            lambda: self.client.chat.completions.create(
+                model=self.model,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.7,
-                max_tokens=200
-            )
-            
-            content = response.choices[0].message.content.strip()
-            # Clean up the response to ensure it's valid JSON
-            if content.startswith('```json'):
-                content = content.replace('```json', '').replace('```', '').strip()
-            
-            # Validate JSON
-            keywords = json.loads(content)
-            return json.dumps(keywords)
+                max_tokens=word_count * 2,
+                stream=True,
+                stream_options={"include_usage": True}
+            ),
+            self._estimate_tokens(prompt, word_count * 2)
+        )
+        try:
+            for chunk in stream:
+                # The final chunk carries usage and no choices
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield {'type': 'token', 'content': chunk.choices[0].delta.content}
         except Exception as e:
+            if parts or not self.mock_fallback:
+                # Tokens already reached the client, so a fallback would garble the text
+                raise
             print(f"OpenAI API error: {e}")
-            return self._get_mock_keywords(seed_keyword)
+            MOCK_FALLBACKS.inc(endpoint='generate_content_stream')
+            yield from self._stream_mock_content(prompt, title, keyword, content_type, word_count)
+            return
+        finally:
+            # A client that disconnects mid-stream closes this generator; free the slot now
+            stream.close()
+        
+        # The whole stream counts as upstream time
+        UPSTREAM_SECONDS.observe(time.perf_counter() - started, endpoint='generate_content_stream')
+        record_usage('generate_content_stream', usage)
+        if cache:
+            cache.set(key, ''.join(parts).strip(), 'generate_content')
+        yield {'type': 'usage', 'usage': {
+            'prompt_tokens': usage.prompt_tokens if usage else None,
+            'completion_tokens': usage.completion_tokens if usage else None,
+            'total_tokens': usage.total_tokens if usage else None
+        }}
     
-    def generate_titles(self, keyword: str, tone: str = "professional") -> str:
-        """Generate SEO-optimized titles"""
-        if not self.client:
-            return self._get_mock_titles(keyword, tone)
+    def _keywords_prompt(self, seed_keyword: str) -> str:
+        return f"""
+        Generate {KEYWORD_COUNT} SEO-focused keywords related to: "{seed_keyword}"
+        
+        Requirements:
+        - Include long-tail keywords
+        - Focus on commercial intent when appropriate
+        - Avoid overly competitive terms
+        - Return as JSON array only
         
-        prompt = f"""
+        Format: ["keyword1", "keyword2", "keyword3", "keyword4", "keyword5"]
+        """
+    
+    def _titles_prompt(self, keyword: str, tone: str) -> str:
+        return f"""
         Create 3 SEO-optimized blog titles for keyword: "{keyword}"
         
         Requirements:
@@ -66,31 +397,9 @@ class OpenAIService:
         
         Return as JSON array: ["title1", "title2", "title3"]
         """
-        
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.8,
-                max_tokens=300
-            )
-            
-            content = response.choices[0].message.content.strip()
-            if content.startswith('```json'):
-                content = content.replace('```json', '').replace('```', '').strip()
-            
-            titles = json.loads(content)
-            return json.dumps(titles)
-        except Exception as e:
-            print(f"OpenAI API error: {e}")
-            return self._get_mock_titles(keyword, tone)
     
-    def generate_topics(self, title: str, keyword: str) -> str:
-        """Generate topic outlines"""
-        if not self.client:
-            return self._get_mock_topics(title, keyword)
-        
-        prompt = f"""
+    def _topics_prompt(self, title: str, keyword: str) -> str:
+        return f"""
         Create 2 detailed blog outlines for the title: "{title}"
         Target keyword: "{keyword}"
         
@@ -107,32 +416,10 @@ class OpenAIService:
         
         Return as JSON array with 2 outline variations.
         """
-        
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=800
-            )
-            
-            content = response.choices[0].message.content.strip()
-            if content.startswith('```json'):
-                content = content.replace('```json', '').replace('```', '').strip()
-            
-            topics = json.loads(content)
-            return json.dumps(topics)
-        except Exception as e:
-            print(f"OpenAI API error: {e}")
-            return self._get_mock_topics(title, keyword)
     
-    def generate_content(self, title: str, keyword: str, outline: Dict, 
-                        content_type: str = 'blog_intro', word_count: int = 150) -> str:
-        """Generate content based on parameters"""
-        if not self.client:
-            return self._get_mock_content(title, keyword, content_type, word_count)
-        
-        prompt = f"""
+    def _content_prompt(self, title: str, keyword: str, outline: Dict,
+                        content_type: str, word_count: int) -> str:
+        return f"""
         Write a {content_type} for:
         Title: "{title}"
         Target keyword: "{keyword}"
@@ -147,23 +434,56 @@ class OpenAIService:
         
         Return clean, formatted text only.
         """
+    
+    def _section_prompt(self, title: str, keyword: str, outline: Dict, index: int,
+                        intro: str, word_count: int) -> str:
+        sections = outline['sections']
+        plan = '\n'.join(
+            f"        {'->' if position == index else '  '} {position + 1}. {section['heading']}"
+            for position, section in enumerate(sections)
+        )
+        return f"""
+        You are writing one section of a longer article.
+        Title: "{title}"
+        Target keyword: "{keyword}"
+        Article introduction: {excerpt(intro, INTRO_CONTEXT_CHARS)}
         
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=word_count * 2  # Allow for some flexibility
-            )
-            
-            content = response.choices[0].message.content.strip()
-            return content
-        except Exception as e:
-            print(f"OpenAI API error: {e}")
-            return self._get_mock_content(title, keyword, content_type, word_count)
+        Sections of the article (write only the one marked ->):
+{plan}
+        
+        Section heading: "{sections[index]['heading']}"
+        Points to cover: {json.dumps(sections[index].get('points', []))}
+        
+        Requirements:
+        - Approximately {word_count} words
+        - Do not repeat the heading, re-introduce the topic or conclude the article
+        - Do not cover other sections' points
+        - Use the target keyword naturally at most twice
+        - Markdown paragraphs; ### subheadings are allowed
+        
+        Return the section body only.
+        """
+    
+    def _transitions_prompt(self, title: str, keyword: str, headings: List[str], bodies: List[str]) -> str:
+        summaries = '\n'.join(
+            f"        {position + 1}. {heading}\n"
+            f"           starts: {excerpt(first_sentence(body), 300)}\n"
+            f"           ends: {excerpt(last_sentence(body), 300)}"
+            for position, (heading, body) in enumerate(zip(headings, bodies))
+        )
+        return f"""
+        These sections of the article "{title}" (keyword: "{keyword}") were written separately:
+{summaries}
+        
+        Write one short sentence to close each section and lead into the next
+        ({len(headings) - 1} in total, in order), and a 2-3 sentence conclusion
+        for the whole article that uses the keyword once.
+        
+        Return JSON only: {{"transitions": ["..."], "conclusion": "..."}}
+        """
     
     # Mock responses for development/fallback
-    def _get_mock_keywords(self, seed_keyword: str) -> str:
+    def _get_mock_keywords(self, seed_keyword: str) -> List[str]:
         keywords = [
             f"{seed_keyword} guide",
             f"best {seed_keyword} practices",
@@ -171,17 +491,17 @@ class OpenAIService:
             f"how to {seed_keyword}",
             f"{seed_keyword} strategy 2024"
         ]
-        return json.dumps(keywords)
+        return keywords
     
-    def _get_mock_titles(self, keyword: str, tone: str) -> str:
+    def _get_mock_titles(self, keyword: str, tone: str) -> List[str]:
         titles = [
             f"The Complete Guide to {keyword}",
             f"{keyword}: Best Practices and Expert Tips",
             f"How to Master {keyword} in 2024"
         ]
-        return json.dumps(titles)
+        return titles
     
-    def _get_mock_topics(self, title: str, keyword: str) -> str:
+    def _get_mock_topics(self, title: str, keyword: str) -> List[Dict]:
         topics = [
             {
                 "title": "Comprehensive Overview",
@@ -218,7 +538,7 @@ class OpenAIService:
                 ]
             }
         ]
-        return json.dumps(topics)
+        return topics
     
     def _get_mock_content(self, title: str, keyword: str, content_type: str, word_count: int) -> str:
         if content_type == 'meta_description':
@@ -238,3 +558,43 @@ The importance of {keyword} cannot be overstated. As we continue to evolve in th
             content = ' '.join(words[:word_count]) + '...'
         
         return content
+    
+    def _get_mock_section(self, keyword: str, section: Dict, word_count: int) -> str:
+        heading = section.get('heading', keyword)
+        sentences = [f"When it comes to {heading.lower()}, the details matter."] + [
+            f"{point} is a key part of getting {keyword} right, and it deserves careful attention."
+            for point in section.get('points', [])
+        ]
+        words = ' '.join(sentences).split()
+        while len(words) < word_count:
+            words += f"Teams that plan their {keyword} work around {heading.lower()} see steadier results.".split()
+        return ' '.join(words[:word_count])
+    
+    def _get_mock_transitions(self, keyword: str, headings: List[str]) -> Dict:
+        return {
+            'transitions': [f"With that in place, it is time to look at {heading.lower()}." for heading in headings[1:]],
+            'conclusion': f"Each of these steps builds on the last. Put them together and {keyword} becomes far easier to manage."
+        }
+    
+    def _stream_mock_content(self, prompt: str, title: str, keyword: str,
+                             content_type: str, word_count: int) -> Iterator[Dict]:
+        """Stream mock content word by word so the streaming path works offline"""
+        tokens, usage = self._mock_stream_parts(prompt, title, keyword, content_type, word_count)
+        delay = float(os.getenv('MOCK_STREAM_DELAY', 0.02))
+        for token in tokens:
+            if delay:
+                time.sleep(delay)
+            yield {'type': 'token', 'content': token}
+        yield {'type': 'usage', 'usage': usage}
+    
+    def _mock_stream_parts(self, prompt: str, title: str, keyword: str,
+                           content_type: str, word_count: int) -> tuple:
+        content = self._get_mock_content(title, keyword, content_type, word_count)
+        # Word counts stand in for token counts when nothing was sent upstream
+        usage = {
+            'prompt_tokens': len(prompt.split()),
+            'completion_tokens': len(content.split()),
+            'total_tokens': len(prompt.split()) + len(content.split()),
+            'estimated': True
+        }
+        return re.findall(r'\S+\s*', content), usage
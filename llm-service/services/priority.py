@@ -0,0 +1,90 @@
+import contextlib
+import contextvars
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+# Highest first: the first class may also use the slots reserved for it
+PRIORITIES = ('interactive', 'batch', 'background')
+
+_current: contextvars.ContextVar = contextvars.ContextVar('llm_priority', default=None)
+
+
+def current() -> Tuple[Optional[str], Optional[float]]:
+    """(priority class, monotonic deadline) set for the calling request or job, if any"""
+    return _current.get() or (None, None)
+
+
+def set_priority(name: Optional[str], deadline_seconds: Optional[float] = None) -> contextvars.Token:
+    deadline = time.monotonic() + deadline_seconds if deadline_seconds else None
+    return _current.set((name, deadline))
+
+
+def reset_priority(token: contextvars.Token):
+    _current.reset(token)
+
+
+@contextlib.contextmanager
+def priority_scope(name: Optional[str], deadline_seconds: Optional[float] = None):
+    """Upstream calls made inside the block (and tasks started from it) queue as `name`"""
+    token = set_priority(name, deadline_seconds)
+    try:
+        yield
+    finally:
+        reset_priority(token)
+
+
+def _pairs(raw: str) -> Dict[str, str]:
+    """'a=1,b=2' -> {'a': '1', 'b': '2'}"""
+    pairs = {}
+    for item in raw.split(','):
+        name, _, value = item.partition('=')
+        if name.strip() and value.strip():
+            pairs[name.strip()] = value.strip()
+    return pairs
+
+
+class PriorityPolicy:
+    """Weights, queueing deadlines and client mapping for the priority classes.
+
+    A request's class comes from its X-Priority header, else from the class
+    configured for its X-Client-Id, else the default. max_wait is how long
+    a call of each class may queue for an upstream slot before it is shed
+    (0 = no limit); an X-Request-Deadline header (seconds) can shorten it.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None,
+                 max_wait: Optional[Dict[str, float]] = None, reserved: int = 1,
+                 default: str = 'interactive', clients: Optional[Dict[str, str]] = None):
+        self.weights = {'interactive': 8.0, 'batch': 2.0, 'background': 1.0, **(weights or {})}
+        self.max_wait = {'interactive': 0.0, 'batch': 300.0, 'background': 600.0, **(max_wait or {})}
+        self.reserved = reserved
+        self.default = default
+        self.clients = clients or {}
+        for name in [*self.weights, *self.max_wait, default, *self.clients.values()]:
+            if name not in PRIORITIES:
+                raise ValueError(f"unknown priority class {name!r}; expected one of {', '.join(PRIORITIES)}")
+
+    @classmethod
+    def from_env(cls) -> 'PriorityPolicy':
+        return cls(
+            weights={name: float(value) for name, value in _pairs(os.getenv('LLM_PRIORITY_WEIGHTS', '')).items()},
+            max_wait={name: float(value) for name, value in _pairs(os.getenv('LLM_PRIORITY_MAX_WAIT', '')).items()},
+            reserved=int(os.getenv('LLM_PRIORITY_RESERVED', 1)),
+            default=os.getenv('LLM_PRIORITY_DEFAULT', 'interactive'),
+            clients=_pairs(os.getenv('LLM_PRIORITY_CLIENTS', ''))
+        )
+
+    def resolve(self, requested: Optional[str] = None, client: Optional[str] = None) -> str:
+        if requested in PRIORITIES:
+            return requested
+        return self.clients.get(client, self.default)
+
+    def from_headers(self, headers) -> Tuple[str, Optional[float]]:
+        """(class, deadline seconds) for a request's X-Priority / X-Client-Id / X-Request-Deadline"""
+        name = self.resolve(headers.get('X-Priority', '').strip().lower() or None, headers.get('X-Client-Id'))
+        try:
+            deadline = float(headers.get('X-Request-Deadline') or 0) or None
+        except ValueError:
+            deadline = None
+        return name, deadline
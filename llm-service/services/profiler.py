@@ -0,0 +1,259 @@
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+PROFILE_ID_PATTERN = re.compile(r'^\d{8}T\d{9}-[0-9a-f]{8}$')
+# Leaf frame for an asyncio task that is suspended, e.g. waiting on the upstream
+AWAITING = '(awaiting)'
+
+# The profile of the asyncio request being handled, for handing work to threads
+CURRENT_PROFILE: ContextVar[Optional['ProfileSession']] = ContextVar('profile_session', default=None)
+
+
+class ProfileSession:
+    """Stacks sampled from one request's thread, or from its asyncio task"""
+
+    __slots__ = ('id', 'route', 'method', 'thread_id', 'task', 'threads', 'started', 'duration', 'stacks')
+
+    def __init__(self, route: str, method: str, thread_id: int, task=None):
+        # Sortable by creation time, which is how the ring finds its oldest profiles
+        now = time.time()
+        stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime(now))
+        self.id = f'{stamp}{int(now % 1 * 1000):03d}-{uuid.uuid4().hex[:8]}'
+        self.route = route
+        self.method = method
+        self.thread_id = thread_id
+        self.task = task
+        self.threads: Dict[int, object] = {}  # worker thread id -> frame work is sampled from
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.stacks: Counter = Counter()
+
+
+class Profiler:
+    """Opt-in wall-clock sampling profiler for single requests.
+
+    A request is profiled when it sends `X-Profile: true` together with
+    the `token` as X-Profile-Token, or when it is picked at `sample_rate`.
+    Without a token no request can force a profile or read one back. One background thread samples the stack of every request
+    being profiled every `interval` seconds. Sampling is by wall clock, so
+    time blocked on the upstream shows up as socket frames, or for an
+    asyncio task as the await it is suspended in. Each profile is written
+    in collapsed-stack format (`frame;frame;frame count`), which
+    flamegraph.pl, inferno and speedscope read. `directory` keeps the
+    newest `max_profiles` of them, like a ring buffer. With profiling
+    disabled from_env() returns None and the apps install no hooks at all.
+    """
+
+    def __init__(self, directory: str, interval: float = 0.005, sample_rate: float = 0.0,
+                 token: Optional[str] = None, max_profiles: int = 200, max_depth: int = 128):
+        self.directory = directory
+        self.interval = interval
+        self.sample_rate = sample_rate
+        self.token = token
+        self.max_profiles = max_profiles
+        self.max_depth = max_depth
+        os.makedirs(directory, exist_ok=True)
+
+        self._active: Dict[str, ProfileSession] = {}
+        self._labels: Dict[tuple, str] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+        self._root = os.getcwd() + os.sep
+
+    @classmethod
+    def from_env(cls) -> Optional['Profiler']:
+        if os.getenv('PROFILE_ENABLED', 'false').lower() != 'true':
+            return None
+        if not os.getenv('PROFILE_TOKEN'):
+            # Stack dumps show code paths and timings: never serve them to anyone who asks
+            raise ValueError('PROFILE_ENABLED=true requires PROFILE_TOKEN')
+        return cls(
+            directory=os.getenv('PROFILE_DIR', os.path.join('cache', 'profiles')),
+            interval=float(os.getenv('PROFILE_INTERVAL_MS', 5)) / 1000,
+            sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', 0)),
+            token=os.getenv('PROFILE_TOKEN'),
+            max_profiles=int(os.getenv('PROFILE_MAX_PROFILES', 200))
+        )
+
+    def authorized(self, headers) -> bool:
+        supplied = headers.get('X-Profile-Token')
+        return bool(self.token and supplied) and hmac.compare_digest(supplied.encode(), self.token.encode())
+
+    def wants(self, headers) -> bool:
+        """Whether to profile a request with these headers"""
+        if headers.get('X-Profile', '').lower() in ('1', 'true'):
+            return self.authorized(headers)
+        return bool(self.sample_rate) and random.random() < self.sample_rate
+
+    def start(self, route: str, method: str, task=None) -> ProfileSession:
+        """Start sampling the calling thread, or `task` when the request runs as one"""
+        session = ProfileSession(route, method, threading.get_ident(), task)
+        with self._lock:
+            self._active[session.id] = session
+            if self._thread is None or not self._thread.is_alive():
+                # Per process: a preforked worker starts its own sampler on first use
+                self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+                self._thread.start()
+            self._wakeup.notify()
+        return session
+
+    def follow(self, session: ProfileSession, fn: Callable) -> Callable:
+        """Wrap fn so that, run on a worker thread, it is sampled into `session`.
+
+        Its stacks nest under the await of the task that waits for it.
+        """
+        def run(*args):
+            thread_id = threading.get_ident()
+            session.threads[thread_id] = sys._getframe()
+            try:
+                return fn(*args)
+            finally:
+                session.threads.pop(thread_id, None)
+
+        return run
+
+    def stop(self, session: ProfileSession):
+        """Stop sampling; finish() does this too, but may be run later, in another thread"""
+        with self._lock:
+            if self._active.pop(session.id, None) is not None:
+                session.duration = time.perf_counter() - session.started
+
+    def finish(self, session: ProfileSession, status: int) -> Dict:
+        """Stop sampling and write the profile; returns its metadata"""
+        self.stop(session)
+        with self._lock:
+            stacks = dict(session.stacks)
+        duration = session.duration
+        folded = ''.join(f'{stack} {count}\n' for stack, count in sorted(stacks.items()))
+        meta = {
+            'id': session.id,
+            'route': session.route,
+            'method': session.method,
+            'status': status,
+            'duration_ms': round(duration * 1000, 2),
+            'samples': sum(stacks.values()),
+            'interval_ms': self.interval * 1000,
+            'created': time.time(),
+            'pid': os.getpid(),
+            'bytes': len(folded.encode('utf-8'))
+        }
+        base = os.path.join(self.directory, session.id)
+        with open(base + '.folded', 'w', encoding='utf-8') as f:
+            f.write(folded)
+        # Metadata last: a profile is only listed once both files exist
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        self._prune()
+        return meta
+
+    def list(self, limit: int = 100) -> List[Dict]:
+        """Newest profiles first"""
+        profiles = []
+        for name in sorted(self._meta_files(), reverse=True)[:limit]:
+            try:
+                with open(os.path.join(self.directory, name), encoding='utf-8') as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # pruned by another worker meanwhile
+        return profiles
+
+    def path(self, profile_id: str) -> Optional[str]:
+        """Collapsed-stack file of a profile, or None for unknown (or malformed) ids"""
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        path = os.path.join(self.directory, profile_id + '.folded')
+        return path if os.path.exists(path) else None
+
+    def _meta_files(self) -> List[str]:
+        return [name for name in os.listdir(self.directory) if name.endswith('.json')]
+
+    def _prune(self):
+        for name in sorted(self._meta_files())[:-self.max_profiles or None]:
+            for suffix in ('.json', '.folded'):
+                try:
+                    os.remove(os.path.join(self.directory, name[:-len('.json')] + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._active:
+                    self._wakeup.wait()
+                sessions = list(self._active.values())
+            frames = sys._current_frames()
+            stacks = [(session, self._stacks(session, frames)) for session in sessions]
+            del frames
+            with self._lock:
+                for session, sampled in stacks:
+                    # A request that finished meanwhile has already been written out
+                    if session.id in self._active:
+                        session.stacks.update(sampled)
+            time.sleep(self.interval)
+
+    def _stacks(self, session: ProfileSession, frames: Dict) -> List[str]:
+        frame = frames.get(session.thread_id)
+        if session.task is None:
+            return [self._collapse(frame)] if frame is not None else []
+
+        coroutine = session.task.get_coro()
+        root = getattr(coroutine, 'cr_frame', None)
+        if root is None:
+            return []  # finished
+        # Running right now: the loop thread's stack passes through the task's coroutine
+        probe = frame
+        while probe is not None and probe is not root:
+            probe = probe.f_back
+        if probe is root:
+            return [self._collapse(frame, root)]
+        # Suspended: follow the chain of awaits down to what it is waiting on
+        labels = []
+        while coroutine is not None and len(labels) < self.max_depth:
+            current = getattr(coroutine, 'cr_frame', None) or getattr(coroutine, 'gi_frame', None)
+            if current is None:
+                break
+            labels.append(self._label(current))
+            coroutine = getattr(coroutine, 'cr_await', None) or getattr(coroutine, 'gi_yieldfrom', None)
+        awaiting = ';'.join(labels)
+        followed = [self._collapse(frames[thread_id], entry, inclusive=False)
+                    for thread_id, entry in list(session.threads.items()) if thread_id in frames]
+        return [f'{awaiting};{stack}' for stack in followed if stack] or [f'{awaiting};{AWAITING}']
+
+    def _collapse(self, frame, root=None, inclusive: bool = True) -> str:
+        """Root-first `;`-joined labels from `frame` up to `root` (or the thread's entry point)"""
+        labels = []
+        while frame is not None and len(labels) < self.max_depth:
+            if frame is root and not inclusive:
+                break
+            labels.append(self._label(frame))
+            if frame is root:
+                break
+            frame = frame.f_back
+        return ';'.join(reversed(labels))
+
+    def _label(self, frame) -> str:
+        code = frame.f_code
+        key = (code, frame.f_lineno)
+        label = self._labels.get(key)
+        if label is None:
+            filename = code.co_filename
+            if filename.startswith(self._root):
+                filename = filename[len(self._root):]
+            elif 'site-packages' + os.sep in filename:
+                filename = filename.split('site-packages' + os.sep, 1)[1]
+            else:
+                filename = os.path.basename(filename)
+            name = getattr(code, 'co_qualname', code.co_name)
+            label = self._labels[key] = f'{name} ({filename}:{frame.f_lineno})'
+        return label
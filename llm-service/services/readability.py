@@ -0,0 +1,214 @@
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+# Candidate sentence ends: a run of terminators (plus closing quotes or
+# brackets) followed by whitespace or the end of the text. "3.5" and
+# "node.js" never match, so decimals and dotted names stay in one sentence.
+TERMINATOR_PATTERN = re.compile(r'[.!?]+[\'"’”)\]]*(?=\s|$)')
+NEXT_CHAR_PATTERN = re.compile(r'\s*[\'"‘“(\[]*(\S)')
+WORD_PATTERN = re.compile(r"[^\W_]+(?:['’][^\W_]+)*")
+VOWEL_GROUP_PATTERN = re.compile(r'[aeiouy]+')
+# Passive voice: a form of "to be"/"to get", an optional -ly adverb, then a past participle
+AUXILIARIES = frozenset('am is are was were be been being get gets got gotten'.split())
+IRREGULAR_PARTICIPLES = frozenset(
+    'born brought built bought caught chosen done drawn driven found given gone grown held hidden '
+    'kept known laid led left lost made meant paid put read run said seen sent set shown sold spent '
+    'taken taught thought told understood won written'.split()
+)
+PUNCTUATION = '.,;:!?\'"()[]“”‘’'
+
+# Never end a sentence: they are followed by a name
+TITLES = frozenset('mr mrs ms dr prof rev gen sen rep st sr jr hon capt lt col sgt'.split())
+# End a sentence only when the next word is capitalized
+ABBREVIATIONS = frozenset(
+    'e.g i.e etc vs al approx fig no nos vol pp inc ltd co corp dept est min max '
+    'jan feb mar apr jun jul aug sep sept oct nov dec a.m p.m u.s u.k'.split()
+)
+
+LONG_SENTENCE_WORDS = 25
+SYLLABLE_CACHE_SIZE = 65536
+
+
+def _is_boundary(text: str, start: int, end: int) -> bool:
+    run = text[start:end]
+    if '!' in run or '?' in run:
+        return True
+    # Every abbreviation is short, so the last few characters hold the whole word
+    words = text[max(0, start - 8):start].split()
+    word = words[-1].lstrip('\'"‘“([').lower() if words else ''
+    initial = len(word) == 1 and text[start - 1].isupper()
+    ellipsis = run.startswith('..')
+    if not (ellipsis or initial or word in TITLES or word in ABBREVIATIONS):
+        return True
+
+    following = NEXT_CHAR_PATTERN.match(text, end)
+    if following is None:
+        return True
+    if ellipsis or word in ABBREVIATIONS:
+        # "wait... what" and "e.g. the" continue, "done... Then" does not
+        return following.group(1).isupper()
+    # Titles precede a name; a single capital letter is an initial ("J. Smith")
+    return False
+
+
+def sentence_bounds(text: str) -> List[int]:
+    """End offsets of consecutive sentence chunks; the last one is len(text).
+
+    Each chunk runs from the previous boundary up to and including its
+    terminators, so whitespace between sentences starts the next chunk and
+    the chunks concatenate back to exactly text.
+    """
+    bounds = [
+        match.end() for match in TERMINATOR_PATTERN.finditer(text)
+        if _is_boundary(text, match.start(), match.end())
+    ]
+    if not bounds or bounds[-1] != len(text):
+        bounds.append(len(text))
+    return bounds
+
+
+def split_sentences(text: str) -> List[str]:
+    chunks = []
+    start = 0
+    for end in sentence_bounds(text):
+        if end > start:
+            chunks.append(text[start:end])
+        start = end
+    return chunks
+
+
+def has_words(text: str) -> bool:
+    return WORD_PATTERN.search(text) is not None
+
+
+def is_passive(tokens: List[str]) -> bool:
+    """Whether a sentence's lowercase whitespace tokens contain a passive construction"""
+    for index in [i for i, token in enumerate(tokens) if token in AUXILIARIES]:
+        following = tokens[index + 1:index + 3]
+        if following and following[0].endswith('ly') and len(following) > 1:
+            following = following[1:]
+        if following:
+            word = following[0].strip(PUNCTUATION)
+            if (len(word) > 3 and word.endswith('ed')) or word in IRREGULAR_PARTICIPLES:
+                return True
+    return False
+
+
+@lru_cache(maxsize=SYLLABLE_CACHE_SIZE)
+def word_profile(token: str) -> Tuple[int, int, int]:
+    """(is a word, syllables, is complex for Gunning fog) for a lowercase whitespace token.
+
+    Punctuation is ignored ("growth," counts as "growth"). Hyphenated
+    compounds add up their parts' syllables but are never complex.
+    """
+    parts = [''.join(WORD_PATTERN.findall(part)) for part in token.split('-')]
+    parts = [part for part in parts if part]
+    if not parts:
+        return 0, 0, 0
+    syllables = sum(count_syllables(part) for part in parts)
+    if syllables < 3 or len(parts) > 1:
+        return 1, syllables, 0
+    # Gunning fog does not count -es, -ed and -ing as extra syllables
+    word = parts[0]
+    for suffix in ('ing', 'es', 'ed'):
+        if word.endswith(suffix) and count_syllables(word[:-len(suffix)]) < 3:
+            return 1, syllables, 0
+    return 1, syllables, 1
+
+
+def count_syllables(word: str) -> int:
+    """Vowel-group estimate with the usual silent -e, -ed and -es corrections"""
+    word = word.replace("'", '').replace('’', '')
+    groups = len(VOWEL_GROUP_PATTERN.findall(word))
+    if groups <= 1:
+        return 1
+    if word.endswith('e') and not (word.endswith('le') and word[-3] not in 'aeiouy') \
+            and not word.endswith('ee'):
+        groups -= 1  # make, whale; but table, agree
+    elif word.endswith('ed') and not word.endswith(('ted', 'ded')):
+        groups -= 1  # jumped; but wanted
+    elif word.endswith('es') and not word.endswith(('ses', 'xes', 'zes', 'ches', 'shes', 'ces', 'ges')):
+        groups -= 1  # makes; but boxes, pages
+    return max(1, groups)
+
+
+class ReadabilityStats:
+    """Additive sentence, word and syllable counts plus the indices derived from them"""
+
+    __slots__ = ('sentences', 'words', 'syllables', 'complex_words', 'long_sentences', 'passive_sentences')
+
+    def __init__(self, sentences: int = 0, words: int = 0, syllables: int = 0, complex_words: int = 0,
+                 long_sentences: int = 0, passive_sentences: int = 0):
+        self.sentences = sentences
+        self.words = words
+        self.syllables = syllables
+        self.complex_words = complex_words
+        self.long_sentences = long_sentences
+        self.passive_sentences = passive_sentences
+
+    def add(self, other: 'ReadabilityStats', sign: int = 1):
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + sign * getattr(other, name))
+
+    def copy(self) -> 'ReadabilityStats':
+        return ReadabilityStats(*(getattr(self, name) for name in self.__slots__))
+
+    @property
+    def flesch_reading_ease(self) -> float:
+        if not self.sentences or not self.words:
+            return 0
+        return 206.835 - 1.015 * self.words / self.sentences - 84.6 * self.syllables / self.words
+
+    @property
+    def flesch_kincaid_grade(self) -> float:
+        if not self.sentences or not self.words:
+            return 0
+        return 0.39 * self.words / self.sentences + 11.8 * self.syllables / self.words - 15.59
+
+    @property
+    def gunning_fog(self) -> float:
+        if not self.sentences or not self.words:
+            return 0
+        return 0.4 * (self.words / self.sentences + 100 * self.complex_words / self.words)
+
+    def as_dict(self) -> Dict:
+        return {
+            'flesch_reading_ease': round(self.flesch_reading_ease, 1),
+            'flesch_kincaid_grade': round(self.flesch_kincaid_grade, 1),
+            'gunning_fog': round(self.gunning_fog, 1),
+            'sentences': self.sentences,
+            'long_sentences': self.long_sentences,
+            'passive_sentences': self.passive_sentences,
+            'syllables_per_word': round(self.syllables / self.words, 2) if self.words else 0
+        }
+
+
+def measure(sentences: Iterable[str]) -> ReadabilityStats:
+    """All readability counts in one pass over sentence chunks.
+
+    Tokens are tallied per distinct spelling as the sentences stream past,
+    so memory follows the vocabulary rather than the document length, and
+    punctuation stripping and syllable counting happen once per word type.
+    The passive-voice check only runs on sentences with an auxiliary verb.
+    """
+    stats = ReadabilityStats()
+    counts = Counter()
+    for sentence in sentences:
+        if not has_words(sentence):
+            continue
+        tokens = sentence.lower().split()
+        stats.sentences += 1
+        if len(tokens) > LONG_SENTENCE_WORDS:
+            stats.long_sentences += 1
+        if not AUXILIARIES.isdisjoint(tokens) and is_passive(tokens):
+            stats.passive_sentences += 1
+        counts.update(tokens)
+
+    for token, occurrences in counts.items():
+        is_word, syllables, complex_word = word_profile(token)
+        stats.words += is_word * occurrences
+        stats.syllables += syllables * occurrences
+        stats.complex_words += complex_word * occurrences
+    return stats
@@ -0,0 +1,159 @@
+from typing import Any, Callable, Dict, Tuple
+
+# The subset of JSON Schema the model output checks need: type, items,
+# required, properties, minItems and minLength. Extra properties are allowed.
+KEYWORDS_SCHEMA = {
+    'type': 'array',
+    'minItems': 1,
+    'items': {'type': 'string', 'minLength': 1}
+}
+
+TITLES_SCHEMA = KEYWORDS_SCHEMA
+
+TOPICS_SCHEMA = {
+    'type': 'array',
+    'minItems': 1,
+    'items': {
+        'type': 'object',
+        'required': ['title', 'sections'],
+        'properties': {
+            'title': {'type': 'string'},
+            'sections': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'required': ['heading', 'points'],
+                    'properties': {
+                        'heading': {'type': 'string'},
+                        'points': {'type': 'array', 'items': {'type': 'string'}}
+                    }
+                }
+            }
+        }
+    }
+}
+
+# An outline a caller hands to long-form mode: sections only need a heading,
+# and the request carries its own title
+LONG_FORM_OUTLINE_SCHEMA = {
+    'type': 'object',
+    'required': ['sections'],
+    'properties': {
+        'title': {'type': 'string'},
+        'sections': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'required': ['heading'],
+                'properties': {
+                    'heading': {'type': 'string'},
+                    'points': {'type': 'array', 'items': {'type': 'string'}}
+                }
+            }
+        }
+    }
+}
+
+# Consistency pass for long-form content: one bridge per section boundary
+TRANSITIONS_SCHEMA = {
+    'type': 'object',
+    'required': ['transitions', 'conclusion'],
+    'properties': {
+        'transitions': {'type': 'array', 'items': {'type': 'string'}},
+        'conclusion': {'type': 'string'}
+    }
+}
+
+_TYPES = {
+    'array': list,
+    'object': dict,
+    'string': str,
+    'number': (int, float),
+    'integer': int,
+    'boolean': bool
+}
+
+
+class SchemaError(ValueError):
+    """Model output parsed as JSON but does not have the expected shape"""
+
+
+class _Mismatch(Exception):
+    def __init__(self, message: str):
+        self.message = message
+        self.where = ''
+
+
+# id(schema) -> (schema, checker); holding the schema keeps its id from being reused
+_compiled: Dict[int, Tuple[Dict, Callable[[Any], None]]] = {}
+
+
+def validate(value: Any, schema: Dict, path: str = '$') -> Any:
+    """Check value against schema and return it unchanged"""
+    entry = _compiled.get(id(schema))
+    if entry is None or entry[0] is not schema:
+        entry = _compiled[id(schema)] = (schema, _compile(schema))
+    try:
+        entry[1](value)
+    except _Mismatch as e:
+        raise SchemaError(f'{path}{e.where}: {e.message}') from None
+    return value
+
+
+def _compile(schema: Dict) -> Callable[[Any], None]:
+    """A checker function for schema.
+
+    Model output is validated on every cache miss and outlines run to
+    thousands of nodes, so the schema is turned into nested closures once
+    and locations are only built while unwinding from a mismatch.
+    """
+    expected = schema.get('type')
+    types = _TYPES[expected] if expected else object
+    numeric = expected in ('number', 'integer')
+    min_length = schema.get('minLength')
+    min_items = schema.get('minItems', 0)
+    items = _compile(schema['items']) if 'items' in schema else None
+    # Lists of unconstrained strings/objects/arrays (outline points) skip the per-item call
+    item_types = None
+    if items is not None and set(schema['items']) == {'type'} and \
+            schema['items']['type'] not in ('number', 'integer'):
+        item_types = _TYPES[schema['items']['type']]
+    required = tuple(schema.get('required', ()))
+    properties = tuple((name, _compile(subschema)) for name, subschema in schema.get('properties', {}).items())
+
+    def check(value: Any):
+        if not isinstance(value, types) or (numeric and isinstance(value, bool)):
+            raise _Mismatch(f'expected {expected}, got {type(value).__name__}')
+
+        if isinstance(value, str):
+            if min_length is not None and len(value.strip()) < min_length:
+                raise _Mismatch('string is too short')
+
+        elif isinstance(value, list):
+            if len(value) < min_items:
+                raise _Mismatch(f'expected at least {min_items} items')
+            if item_types is not None:
+                if all(isinstance(item, item_types) for item in value):
+                    return
+            if items is not None:
+                index = 0
+                try:
+                    for index, item in enumerate(value):
+                        items(item)
+                except _Mismatch as e:
+                    e.where = f'[{index}]{e.where}'
+                    raise
+
+        elif isinstance(value, dict):
+            for name in required:
+                if name not in value:
+                    raise _Mismatch(f'missing required property {name!r}')
+            for name, check_property in properties:
+                if name in value:
+                    try:
+                        check_property(value[name])
+                    except _Mismatch as e:
+                        e.where = f'.{name}{e.where}'
+                        raise
+
+    return check
@@ -0,0 +1,57 @@
+import re
+from functools import cached_property
+from typing import Dict, List, Sequence
+
+from .keyword_matcher import get_matcher, tokenize
+from .readability import ReadabilityStats, measure, split_sentences
+
+
+class SEODocument:
+    """Tokenized view of a piece of content, built once per analysis.
+
+    Every SEO metric reads from this object instead of re-lowercasing and
+    re-splitting the raw content on its own.
+    """
+
+    def __init__(self, content: str):
+        self.content = content
+        self.lower = content.lower()
+        self.word_count = len(content.split())
+        self._keyword_hits: Dict[str, List[int]] = {}
+
+    @cached_property
+    def readability(self) -> ReadabilityStats:
+        """Sentence, word and syllable counts for the readability indices, in one pass"""
+        return measure(split_sentences(self.content))
+
+    @property
+    def sentence_count(self) -> int:
+        return self.readability.sentences
+
+    @property
+    def avg_sentence_length(self) -> float:
+        """Average words per sentence, 0 when there is nothing to measure"""
+        if self.sentence_count == 0 or self.word_count == 0:
+            return 0
+        return self.word_count / self.sentence_count
+
+    def keyword_positions(self, keyword: str) -> List[int]:
+        """Start offsets of non-overlapping, case-insensitive keyword hits"""
+        needle = keyword.lower()
+        if needle not in self._keyword_hits:
+            self._keyword_hits[needle] = [
+                match.start() for match in re.finditer(re.escape(needle), self.lower)
+            ]
+        return self._keyword_hits[needle]
+
+    def keyword_count(self, keyword: str) -> int:
+        return len(self.keyword_positions(keyword))
+
+    @cached_property
+    def tokens(self) -> List[str]:
+        """Lowercase word tokens used for word-boundary keyword matching"""
+        return tokenize(self.content)
+
+    def keyword_matches(self, keywords: Sequence[str]) -> List[List[int]]:
+        """Word-index hit positions for many keywords in a single pass"""
+        return get_matcher(tuple(keywords)).find_positions(self.tokens)
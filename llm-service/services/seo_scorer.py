@@ -1,5 +1,15 @@
-import re
-from typing import Dict, List
+import os
+from typing import Dict, Iterable, List, Optional
+from .corpus_coverage import CorpusIndex, coverage_score
+from .keyword_matcher import get_matcher, tokenize
+from .metrics import SEO_METRIC_SECONDS
+from .seo_document import SEODocument
+from .seo_stream import SectionStats, StreamingAnalyzer
+
+# Hits inside the first N words count as keyword placement in the introduction
+INTRODUCTION_WORDS = 100
+# Metrics that still make sense for a single heading section
+SECTION_METRICS = ('keyword_density', 'content_length', 'readability')
 
 class SEOScorer:
     def __init__(self):
@@ -9,82 +19,226 @@ class SEOScorer:
             'title_length': {'min': 30, 'max': 60, 'weight': 0.25},
             'keyword_in_title': {'weight': 0.20},
             'content_length': {'weight': 0.15},
-            'readability': {'weight': 0.10}
+            'readability': {'weight': 0.10},
+            # Only scored when a reference corpus is given; the overall score
+            # is divided by the weights of the metrics actually present
+            'corpus_coverage': {'weight': float(os.getenv('SEO_CORPUS_WEIGHT', 0.15))}
         }
     
-    def analyze_content(self, content: str, keyword: str, title: str) -> Dict:
+    def analyze_content(self, content: str, keyword: str, title: str,
+                        secondary_keywords: Optional[List[str]] = None,
+                        corpus: Optional[CorpusIndex] = None) -> Dict:
         """Enhanced content analysis with same interface"""
-        scores = {}
+        # Tokenize once - every metric below reads from this document
+        doc = SEODocument(content)
+        analysis = self.analyze_document(doc, keyword, title)
         
-        # Keyword density analysis (enhanced)
-        keyword_count = len(re.findall(re.escape(keyword.lower()), content.lower()))
-        word_count = len(content.split())
-        keyword_density = (keyword_count / word_count) * 100 if word_count > 0 else 0
+        # Term coverage against the top-ranking pages for the keyword
+        if corpus is not None:
+            with SEO_METRIC_SECONDS.time(metric='corpus_coverage'):
+                self.add_corpus_coverage(analysis, corpus.score([content])[0])
         
-        scores['keyword_density'] = {
-            'value': round(keyword_density, 2),
-            'score': self._score_keyword_density(keyword_density),
-            'feedback': self._get_keyword_feedback(keyword_density)
-        }
+        # Multi-keyword mode: primary plus secondary/LSI keywords in one pass
+        if secondary_keywords:
+            with SEO_METRIC_SECONDS.time(metric='keyword_analysis'):
+                analysis['keyword_analysis'] = self._analyze_keywords(
+                    doc, title, [keyword] + list(secondary_keywords)
+                )
+        
+        return analysis
+    
+    def analyze_stream(self, chunks: Iterable, keyword: str, title: str) -> Dict:
+        """Analyze a plain text or Markdown document fed in chunks (str or UTF-8 bytes).
+
+        Returns the usual document-wide analysis plus a 'sections' list with
+        keyword density, length and readability scores per heading section.
+        Memory is bounded by the longest paragraph, not the document.
+        """
+        return self.analyze_streamed(StreamingAnalyzer(keyword).feed_all(chunks), keyword, title)
+    
+    def analyze_streamed(self, analyzer: StreamingAnalyzer, keyword: str, title: str) -> Dict:
+        """Close a StreamingAnalyzer that was fed elsewhere and score its document and sections"""
+        sections = analyzer.close()
+        
+        analysis = self.analyze_document(analyzer.total(), keyword, title)
+        analysis['sections'] = [
+            self.analyze_section(section, keyword) for section in sections
+            # Text before the first heading is only reported when there is some
+            if section.heading is not None or section.word_count
+        ]
+        analysis['characters'] = analyzer.chars
+        return analysis
+    
+    def analyze_document(self, doc: SEODocument, keyword: str, title: str) -> Dict:
+        """Score an already tokenized document.
+
+        Any object exposing word_count, avg_sentence_length, readability and
+        keyword_count(keyword) can be scored, e.g. an incremental session.
+        """
+        scores = {}
+        
+        # Keyword density analysis (enhanced). Each metric is timed separately;
+        # this one also pays for tokenizing the document.
+        with SEO_METRIC_SECONDS.time(metric='keyword_density'):
+            keyword_count = doc.keyword_count(keyword)
+            word_count = doc.word_count
+            keyword_density = (keyword_count / word_count) * 100 if word_count > 0 else 0
+            
+            scores['keyword_density'] = {
+                'value': round(keyword_density, 2),
+                'score': self._score_keyword_density(keyword_density),
+                'feedback': self._get_keyword_feedback(keyword_density)
+            }
         
         # Title length analysis (same as before)
-        title_length = len(title)
-        scores['title_length'] = {
-            'value': title_length,
-            'score': self._score_title_length(title_length),
-            'feedback': self._get_title_feedback(title_length)
-        }
+        with SEO_METRIC_SECONDS.time(metric='title_length'):
+            title_length = len(title)
+            scores['title_length'] = {
+                'value': title_length,
+                'score': self._score_title_length(title_length),
+                'feedback': self._get_title_feedback(title_length)
+            }
         
         # Content length analysis (enhanced)
-        scores['content_length'] = {
-            'value': word_count,
-            'score': self._score_content_length(word_count),
-            'feedback': self._get_content_length_feedback(word_count)
-        }
+        with SEO_METRIC_SECONDS.time(metric='content_length'):
+            scores['content_length'] = {
+                'value': word_count,
+                'score': self._score_content_length(word_count),
+                'feedback': self._get_content_length_feedback(word_count)
+            }
         
         # Keyword in title check (enhanced)
-        title_has_keyword = keyword.lower() in title.lower()
-        keyword_at_start = title.lower().startswith(keyword.lower())
-        
-        # Better scoring for keyword placement
-        if keyword_at_start:
-            keyword_title_score = 100
-            keyword_feedback = 'Excellent! Keyword is at the beginning of title'
-        elif title_has_keyword:
-            keyword_title_score = 85
-            keyword_feedback = 'Good! Keyword found in title'
-        else:
-            keyword_title_score = 40
-            keyword_feedback = 'Consider including the target keyword in the title'
+        with SEO_METRIC_SECONDS.time(metric='keyword_in_title'):
+            title_has_keyword = keyword.lower() in title.lower()
+            keyword_at_start = title.lower().startswith(keyword.lower())
+            
+            # Better scoring for keyword placement
+            if keyword_at_start:
+                keyword_title_score = 100
+                keyword_feedback = 'Excellent! Keyword is at the beginning of title'
+            elif title_has_keyword:
+                keyword_title_score = 85
+                keyword_feedback = 'Good! Keyword found in title'
+            else:
+                keyword_title_score = 40
+                keyword_feedback = 'Consider including the target keyword in the title'
+            
+            scores['keyword_in_title'] = {
+                'value': title_has_keyword,
+                'score': keyword_title_score,
+                'feedback': keyword_feedback
+            }
         
-        scores['keyword_in_title'] = {
-            'value': title_has_keyword,
-            'score': keyword_title_score,
-            'feedback': keyword_feedback
-        }
+        # Readability: sentence length plus Flesch, Flesch-Kincaid and Gunning
+        # fog from one pass over the document's sentences
+        with SEO_METRIC_SECONDS.time(metric='readability'):
+            readability = self._calculate_readability_score(doc)
+            scores['readability'] = {
+                'value': readability['avg_sentence_length'],
+                'score': self._score_readability(readability),
+                'feedback': self._get_readability_feedback(readability),
+                **{name: value for name, value in readability.items() if name != 'avg_sentence_length'}
+            }
         
-        # NEW: Basic readability analysis
-        scores['readability'] = {
-            'value': self._calculate_readability_score(content),
-            'score': self._score_readability(content),
-            'feedback': self._get_readability_feedback(content)
-        }
+        overall_score = self._overall_score(scores)
         
-        # Fixed overall score calculation - now properly weighted
+        with SEO_METRIC_SECONDS.time(metric='recommendations'):
+            recommendations = self._get_recommendations(scores)
+        
+        return {
+            'overall_score': round(overall_score, 1),
+            'scores': scores,
+            'recommendations': recommendations
+        }
+    
+    def add_corpus_coverage(self, analysis: Dict, coverage: Dict) -> Dict:
+        """Weight a CorpusIndex.score() result into an analyze_document() result"""
+        scores = analysis['scores']
+        scores['corpus_coverage'] = {
+            'value': coverage['coverage'],
+            'score': coverage_score(coverage['coverage']),
+            'feedback': self._get_corpus_feedback(coverage),
+            **{name: value for name, value in coverage.items() if name != 'coverage'}
+        }
+        analysis['overall_score'] = round(self._overall_score(scores), 1)
+        analysis['recommendations'] = self._get_recommendations(scores)
+        return analysis
+    
+    def _overall_score(self, scores: Dict) -> float:
+        """Weighted average of the metric scores, between 0 and 100"""
         overall_score = 0
+        total_weight = 0
         for key, score_data in scores.items():
             weight = self.scoring_rules.get(key, {}).get('weight', 0)
             overall_score += score_data['score'] * weight
+            total_weight += weight
+        if total_weight:
+            overall_score /= total_weight
         
         # Ensure score is between 0-100
-        overall_score = min(100, max(0, overall_score))
+        return min(100, max(0, overall_score))
+    
+    def analyze_section(self, section: SectionStats, keyword: str) -> Dict:
+        """Keyword density, length and readability scores for one heading section"""
+        density = section.keyword_count(keyword) / section.word_count * 100 if section.word_count else 0
+        readability = self._calculate_readability_score(section)
+        scores = {
+            'keyword_density': {
+                'value': round(density, 2),
+                'score': self._score_keyword_density(density),
+                'feedback': self._get_keyword_feedback(density)
+            },
+            'content_length': {
+                'value': section.word_count,
+                'score': self._score_section_length(section.word_count)
+            },
+            'readability': {
+                'value': readability['avg_sentence_length'],
+                'score': self._score_readability(readability),
+                'feedback': self._get_readability_feedback(readability),
+                **{name: value for name, value in readability.items() if name != 'avg_sentence_length'}
+            }
+        }
         
+        # Same weights as the overall score, rescaled to the metrics a section has
+        weights = {key: self.scoring_rules[key]['weight'] for key in SECTION_METRICS}
+        score = sum(scores[key]['score'] * weight for key, weight in weights.items()) / sum(weights.values())
         return {
-            'overall_score': round(overall_score, 1),
-            'scores': scores,
-            'recommendations': self._get_recommendations(scores)
+            'heading': section.heading,
+            'level': section.level,
+            'score': round(score, 1),
+            'keyword_in_heading': section.keyword_in_heading,
+            'scores': scores
         }
     
+    def _analyze_keywords(self, doc: SEODocument, title: str, keywords: List[str]) -> List[Dict]:
+        """Word-boundary counts, density and placement for every keyword"""
+        # Deduplicate on normalized tokens, keeping the first spelling and order
+        unique = {}
+        for kw in keywords:
+            key = ' '.join(tokenize(kw))
+            if key and key not in unique:
+                unique[key] = kw
+        normalized = tuple(unique)
+        
+        content_positions = doc.keyword_matches(normalized)
+        title_positions = get_matcher(normalized).find_positions(tokenize(title))
+        
+        results = []
+        for (key, original), positions, title_hits in zip(unique.items(), content_positions, title_positions):
+            density = (len(positions) / doc.word_count) * 100 if doc.word_count > 0 else 0
+            results.append({
+                'keyword': original,
+                'primary': key == normalized[0],
+                'count': len(positions),
+                'density': round(density, 2),
+                'positions': positions,
+                'first_position': positions[0] if positions else None,
+                'in_title': bool(title_hits),
+                'in_introduction': bool(positions) and positions[0] < INTRODUCTION_WORDS
+            })
+        return results
+    
     def _score_keyword_density(self, density: float) -> float:
         """Enhanced keyword density scoring"""
         if 1 <= density <= 3:
@@ -158,26 +312,24 @@ class SEOScorer:
         else:
             return f"Excellent content length ({word_count} words) for comprehensive SEO coverage."
     
-    # NEW: Readability analysis methods
-    def _calculate_readability_score(self, content: str) -> float:
-        """Calculate basic readability metrics"""
-        sentences = re.split(r'[.!?]+', content)
-        sentences = [s.strip() for s in sentences if s.strip()]
-        
-        words = content.split()
-        word_count = len(words)
-        sentence_count = len(sentences)
-        
-        if sentence_count == 0 or word_count == 0:
-            return 0
-        
-        avg_sentence_length = word_count / sentence_count
-        return avg_sentence_length
+    def _score_section_length(self, word_count: int) -> float:
+        """Length score for one heading section; 150+ words covers a subtopic"""
+        if word_count < 50:
+            return 40
+        elif word_count < 100:
+            return 70
+        elif word_count < 150:
+            return 90
+        else:
+            return 100
     
-    def _score_readability(self, content: str) -> float:
-        """Score content readability"""
-        avg_sentence_length = self._calculate_readability_score(content)
-        
+    # Readability analysis methods
+    def _calculate_readability_score(self, doc: SEODocument) -> Dict:
+        """Average sentence length plus the readability indices and style counts"""
+        return {'avg_sentence_length': doc.avg_sentence_length, **doc.readability.as_dict()}
+    
+    def _score_sentence_length(self, avg_sentence_length: float) -> float:
+        """Score average sentence length"""
         if avg_sentence_length == 0:
             return 50
         
@@ -193,20 +345,62 @@ class SEOScorer:
         else:
             return max(50, 100 - (avg_sentence_length - 25) * 3)  # Too long
     
-    def _get_readability_feedback(self, content: str) -> str:
-        """Provide readability feedback"""
-        avg_length = self._calculate_readability_score(content)
+    def _score_reading_ease(self, flesch_reading_ease: float) -> float:
+        """Score Flesch reading ease; 60+ is plain English for web content"""
+        if flesch_reading_ease >= 60:
+            return 100
+        elif flesch_reading_ease >= 50:
+            return 85
+        elif flesch_reading_ease >= 30:
+            return 65
+        else:
+            return 45
+    
+    def _score_readability(self, readability: Dict) -> float:
+        """Score content readability: sentence length, reading ease and style"""
+        sentences = readability['sentences']
+        if sentences == 0:
+            return 50
         
+        # More than 10% passive or 20% long sentences starts to cost points
+        passive_share = readability['passive_sentences'] / sentences * 100
+        long_share = readability['long_sentences'] / sentences * 100
+        style_score = max(0, 100 - max(0, passive_share - 10) * 2 - max(0, long_share - 20) * 2)
+        
+        return round(self._score_sentence_length(readability['avg_sentence_length']) * 0.4 +
+                     self._score_reading_ease(readability['flesch_reading_ease']) * 0.4 +
+                     style_score * 0.2, 1)
+    
+    def _get_readability_feedback(self, readability: Dict) -> str:
+        """Provide readability feedback"""
+        avg_length = readability['avg_sentence_length']
+        ease = readability['flesch_reading_ease']
         if avg_length == 0:
             return "Unable to analyze readability - insufficient content."
         elif avg_length < 10:
-            return f"Sentences are very short (avg: {avg_length:.1f} words). Consider combining some sentences for better flow."
+            feedback = f"Sentences are very short (avg: {avg_length:.1f} words). Consider combining some sentences for better flow."
         elif avg_length <= 20:
-            return f"Good sentence length (avg: {avg_length:.1f} words) for readability."
+            feedback = f"Good sentence length (avg: {avg_length:.1f} words) for readability."
         elif avg_length <= 25:
-            return f"Sentences are slightly long (avg: {avg_length:.1f} words). Consider breaking some into shorter sentences."
+            feedback = f"Sentences are slightly long (avg: {avg_length:.1f} words). Consider breaking some into shorter sentences."
         else:
-            return f"Sentences are too long (avg: {avg_length:.1f} words). Break them into shorter sentences for better readability."
+            feedback = f"Sentences are too long (avg: {avg_length:.1f} words). Break them into shorter sentences for better readability."
+        
+        if ease < 50:
+            feedback += f" Reading ease is low ({ease:.0f}, grade {readability['flesch_kincaid_grade']:.0f}); prefer shorter, simpler words."
+        if readability['passive_sentences'] > readability['sentences'] * 0.1:
+            feedback += f" {readability['passive_sentences']} sentences use the passive voice."
+        return feedback
+    
+    def _get_corpus_feedback(self, coverage: Dict) -> str:
+        """Feedback on coverage of the terms the reference pages use"""
+        covered = f"{coverage['terms_covered']} of the {coverage['terms_total']} key terms"
+        if coverage['coverage'] >= 70:
+            return f"Great topical coverage: the content uses {covered} top-ranking pages share."
+        elif coverage['coverage'] >= 40:
+            return f"The content uses {covered} top-ranking pages share. Consider covering more of them."
+        else:
+            return f"The content misses most terms top-ranking pages share ({covered} used)."
     
     def _get_recommendations(self, scores: Dict) -> List[str]:
         """Enhanced recommendations with priority ordering"""
@@ -235,12 +429,20 @@ class SEOScorer:
                 elif key == 'content_length':
                     recommendations.append("📄 Expand the content with more valuable information")
                 
+                elif key == 'corpus_coverage':
+                    missing = ', '.join(score_data['missing_terms'][:5])
+                    recommendations.append(f"🧩 Cover topics the top-ranking pages mention: {missing}")
+                
                 elif key == 'readability':
-                    avg_length = self._calculate_readability_score(scores.get('content_length', {}).get('value', 0))
-                    if avg_length > 25:
+                    avg_length = score_data['value']
+                    if avg_length > 25 or score_data['long_sentences'] > score_data['sentences'] * 0.2:
                         recommendations.append("📖 Break long sentences into shorter ones for better readability")
                     elif avg_length < 10:
                         recommendations.append("📖 Combine very short sentences for better flow")
+                    elif score_data['flesch_reading_ease'] < 50:
+                        recommendations.append("📖 Use shorter, everyday words to raise the reading ease score")
+                    elif score_data['passive_sentences'] > score_data['sentences'] * 0.1:
+                        recommendations.append("📖 Rewrite passive sentences in the active voice")
                     else:
                         recommendations.append("📖 Improve content readability and sentence structure")
         
@@ -0,0 +1,210 @@
+import re
+import threading
+import time
+import uuid
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+from typing import Dict, List, Optional
+
+from .readability import ReadabilityStats, measure, split_sentences
+
+TERMINATORS = '.!?'
+
+
+def split_chunks(text: str) -> List[str]:
+    """Sentence chunks from the readability segmenter; they concatenate back to text"""
+    return split_sentences(text)
+
+
+class ChunkStats:
+    """Additive counts for one chunk; only chunks touched by an edit are rebuilt"""
+
+    __slots__ = ('text', 'words', 'sentences', 'readability', 'keyword_hits', 'starts_in_word', 'ends_in_word')
+
+    def __init__(self, text: str, keyword: str):
+        self.text = text
+        self.words = len(text.split())
+        self.readability = measure([text])
+        self.sentences = self.readability.sentences
+        self.keyword_hits = len(re.findall(re.escape(keyword), text.lower()))
+        # A word cut in two by a chunk boundary must only be counted once
+        self.starts_in_word = not text[0].isspace()
+        self.ends_in_word = not text[-1].isspace()
+
+
+class IncrementalDocument:
+    """Document model that applies text edits by re-tokenizing only the
+    sentences around each edit.
+
+    Exposes the same counts SEOScorer.analyze_document reads from an
+    SEODocument, kept up to date as running totals.
+    """
+
+    def __init__(self, content: str, keyword: str):
+        self.keyword = keyword.lower()
+        # Hits of a keyword with an inner terminator (e.g. "node.js") can
+        # straddle chunks, so those fall back to counting the whole text
+        self._spans_chunks = any(ch in TERMINATORS for ch in self.keyword.rstrip(TERMINATORS))
+
+        self.chunks = [ChunkStats(chunk, self.keyword) for chunk in split_chunks(content)]
+        totals = self._region_totals(0, len(self.chunks))
+        self.word_total, self.sentence_total, self.keyword_total, self.readability = totals
+        self._reindex()
+
+    @property
+    def content(self) -> str:
+        return ''.join(chunk.text for chunk in self.chunks)
+
+    @property
+    def length(self) -> int:
+        return self._starts[-1]
+
+    @property
+    def word_count(self) -> int:
+        return self.word_total
+
+    @property
+    def sentence_count(self) -> int:
+        return self.sentence_total
+
+    @property
+    def avg_sentence_length(self) -> float:
+        if self.sentence_total == 0 or self.word_total == 0:
+            return 0
+        return self.word_total / self.sentence_total
+
+    def keyword_count(self, keyword: str) -> int:
+        if keyword.lower() != self.keyword or self._spans_chunks:
+            return len(re.findall(re.escape(keyword.lower()), self.content.lower()))
+        return self.keyword_total
+
+    def apply_edit(self, start: int, end: int, text: str):
+        """Replace content[start:end] with text (insert: start == end, delete: text == '')"""
+        if not 0 <= start <= end <= self.length:
+            raise ValueError(f'edit range {start}-{end} is outside the document (length {self.length})')
+
+        # Re-chunk the touched chunks plus one neighbour on each side, so the
+        # region always begins and ends on an unchanged sentence boundary.
+        # Boundaries only look at the word before a terminator and the first
+        # character after it, both of which stay inside the region.
+        count = len(self.chunks)
+        first = max(self._chunk_at(start) - 1, 0)
+        last = min(self._chunk_at(max(end - 1, start)) + 2, count)
+
+        region_start = self._starts[first]
+        region = ''.join(chunk.text for chunk in self.chunks[first:last])
+        offset_start, offset_end = start - region_start, end - region_start
+        new_region = region[:offset_start] + text + region[offset_end:]
+
+        old_words, old_sentences, old_hits, old_readability = self._region_totals(first, last)
+        new_chunks = [ChunkStats(chunk, self.keyword) for chunk in split_chunks(new_region)]
+        self.chunks[first:last] = new_chunks
+        new_words, new_sentences, new_hits, new_readability = self._region_totals(first, first + len(new_chunks))
+
+        self.word_total += new_words - old_words
+        self.sentence_total += new_sentences - old_sentences
+        self.keyword_total += new_hits - old_hits
+        self.readability.add(old_readability, -1)
+        self.readability.add(new_readability)
+        self._reindex()
+
+    def _chunk_at(self, position: int) -> int:
+        return min(max(bisect_right(self._starts, position) - 1, 0), max(len(self.chunks) - 1, 0))
+
+    def _reindex(self):
+        # Integer prefix sums only - no text is touched here
+        self._starts = [0] + list(accumulate(len(chunk.text) for chunk in self.chunks))
+
+    def _region_totals(self, first: int, last: int) -> tuple:
+        """Counts for chunks[first:last], including word joins with both neighbours"""
+        words = sentences = hits = 0
+        readability = ReadabilityStats()
+        for chunk in self.chunks[first:last]:
+            words += chunk.words
+            sentences += chunk.sentences
+            hits += chunk.keyword_hits
+            readability.add(chunk.readability)
+
+        for index in range(max(first - 1, 0), min(last, len(self.chunks) - 1)):
+            if self.chunks[index].ends_in_word and self.chunks[index + 1].starts_in_word:
+                words -= 1
+        return words, sentences, hits, readability
+
+
+class ScoringSession:
+    def __init__(self, content: str, keyword: str, title: str):
+        self.document = IncrementalDocument(content, keyword)
+        self.keyword = keyword
+        self.title = title
+        self.version = 0
+        self.lock = threading.Lock()
+
+    def apply_edits(self, edits: List[Dict]):
+        """Apply edits in order; on a bad edit none of them take effect"""
+        document = self.document
+        snapshot = (list(document.chunks), document.word_total, document.sentence_total,
+                    document.keyword_total, document.readability.copy())
+        try:
+            for edit in edits:
+                if not isinstance(edit, dict):
+                    raise ValueError('each edit must be an object')
+                start = edit.get('start')
+                end = edit.get('end', start)
+                text = edit.get('text', '')
+                if not isinstance(start, int) or not isinstance(end, int) or not isinstance(text, str):
+                    raise ValueError('each edit needs an integer start, optional integer end and string text')
+                document.apply_edit(start, end, text)
+        except ValueError:
+            (document.chunks, document.word_total, document.sentence_total,
+             document.keyword_total, document.readability) = snapshot
+            document._reindex()
+            raise
+        self.version += 1
+
+
+class SessionStore:
+    """Thread-safe session map bounded by size (LRU) and idle time (TTL)"""
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: float = 1800):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, session: ScoringSession) -> str:
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._sessions[session_id] = (session, time.monotonic())
+            self._evict()
+        return session_id
+
+    def get(self, session_id: str) -> Optional[ScoringSession]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            session, last_used = entry
+            if time.monotonic() - last_used > self.ttl_seconds:
+                del self._sessions[session_id]
+                return None
+            self._sessions[session_id] = (session, time.monotonic())
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict(self):
+        now = time.monotonic()
+        # Oldest entries sit at the front, so expired ones are found first
+        while self._sessions:
+            session_id, (_, last_used) = next(iter(self._sessions.items()))
+            if len(self._sessions) > self.max_sessions or now - last_used > self.ttl_seconds:
+                del self._sessions[session_id]
+            else:
+                break
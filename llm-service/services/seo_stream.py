@@ -0,0 +1,156 @@
+import codecs
+import os
+import re
+from typing import Iterable, List, Optional
+
+from .readability import ReadabilityStats, measure, sentence_bounds, split_sentences
+
+HEADING_PATTERN = re.compile(r' {0,3}(#{1,6})[ \t]+(.*?)(?:[ \t]+#+)?[ \t]*$')
+FENCE_PATTERN = re.compile(r' {0,3}(`{3,}|~{3,})')
+
+# A paragraph longer than this is analyzed a sentence run at a time
+MAX_PARAGRAPH_CHARS = int(os.getenv('SEO_STREAM_MAX_PARAGRAPH', 65536))
+
+
+class SectionStats:
+    """Running counts for one heading section.
+
+    Exposes word_count, avg_sentence_length, readability and
+    keyword_count(keyword), so SEOScorer can score it like a document.
+    """
+
+    __slots__ = ('heading', 'level', 'keyword', 'word_count', 'keyword_hits', 'readability', 'keyword_in_heading')
+
+    def __init__(self, heading: Optional[str], level: int, keyword: str):
+        self.heading = heading
+        self.level = level
+        self.keyword = keyword
+        self.word_count = 0
+        self.keyword_hits = 0
+        self.readability = ReadabilityStats()
+        self.keyword_in_heading = heading is not None and keyword in heading.lower()
+
+    @property
+    def sentence_count(self) -> int:
+        return self.readability.sentences
+
+    @property
+    def avg_sentence_length(self) -> float:
+        if self.sentence_count == 0 or self.word_count == 0:
+            return 0
+        return self.word_count / self.sentence_count
+
+    def keyword_count(self, keyword: str) -> int:
+        if keyword.lower() != self.keyword:
+            raise ValueError('sections only count the keyword they were built for')
+        return self.keyword_hits
+
+    def add_text(self, text: str, sentences: List[str]):
+        self.word_count += len(text.split())
+        self.keyword_hits += len(re.findall(re.escape(self.keyword), text.lower()))
+        self.readability.add(measure(sentences))
+
+    def add(self, other: 'SectionStats'):
+        self.word_count += other.word_count
+        self.keyword_hits += other.keyword_hits
+        self.readability.add(other.readability)
+
+
+class StreamingAnalyzer:
+    """Analyzes plain text or Markdown fed in arbitrary chunks.
+
+    Only the current line and paragraph are held in memory; every finished
+    paragraph is folded into its section's running counts and dropped.
+    ATX headings ("## Setup") start a new section and are not counted as
+    body text; fenced code blocks are skipped. Paragraph breaks and
+    headings end a sentence, so an unterminated list item or heading-like
+    line does not run into the next one.
+    """
+
+    def __init__(self, keyword: str, max_paragraph_chars: int = MAX_PARAGRAPH_CHARS):
+        self.keyword = keyword.lower()
+        self.max_paragraph_chars = max_paragraph_chars
+        self.sections = [SectionStats(None, 0, self.keyword)]
+        self.chars = 0
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._line = ''
+        self._paragraph: List[str] = []
+        self._paragraph_chars = 0
+        self._fence = None
+
+    def feed(self, chunk):
+        """Add the next piece of the document, as str or UTF-8 bytes"""
+        if isinstance(chunk, bytes):
+            chunk = self._decoder.decode(chunk)
+        self.chars += len(chunk)
+        lines = (self._line + chunk).split('\n')
+        self._line = lines.pop()
+        for line in lines:
+            self._add_line(line)
+        # A very long line without newlines is moved into the paragraph up to its last space
+        if len(self._line) > self.max_paragraph_chars:
+            cut = max(self._line.rfind(' '), self._line.rfind('\t')) + 1 or len(self._line)
+            self._append(self._line[:cut])
+            self._line = self._line[cut:]
+
+    def feed_all(self, chunks: Iterable) -> 'StreamingAnalyzer':
+        for chunk in chunks:
+            self.feed(chunk)
+        return self
+
+    def close(self) -> List[SectionStats]:
+        """Flush the buffers; returns the sections, including an untitled one for text before the first heading"""
+        tail = self._decoder.decode(b'', final=True)
+        if tail:
+            self.feed(tail)
+        if self._line:
+            self._add_line(self._line)
+            self._line = ''
+        self._flush_paragraph()
+        return self.sections
+
+    def total(self) -> SectionStats:
+        total = SectionStats(None, 0, self.keyword)
+        for section in self.sections:
+            total.add(section)
+        return total
+
+    def _add_line(self, line: str):
+        line = line.rstrip('\r')
+        fence = FENCE_PATTERN.match(line)
+        if self._fence is not None:
+            if fence and fence.group(1)[0] == self._fence[0] and len(fence.group(1)) >= len(self._fence):
+                self._fence = None
+            return
+        if fence:
+            self._flush_paragraph()
+            self._fence = fence.group(1)
+            return
+
+        heading = HEADING_PATTERN.match(line)
+        if heading:
+            self._flush_paragraph()
+            self.sections.append(SectionStats(heading.group(2), len(heading.group(1)), self.keyword))
+        elif not line.strip():
+            self._flush_paragraph()
+        else:
+            self._append(line + '\n')
+
+    def _append(self, text: str):
+        self._paragraph.append(text)
+        self._paragraph_chars += len(text)
+        if self._paragraph_chars > self.max_paragraph_chars:
+            self._flush_paragraph(keep_tail=True)
+
+    def _flush_paragraph(self, keep_tail: bool = False):
+        if not self._paragraph:
+            return
+        text = ''.join(self._paragraph)
+        self._paragraph, self._paragraph_chars = [], 0
+        if keep_tail:
+            # Keep the unfinished last sentence; the next text may continue it
+            bounds = sentence_bounds(text)
+            if len(bounds) > 1:
+                self._paragraph, self._paragraph_chars = [text[bounds[-2]:]], len(text) - bounds[-2]
+                text = text[:bounds[-2]]
+        self.sections[-1].add_text(text, split_sentences(text))
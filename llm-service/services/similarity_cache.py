@@ -0,0 +1,211 @@
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+STOPWORDS = frozenset(
+    'a an and are as at be by for from how in into is it its of on or the to vs what with your'.split()
+)
+
+# Words in any script; a trailing + or # stays part of the word, so "c++",
+# "c#" and "c" remain different tokens
+_WORD = re.compile(r'\w+[+#]*')
+
+# MinHash parameters: 32 hashes in 8 bands of 4 rows puts the LSH candidate
+# threshold near Jaccard 0.6, below any sensible reuse threshold; candidates
+# are then checked against the exact Jaccard of their shingle sets.
+NUM_HASHES = 32
+BANDS = 8
+ROWS = NUM_HASHES // BANDS
+_PRIME = (1 << 61) - 1
+_PERMUTATIONS = [
+    (zlib.crc32(f'a{i}'.encode()) * 2654435761 % _PRIME | 1, zlib.crc32(f'b{i}'.encode()) * 40503 % _PRIME)
+    for i in range(NUM_HASHES)
+]
+
+
+def stem(word: str) -> str:
+    """Light suffix stripping: plurals, -ing and -ed"""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    if word.endswith(('sses', 'xes', 'ches', 'shes', 'zes')):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    if word.endswith('ing') and len(word) > 5:
+        return word[:-3]
+    if word.endswith('ed') and len(word) > 4:
+        return word[:-2]
+    return word
+
+
+def normalize(text: str) -> Tuple[str, ...]:
+    """Sorted, de-duplicated stems of the non-stopwords in text.
+
+    "Best CRM Tools" and "tools for best crm" both become ('best', 'crm', 'tool').
+    Text without any word characters ("???") becomes an empty tuple.
+    """
+    words = _WORD.findall(text.lower())
+    stems = {stem(word) for word in words if word not in STOPWORDS}
+    # An input made only of stopwords still needs a key
+    return tuple(sorted(stems or set(words)))
+
+
+def shingles(tokens: Tuple[str, ...]) -> FrozenSet[str]:
+    """Whole tokens plus character trigrams, so small spelling differences still overlap"""
+    result = {'w:' + token for token in tokens}
+    for token in tokens:
+        padded = f'#{token}#'
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(result)
+
+
+def minhash(features: FrozenSet[str]) -> List[int]:
+    hashes = [zlib.crc32(feature.encode('utf-8')) for feature in features]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def _numbers(tokens: Tuple[str, ...]) -> Tuple[str, ...]:
+    return tuple(token for token in tokens if any(c.isdigit() for c in token))
+
+
+class _Entry:
+    __slots__ = ('tokens', 'features', 'bands', 'value', 'expires_at')
+
+    def __init__(self, tokens, features, bands, value, expires_at):
+        self.tokens = tokens
+        self.features = features
+        self.bands = bands
+        self.value = value
+        self.expires_at = expires_at
+
+
+class SimilarityCache:
+    """Serves stored completions for inputs that are nearly identical to earlier ones.
+
+    Inputs are normalized (case, punctuation, stopwords, word order, light
+    stemming) and indexed with MinHash LSH. A lookup returns the output of
+    the most similar earlier input whose Jaccard similarity reaches the
+    endpoint's threshold. Inputs that differ in any number ("2024" vs
+    "2025") never match. Endpoints without a threshold, and inputs without
+    any word characters, are not indexed. Entries live in memory only, per process.
+    """
+
+    def __init__(self, thresholds: Dict[str, float], max_entries: int = 10000,
+                 ttl_seconds: float = 86400):
+        self.thresholds = thresholds
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict = OrderedDict()
+        self._buckets: Dict[Tuple, set] = {}
+        self._lock = threading.Lock()
+        self._stats = {'normalized_hits': 0, 'similar_hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+
+    @classmethod
+    def from_env(cls) -> Optional['SimilarityCache']:
+        if os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'false':
+            return None
+        thresholds = {}
+        for item in os.getenv('LLM_SIMILAR_THRESHOLDS', 'generate_keywords=0.85,generate_titles=0.85').split(','):
+            endpoint, _, threshold = item.partition('=')
+            if endpoint.strip() and threshold.strip():
+                thresholds[endpoint.strip()] = float(threshold)
+        if not thresholds:
+            return None
+        return cls(
+            thresholds,
+            max_entries=int(os.getenv('LLM_SIMILAR_MAX_ENTRIES', 10000)),
+            ttl_seconds=float(os.getenv('LLM_CACHE_TTL', 86400))
+        )
+
+    def enabled(self, endpoint: str) -> bool:
+        return endpoint in self.thresholds
+
+    def get(self, endpoint: str, scope: str, text: str) -> Optional[str]:
+        """Stored value for text or its nearest match within scope, if close enough.
+
+        scope holds everything besides the text that must match exactly
+        (model, sampling settings, tone, ...).
+        """
+        threshold = self.thresholds.get(endpoint)
+        if threshold is None:
+            return None
+        tokens = normalize(text)
+        if not tokens:
+            return None  # nothing to compare; "???" and "!!!" must not share an entry
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get((endpoint, scope, tokens))
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end((endpoint, scope, tokens))
+                self._stats['normalized_hits'] += 1
+                return entry.value
+
+        features = shingles(tokens)
+        bands = self._bands(endpoint, scope, minhash(features))
+        numbers = _numbers(tokens)
+        best_key, best_score = None, threshold
+        with self._lock:
+            candidates = set()
+            for band in bands:
+                candidates.update(self._buckets.get(band, ()))
+            for key in candidates:
+                entry = self._entries[key]
+                if entry.expires_at <= now or _numbers(entry.tokens) != numbers:
+                    continue
+                score = len(features & entry.features) / len(features | entry.features)
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self._stats['similar_hits'] += 1
+            return self._entries[best_key].value
+
+    def set(self, endpoint: str, scope: str, text: str, value: str):
+        if endpoint not in self.thresholds:
+            return
+        tokens = normalize(text)
+        if not tokens:
+            return
+        features = shingles(tokens)
+        bands = self._bands(endpoint, scope, minhash(features))
+        key = (endpoint, scope, tokens)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = _Entry(tokens, features, bands, value, time.time() + self.ttl_seconds)
+            for band in bands:
+                self._buckets.setdefault(band, set()).add(key)
+            self._stats['writes'] += 1
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        stats['thresholds'] = dict(self.thresholds)
+        return stats
+
+    @staticmethod
+    def _bands(endpoint: str, scope: str, signature: List[int]) -> List[Tuple]:
+        return [(endpoint, scope, band, tuple(signature[band * ROWS:(band + 1) * ROWS]))
+                for band in range(BANDS)]
+
+    def _drop(self, key: Tuple):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band in entry.bands:
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band]
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution.
+
+    The first caller (the leader) runs the function; callers arriving while
+    it is in flight wait and receive the same result or the same exception.
+    The key is forgotten as soon as the call finishes, so a failure is never
+    replayed to later callers.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.stats = {'leaders': 0, 'followers': 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Run fn once per key at a time.
+
+        A follower that gives up after timeout seconds gets TimeoutError;
+        the leader keeps running for everyone else still waiting.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats['leaders'] += 1
+            else:
+                self.stats['followers'] += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.result
+
+        if not call.done.wait(timeout):
+            raise TimeoutError(f'gave up waiting for in-flight call after {timeout}s')
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """asyncio counterpart of SingleFlight.
+
+    The shared call runs as its own task so that a cancelled waiter - even
+    the one that started it - does not cancel it for the others. The task is
+    only cancelled once every waiter has gone away.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, list] = {}
+        self.stats = {'leaders': 0, 'followers': 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._calls.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(fn())
+            entry = self._calls[key] = [task, 0]
+            task.add_done_callback(lambda _, key=key, entry=entry: self._forget(key, entry))
+            self.stats['leaders'] += 1
+        else:
+            self.stats['followers'] += 1
+
+        task = entry[0]
+        entry[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and entry[1] == 1:
+                task.cancel()
+            raise
+        finally:
+            entry[1] -= 1
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def _forget(self, key: Hashable, entry: list):
+        if self._calls.get(key) is entry:
+            del self._calls[key]
@@ -0,0 +1,202 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+SAMPLE_TITLE = 'Content marketing basics for small teams'
+SAMPLE_KEYWORD = 'content marketing'
+SAMPLE_CONTENT = (
+    '# Content marketing basics\n\n'
+    'Content marketing helps small teams earn attention without a large budget. '
+    'Start with the questions your customers already ask, then answer them clearly. '
+    'A short, useful article often beats a long one that was written for search engines.\n\n'
+    '## Planning\n\n'
+    'Publish on a schedule you can keep. Measure what readers do after they finish, '
+    'and update the pieces that bring people in.'
+)
+
+
+def _process_age() -> Optional[float]:
+    """Seconds since this process started, from /proc; None where that is not available"""
+    try:
+        with open('/proc/self/stat') as f:
+            # The command name may contain spaces, so split after its closing parenthesis
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupTimings:
+    """Import and startup phases of this process, for /health and the startup gauge.
+
+    mark() closes a phase that began at the previous mark; phase() times a
+    block on its own, such as the first import of the OpenAI SDK.
+    """
+
+    def __init__(self):
+        self.interpreter = _process_age()  # interpreter start up to the first app import
+        self.started = time.perf_counter()
+        self.ready: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+        self._last = self.started
+        self._lock = threading.Lock()
+
+    def mark(self, name: str):
+        now = time.perf_counter()
+        with self._lock:
+            self.phases[name] = round(now - self._last, 4)
+            self._last = now
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name] = round(time.perf_counter() - start, 4)
+
+    def set_ready(self):
+        self.ready = round(time.perf_counter() - self.started, 4)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            phases = dict(self.phases)
+        return {
+            'pid': os.getpid(),
+            'preforked': _prefork,
+            'interpreter_seconds': round(self.interpreter, 4) if self.interpreter is not None else None,
+            'ready_seconds': self.ready,
+            'phases': phases,
+            'openai_loaded': 'openai' in sys.modules
+        }
+
+    def gauge(self) -> Dict:
+        with self._lock:
+            return {(name,): seconds for name, seconds in self.phases.items()}
+
+
+STARTUP = StartupTimings()
+
+_prefork = False
+_worker_hooks: List[Callable[[], None]] = []
+
+
+def enable_prefork():
+    """Called by gunicorn.conf.py before the app is preloaded in the master process"""
+    global _prefork
+    _prefork = True
+
+
+def is_preforking() -> bool:
+    return _prefork
+
+
+def on_worker_boot(fn: Callable[[], None]):
+    """Run fn in the process that serves requests.
+
+    Without a preforking server that is this process, right now. With one,
+    it is each worker, just after it is forked: threads and connections
+    started in the master would not survive the fork.
+    """
+    if _prefork:
+        _worker_hooks.append(fn)
+    else:
+        fn()
+
+
+def worker_booted():
+    for fn in _worker_hooks:
+        fn()
+
+
+def prewarm_enabled() -> bool:
+    return _prefork and os.getenv('LLM_PREWARM', 'true').lower() != 'false'
+
+
+class LazyClient:
+    """Stands in for an SDK client and builds it on first use.
+
+    Importing the openai package takes about half a second, so a cold
+    start that never calls upstream never pays for it.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def resolve(self) -> Any:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    with STARTUP.phase('openai_client'):
+                        self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.resolve(), name)
+
+
+def upstream_clients(service) -> List[Any]:
+    """The service's built SDK clients: one per routed target, or its single client"""
+    router = getattr(service, 'router', None)
+    clients = [target.client for target in router.targets] if router is not None else [service.client]
+    return [client.resolve() if isinstance(client, LazyClient) else client
+            for client in clients if client is not None]
+
+
+def preload(seo_scorer):
+    """Work done once in the master so forked workers share it copy-on-write.
+
+    Imports the OpenAI SDK and the optional numeric libraries, and runs a
+    sample analysis so regexes, matchers and the syllable cache are built.
+    """
+    from . import corpus_coverage
+
+    with STARTUP.phase('preload_imports'):
+        try:
+            import openai  # noqa: F401
+        except ImportError:
+            pass
+        corpus_coverage.load_numeric()
+    with STARTUP.phase('warm_scorer'):
+        seo_scorer.analyze_content(SAMPLE_CONTENT, SAMPLE_KEYWORD, SAMPLE_TITLE, ['small teams'])
+        corpus_coverage.CorpusIndex(SAMPLE_KEYWORD, [SAMPLE_CONTENT]).score([SAMPLE_CONTENT])
+
+
+def prewarm(service):
+    """Build the clients and open a keep-alive connection to every upstream, in the background.
+
+    GET /models is the cheapest authenticated request; failures are
+    ignored, since the first real call will report them properly.
+    """
+    def run():
+        with STARTUP.phase('prewarm'):
+            for client in upstream_clients(service):
+                try:
+                    client.with_options(timeout=5, max_retries=0).models.list()
+                except Exception:
+                    pass
+
+    threading.Thread(target=run, name='prewarm', daemon=True).start()
+
+
+async def aprewarm(service):
+    """prewarm() for AsyncOpenAI clients, whose connections belong to the running loop"""
+    async def run(client):
+        try:
+            await client.with_options(timeout=5, max_retries=0).models.list()
+        except Exception:
+            pass
+
+    with STARTUP.phase('prewarm'):
+        # Building a client loads certificates; keep that off the loop
+        clients = await asyncio.get_running_loop().run_in_executor(None, upstream_clients, service)
+        await asyncio.gather(*(run(client) for client in clients))
@@ -0,0 +1,237 @@
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .metrics import UPSTREAM_TARGET_REQUESTS
+from .upstream_scheduler import error_retry_after, error_status, is_retryable
+
+
+class UpstreamTarget:
+    """One (base_url, api_key, model) upstream with its own client and health state.
+
+    Each target keeps its own client, so keep-alive connections are pooled
+    per endpoint and key.
+    """
+
+    def __init__(self, name: str, client: Any, model: Optional[str] = None, weight: float = 1.0):
+        self.name = name
+        self.client = client
+        self.model = model
+        self.weight = weight
+        self.in_flight = 0
+        self.latency: Optional[float] = None  # EWMA of successful call latency, seconds
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.probing = False
+        self.requests = 0
+        self.failures = 0
+
+    def snapshot(self, now: float) -> Dict:
+        return {
+            'name': self.name,
+            'model': self.model,
+            'healthy': self.ejected_until <= now,
+            'ejected_for': round(max(0.0, self.ejected_until - now), 2),
+            'in_flight': self.in_flight,
+            'latency_ewma': round(self.latency, 4) if self.latency is not None else None,
+            'requests': self.requests,
+            'failures': self.failures,
+            'ejections': self.ejections
+        }
+
+
+class _Completions:
+    def __init__(self, router: 'UpstreamRouter'):
+        self._router = router
+
+    def create(self, **kwargs):
+        if self._router.asynchronous:
+            return self._router._acreate(kwargs)
+        return self._router._create(kwargs)
+
+
+class UpstreamRouter:
+    """Spreads completions over a pool of upstream targets.
+
+    Stands in for the OpenAI client (router.chat.completions.create), so
+    the scheduler's retries go through it and can land on another target.
+    Each call picks the healthy target with the lowest
+    (in_flight + 1) * recent latency / weight. Targets that fail
+    `eject_after` retryable calls in a row, or answer 429, are ejected.
+    Ejection lasts `eject_seconds`, doubling on every repeat up to
+    `max_eject_seconds` (a 429's Retry-After is used when it is longer).
+    After that a single probe request is let through; success restores
+    the target and failure ejects it again. When every target is ejected,
+    the one that comes back soonest is probed early rather than failing
+    the call outright.
+    """
+
+    def __init__(self, targets: List[UpstreamTarget], asynchronous: bool = False, eject_after: int = 3,
+                 eject_seconds: float = 10.0, max_eject_seconds: float = 300.0, latency_alpha: float = 0.3,
+                 clock: Callable[[], float] = time.monotonic, rng: Optional[random.Random] = None):
+        if not targets:
+            raise ValueError('an upstream router needs at least one target')
+        self.targets = targets
+        self.asynchronous = asynchronous
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self.latency_alpha = latency_alpha
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.chat = type('Chat', (), {})()
+        self.chat.completions = _Completions(self)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, client_factory: Callable[[str, Optional[str]], Any],
+                 asynchronous: bool = False) -> Optional['UpstreamRouter']:
+        """Router over LLM_UPSTREAMS, or None when it is not set.
+
+        LLM_UPSTREAMS is a JSON list of {"base_url", "api_key" or
+        "api_key_env", "model", "name", "weight"} objects; only one of
+        api_key/api_key_env is required. client_factory(api_key, base_url)
+        builds the client for each target.
+        """
+        raw = os.getenv('LLM_UPSTREAMS', '').strip()
+        if not raw:
+            return None
+        targets = []
+        for index, spec in enumerate(json.loads(raw)):
+            api_key = spec.get('api_key') or os.getenv(spec.get('api_key_env', ''), '')
+            if not api_key:
+                raise ValueError(f'LLM_UPSTREAMS[{index}] has no api_key (or api_key_env is unset)')
+            targets.append(UpstreamTarget(
+                name=spec.get('name') or f"{spec.get('base_url') or 'default'}#{index}",
+                client=client_factory(api_key, spec.get('base_url')),
+                model=spec.get('model'),
+                weight=float(spec.get('weight', 1.0))
+            ))
+        return cls(
+            targets,
+            asynchronous=asynchronous,
+            eject_after=int(os.getenv('LLM_UPSTREAM_EJECT_AFTER', 3)),
+            eject_seconds=float(os.getenv('LLM_UPSTREAM_EJECT_SECONDS', 10)),
+            max_eject_seconds=float(os.getenv('LLM_UPSTREAM_MAX_EJECT_SECONDS', 300))
+        )
+
+    def stats(self) -> Dict:
+        now = self.clock()
+        with self._lock:
+            return {'targets': [target.snapshot(now) for target in self.targets]}
+
+    def healthy(self) -> Dict:
+        """target name -> 1 if it is taking traffic, for the health gauge"""
+        now = self.clock()
+        with self._lock:
+            return {(target.name,): int(target.ejected_until <= now) for target in self.targets}
+
+    def _create(self, kwargs: Dict):
+        target, probe = self._acquire()
+        start = self.clock()
+        try:
+            response = target.client.chat.completions.create(**self._arguments(target, kwargs))
+        except Exception as e:
+            self._release(target, probe, self.clock() - start, e)
+            raise
+        if kwargs.get('stream'):
+            return self._watch_stream(target, probe, self.clock() - start, response)
+        self._release(target, probe, self.clock() - start)
+        return response
+
+    async def _acreate(self, kwargs: Dict):
+        target, probe = self._acquire()
+        start = self.clock()
+        try:
+            response = await target.client.chat.completions.create(**self._arguments(target, kwargs))
+        except BaseException as e:
+            self._release(target, probe, self.clock() - start, e)
+            raise
+        if kwargs.get('stream'):
+            return self._awatch_stream(target, probe, self.clock() - start, response)
+        self._release(target, probe, self.clock() - start)
+        return response
+
+    def _watch_stream(self, target: UpstreamTarget, probe: bool, latency: float, stream):
+        # A stream holds its target until it is fully read, but only the time
+        # to the response headers counts as latency: output length is not the target's doing
+        try:
+            yield from stream
+        except BaseException as e:
+            self._release(target, probe, latency, e)
+            raise
+        self._release(target, probe, latency)
+
+    async def _awatch_stream(self, target: UpstreamTarget, probe: bool, latency: float, stream):
+        try:
+            async for chunk in stream:
+                yield chunk
+        except BaseException as e:
+            self._release(target, probe, latency, e)
+            raise
+        self._release(target, probe, latency)
+
+    @staticmethod
+    def _arguments(target: UpstreamTarget, kwargs: Dict) -> Dict:
+        if target.model:
+            return {**kwargs, 'model': target.model}
+        return kwargs
+
+    def _acquire(self) -> Tuple[UpstreamTarget, bool]:
+        """The target for the next call, and whether that call is its probe"""
+        now = self.clock()
+        with self._lock:
+            candidates = [target for target in self.targets
+                          if target.ejected_until <= now and not target.probing]
+            if not candidates:
+                # Everything is ejected or mid-probe: probe whichever returns first
+                candidates = [min(self.targets, key=lambda target: (target.probing, target.ejected_until))]
+            known = [target.latency for target in candidates if target.latency is not None]
+            # Unmeasured targets are assumed as fast as the best known one, so they get tried
+            default = min(known) if known else 1.0
+            target = min(candidates, key=lambda target: (
+                (target.in_flight + 1) * (target.latency if target.latency is not None else default)
+                / target.weight,
+                self.rng.random()
+            ))
+            # Coming back from an ejection: one request decides. Calls that
+            # only land here because nothing else is available are not it.
+            probe = bool(target.ejections and target.consecutive_failures and not target.probing)
+            if probe:
+                target.probing = True
+            target.in_flight += 1
+            target.requests += 1
+            return target, probe
+
+    def _release(self, target: UpstreamTarget, probe: bool, latency: float,
+                 error: Optional[BaseException] = None):
+        # Client errors (400s) mean the request was bad, not the target
+        failed = isinstance(error, Exception) and is_retryable(error)
+        status = error_status(error) if failed else None
+        with self._lock:
+            target.in_flight -= 1
+            if probe:
+                target.probing = False
+            if error is None:
+                target.latency = latency if target.latency is None else \
+                    self.latency_alpha * latency + (1 - self.latency_alpha) * target.latency
+            if failed:
+                target.failures += 1
+                target.consecutive_failures += 1
+                if status == 429 or target.consecutive_failures >= self.eject_after or target.ejections:
+                    duration = min(self.max_eject_seconds, self.eject_seconds * 2 ** target.ejections)
+                    if status == 429:
+                        duration = max(duration, error_retry_after(error) or 0)
+                    target.ejected_until = self.clock() + duration
+                    target.ejections += 1
+            elif isinstance(error, Exception) or error is None:
+                # Reached the target fine; cancelled or abandoned calls change nothing
+                target.consecutive_failures = 0
+                target.ejections = 0
+        UPSTREAM_TARGET_REQUESTS.inc(
+            target=target.name, outcome='ok' if error is None else 'error' if failed else 'other'
+        )
@@ -0,0 +1,529 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from . import priority
+from .metrics import UPSTREAM_ATTEMPT_SECONDS, UPSTREAM_ERRORS, UPSTREAM_QUEUE_WAIT_SECONDS, UPSTREAM_SHED
+from .priority import PRIORITIES, PriorityPolicy
+
+# Statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {'APITimeoutError', 'APIConnectionError', 'Timeout', 'ConnectError'}
+
+
+class UpstreamError(Exception):
+    """An upstream LLM call failed after the scheduler gave up on it"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def error_status(error: Exception) -> Optional[int]:
+    return getattr(error, 'status_code', None)
+
+
+def error_retry_after(error: Exception) -> Optional[float]:
+    """Seconds from a Retry-After (or retry-after-ms) response header, if any"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    if error_status(error) in RETRYABLE_STATUSES:
+        return True
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    # Checked by name so the scheduler works with any client library
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+
+def is_upstream_failure(error: Exception) -> bool:
+    """Whether error came from the upstream or the network on the way to it, not from this service"""
+    if isinstance(error, (UpstreamError, TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    return error_status(error) is not None or is_retryable(error)
+
+
+class TokenBucket:
+    """Refills `rate_per_minute` units per minute up to one minute's worth.
+
+    reserve() never blocks: it takes the units (possibly into debt) and
+    returns how long the caller must wait before using them.
+    """
+
+    def __init__(self, rate_per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = rate_per_minute
+        self.tokens = rate_per_minute
+        self.clock = clock
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self, amount: float):
+        """Give back an over-estimate once the real usage is known"""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit driven by throttling and latency.
+
+    Each fast success raises the limit by 1/limit (about +1 per window of
+    calls); a 429 or a call slower than `latency_target` halves it. Other
+    failures leave it alone, or halve it when the caller marks them as
+    throttling (server errors, timeouts, refused connections), so a fast
+    failing upstream never looks like a fast healthy one.
+    """
+
+    def __init__(self, initial: int = 8, minimum: int = 1, maximum: int = 64,
+                 latency_target: float = 30.0):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def try_acquire(self) -> bool:
+        with self._condition:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency: Optional[float] = None, throttled: bool = False, failed: bool = False):
+        with self._condition:
+            self.in_flight -= 1
+            if throttled or (latency is not None and latency > self.latency_target):
+                self.limit = max(self.minimum, self.limit / 2)
+            elif latency is not None and not failed:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class _Waiter:
+    __slots__ = ('priority', 'start', 'enqueued', 'granted', 'wake')
+
+    def __init__(self, name: str, start: float, enqueued: float, wake: Callable[[], None]):
+        self.priority = name
+        self.start = start
+        self.enqueued = enqueued
+        self.granted = False
+        self.wake = wake
+
+
+class FairSlotQueue:
+    """Hands out the concurrency limiter's slots by weighted fair queuing.
+
+    Every waiting call gets a virtual start tag - the later of the queue's
+    virtual time and the finish tag of its class's previous call - and a
+    finish tag of start + estimated tokens / class weight. A freed slot goes
+    to the waiter with the lowest start tag, so under contention the
+    classes share upstream capacity in proportion to weight, and a class
+    that sat idle banks no credit. The last `reserved` slots only go to the
+    top class, so it never waits behind a full house of long bulk calls.
+    A call still queued at its deadline is shed with a 503 instead of being
+    sent upstream late.
+    """
+
+    def __init__(self, limiter: AdaptiveConcurrencyLimiter, policy: Optional[PriorityPolicy] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.limiter = limiter
+        self.policy = policy or PriorityPolicy()
+        self.clock = clock
+        self._queues = {name: deque() for name in PRIORITIES}
+        self._finish = {name: 0.0 for name in PRIORITIES}
+        self._virtual_time = 0.0
+        self._in_flight = {name: 0 for name in PRIORITIES}
+        self._stats = {name: {'admitted': 0, 'shed': 0, 'waits': deque(maxlen=1000)} for name in PRIORITIES}
+        self._lock = threading.Lock()
+
+    def resolve(self) -> tuple:
+        """(class, deadline) for the calling context, falling back to the policy default"""
+        name, deadline = priority.current()
+        return (name if name in PRIORITIES else self.policy.default), deadline
+
+    def acquire(self, name: str, cost: int = 0, deadline: Optional[float] = None):
+        """Block until the call may take a slot; raises UpstreamError when it is shed"""
+        event = threading.Event()
+        waiter = self._enqueue(name, cost, event.set)
+        timeout = self._timeout(waiter, deadline)
+        if not waiter.granted and not event.wait(timeout):
+            self._give_up(waiter)
+        self._admitted(waiter)
+
+    async def aacquire(self, name: str, cost: int = 0, deadline: Optional[float] = None):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        waiter = self._enqueue(name, cost, wake)
+        if not waiter.granted:
+            try:
+                await asyncio.wait_for(future, self._timeout(waiter, deadline))
+            except asyncio.TimeoutError:
+                self._give_up(waiter)
+            except asyncio.CancelledError:
+                # Granted just as the caller went away: hand the slot straight on
+                with self._lock:
+                    granted = waiter.granted
+                    if not granted:
+                        self._queues[name].remove(waiter)
+                if granted:
+                    self.release(name)
+                raise
+        self._admitted(waiter)
+
+    def release(self, name: str, latency: Optional[float] = None, throttled: bool = False,
+                failed: bool = False):
+        self.limiter.release(latency=latency, throttled=throttled, failed=failed)
+        with self._lock:
+            self._in_flight[name] -= 1
+            granted = self._dispatch()
+        for waiter in granted:
+            waiter.wake()
+
+    def depths(self) -> Dict:
+        """class -> calls waiting, for the queue gauge"""
+        with self._lock:
+            return {(name,): len(queue) for name, queue in self._queues.items()}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = {}
+            for name in PRIORITIES:
+                waits = sorted(self._stats[name]['waits'])
+                stats[name] = {
+                    'weight': self.policy.weights[name],
+                    'queued': len(self._queues[name]),
+                    'in_flight': self._in_flight[name],
+                    'admitted': self._stats[name]['admitted'],
+                    'shed': self._stats[name]['shed'],
+                    'wait_p50': round(waits[len(waits) // 2], 4) if waits else None,
+                    'wait_p95': round(waits[int(len(waits) * 0.95)], 4) if waits else None
+                }
+            return stats
+
+    def _enqueue(self, name: str, cost: int, wake: Callable[[], None]) -> _Waiter:
+        with self._lock:
+            start = max(self._virtual_time, self._finish[name])
+            self._finish[name] = start + max(cost, 1) / self.policy.weights[name]
+            waiter = _Waiter(name, start, self.clock(), wake)
+            self._queues[name].append(waiter)
+            granted = self._dispatch()
+        # The new waiter may have gone straight through; anyone else woken is a bonus
+        for other in granted:
+            if other is not waiter:
+                other.wake()
+        return waiter
+
+    def _dispatch(self) -> List[_Waiter]:
+        """Grant free slots to the lowest start tags; called with the lock held"""
+        granted = []
+        while True:
+            best = None
+            for name, queue in self._queues.items():
+                if queue and self._may_admit(name) and (best is None or queue[0].start < best.start):
+                    best = queue[0]
+            if best is None or not self.limiter.try_acquire():
+                return granted
+            self._queues[best.priority].popleft()
+            self._virtual_time = max(self._virtual_time, best.start)
+            self._in_flight[best.priority] += 1
+            best.granted = True
+            granted.append(best)
+
+    def _may_admit(self, name: str) -> bool:
+        if name == PRIORITIES[0]:
+            return True
+        return self.limiter.in_flight < max(1, int(self.limiter.limit) - self.policy.reserved)
+
+    def _timeout(self, waiter: _Waiter, deadline: Optional[float]) -> Optional[float]:
+        max_wait = self.policy.max_wait.get(waiter.priority)
+        if max_wait:
+            class_deadline = waiter.enqueued + max_wait
+            deadline = class_deadline if deadline is None else min(deadline, class_deadline)
+        return None if deadline is None else max(0.0, deadline - self.clock())
+
+    def _give_up(self, waiter: _Waiter):
+        """Shed a waiter whose deadline passed - unless a slot arrived in the meantime"""
+        with self._lock:
+            if waiter.granted:
+                return
+            self._queues[waiter.priority].remove(waiter)
+            self._stats[waiter.priority]['shed'] += 1
+        UPSTREAM_SHED.inc(priority=waiter.priority)
+        waited = self.clock() - waiter.enqueued
+        raise UpstreamError(f'{waiter.priority} call shed after waiting {waited:.1f}s for an upstream slot', 503)
+
+    def _admitted(self, waiter: _Waiter):
+        waited = self.clock() - waiter.enqueued
+        with self._lock:
+            self._stats[waiter.priority]['admitted'] += 1
+            self._stats[waiter.priority]['waits'].append(waited)
+        UPSTREAM_QUEUE_WAIT_SECONDS.observe(waited, priority=waiter.priority)
+
+
+class UpstreamScheduler:
+    """Admission control and retries for upstream LLM calls.
+
+    Every call first queues for a concurrency slot by priority class (see
+    FairSlotQueue), then waits for room in the requests-per-minute and
+    tokens-per-minute buckets. Retryable failures
+    back off exponentially with full jitter, or for as long as Retry-After
+    asks, and feed the adaptive concurrency limit.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+                 policy: Optional[PriorityPolicy] = None, max_retries: int = 4,
+                 base_delay: float = 0.5, max_delay: float = 20.0,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep,
+                 rng: Optional[random.Random] = None):
+        self.request_bucket = TokenBucket(requests_per_minute, clock) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute, clock) if tokens_per_minute else None
+        self.limiter = limiter or AdaptiveConcurrencyLimiter()
+        self.queue = FairSlotQueue(self.limiter, policy, clock)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self._stats = {'calls': 0, 'retries': 0, 'throttled': 0, 'failures': 0}
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'UpstreamScheduler':
+        limiter = AdaptiveConcurrencyLimiter(
+            initial=int(os.getenv('LLM_CONCURRENCY_INITIAL', 8)),
+            minimum=int(os.getenv('LLM_CONCURRENCY_MIN', 1)),
+            maximum=int(os.getenv('LLM_CONCURRENCY_MAX', 64)),
+            latency_target=float(os.getenv('LLM_LATENCY_TARGET', 30))
+        )
+        return cls(
+            requests_per_minute=float(os.getenv('LLM_RPM_LIMIT', 0)),
+            tokens_per_minute=float(os.getenv('LLM_TPM_LIMIT', 0)),
+            limiter=limiter,
+            policy=PriorityPolicy.from_env(),
+            max_retries=int(os.getenv('LLM_MAX_RETRIES', 4)),
+            base_delay=float(os.getenv('LLM_RETRY_BASE_DELAY', 0.5)),
+            max_delay=float(os.getenv('LLM_RETRY_MAX_DELAY', 20))
+        )
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            # Honour the server, plus a little jitter so waiters do not stampede
+            return retry_after + self.rng.uniform(0, self.base_delay)
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, fn: Callable[[], Any], estimated_tokens: int = 0) -> Any:
+        name, deadline = self.queue.resolve()
+        attempt = 0
+        while True:
+            self.queue.acquire(name, estimated_tokens, deadline)
+            wait = self._reserve(estimated_tokens)
+            if wait:
+                self.sleep(wait)
+            outcome = self._run(fn)
+            delay = self._attempt_outcome(name, attempt, estimated_tokens, *outcome)
+            if delay is None:
+                return outcome[0]
+            self.sleep(delay)
+            attempt += 1
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]], estimated_tokens: int = 0) -> Any:
+        name, deadline = self.queue.resolve()
+        attempt = 0
+        while True:
+            await self.queue.aacquire(name, estimated_tokens, deadline)
+            start = self.clock()
+            try:
+                wait = self._reserve(estimated_tokens)
+                if wait:
+                    await asyncio.sleep(wait)
+                start = self.clock()
+                outcome = (await fn(), None, self.clock() - start)
+            except asyncio.CancelledError:
+                # The caller went away - free the slot without judging the upstream
+                self.queue.release(name)
+                raise
+            except Exception as e:
+                outcome = (None, e, self.clock() - start)
+            delay = self._attempt_outcome(name, attempt, estimated_tokens, *outcome)
+            if delay is None:
+                return outcome[0]
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stream(self, fn: Callable[[], Any], estimated_tokens: int = 0) -> Iterator:
+        """call() for a streaming response, yielding its chunks.
+
+        The slot is held until the stream is exhausted, fails or is closed,
+        and the latency the limiter learns from is the whole stream's
+        duration. Only opening the stream is retried; nothing is acquired
+        until the first chunk is asked for.
+        """
+        name, deadline = self.queue.resolve()
+        attempt = 0
+        while True:
+            self.queue.acquire(name, estimated_tokens, deadline)
+            wait = self._reserve(estimated_tokens)
+            if wait:
+                self.sleep(wait)
+            start = self.clock()
+            stream, error, latency = self._run(fn)
+            if error is None:
+                break
+            self.sleep(self._attempt_outcome(name, attempt, estimated_tokens, None, error, latency))
+            attempt += 1
+
+        usage = None
+        try:
+            for chunk in stream:
+                usage = getattr(chunk, 'usage', None) or usage
+                yield chunk
+        except GeneratorExit:
+            # Closed by the caller - free the slot without judging the upstream
+            self.queue.release(name)
+            raise
+        except Exception as e:
+            self._release(name, e, self.clock() - start)
+            raise
+        self._release(name, None, self.clock() - start)
+        self._reconcile_tokens(usage, estimated_tokens)
+
+    async def astream(self, fn: Callable[[], Awaitable[Any]], estimated_tokens: int = 0) -> AsyncIterator:
+        """stream() for an async client"""
+        name, deadline = self.queue.resolve()
+        attempt = 0
+        while True:
+            await self.queue.aacquire(name, estimated_tokens, deadline)
+            start = self.clock()
+            try:
+                wait = self._reserve(estimated_tokens)
+                if wait:
+                    await asyncio.sleep(wait)
+                start = self.clock()
+                stream = await fn()
+                break
+            except asyncio.CancelledError:
+                self.queue.release(name)
+                raise
+            except Exception as e:
+                delay = self._attempt_outcome(name, attempt, estimated_tokens, None, e, self.clock() - start)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+        usage = None
+        try:
+            async for chunk in stream:
+                usage = getattr(chunk, 'usage', None) or usage
+                yield chunk
+        except (GeneratorExit, asyncio.CancelledError):
+            self.queue.release(name)
+            raise
+        except Exception as e:
+            self._release(name, e, self.clock() - start)
+            raise
+        self._release(name, None, self.clock() - start)
+        self._reconcile_tokens(usage, estimated_tokens)
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['concurrency_limit'] = int(self.limiter.limit)
+        stats['in_flight'] = self.limiter.in_flight
+        stats['priorities'] = self.queue.stats()
+        return stats
+
+    def _run(self, fn: Callable[[], Any]) -> tuple:
+        start = self.clock()
+        try:
+            return fn(), None, self.clock() - start
+        except Exception as e:
+            return None, e, self.clock() - start
+
+    def _reserve(self, estimated_tokens: int) -> float:
+        wait = 0.0
+        if self.request_bucket:
+            wait = max(wait, self.request_bucket.reserve(1))
+        if self.token_bucket and estimated_tokens:
+            wait = max(wait, self.token_bucket.reserve(estimated_tokens))
+        return wait
+
+    def _attempt_outcome(self, name: str, attempt: int, estimated_tokens: int, result: Any,
+                         error: Optional[Exception], latency: float) -> Optional[float]:
+        """Release the slot and decide: None means done, a number means retry after it.
+
+        Raises UpstreamError when the failure is final.
+        """
+        status = self._release(name, error, latency)
+        if error is None:
+            self._reconcile_tokens(getattr(result, 'usage', None), estimated_tokens)
+            return None
+
+        if not is_retryable(error) or attempt >= self.max_retries:
+            with self._stats_lock:
+                self._stats['failures'] += 1
+            UPSTREAM_ERRORS.inc(status=status or 'none')
+            raise UpstreamError(str(error), status, error_retry_after(error)) from error
+
+        with self._stats_lock:
+            self._stats['retries'] += 1
+        return self.backoff_delay(attempt, error_retry_after(error))
+
+    def _release(self, name: str, error: Optional[Exception], latency: float) -> Optional[int]:
+        """Free the slot, feeding the attempt's outcome to the limiter; returns the error's status"""
+        status = error_status(error) if error else None
+        # 5xx, timeouts and connection errors mean the upstream is struggling: back off like a 429.
+        # Client errors (400, 401, ...) say nothing about capacity, so they only skip the increase.
+        self.queue.release(name, latency=latency, throttled=error is not None and is_retryable(error),
+                           failed=error is not None)
+
+        with self._stats_lock:
+            self._stats['calls'] += 1
+            if status == 429:
+                self._stats['throttled'] += 1
+        UPSTREAM_ATTEMPT_SECONDS.observe(
+            latency, outcome='ok' if error is None else 'throttled' if status == 429 else 'error'
+        )
+        return status
+
+    def _reconcile_tokens(self, usage: Any, estimated_tokens: int):
+        actual = getattr(usage, 'total_tokens', None)
+        if self.token_bucket and estimated_tokens and isinstance(actual, int):
+            self.token_bucket.refund(estimated_tokens - actual)
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+# Tests import services/ and benchmarks/ the way the apps do, from llm-service
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeOpenAIClient  # noqa: E402
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    """OpenAIService against an in-process fake upstream, with its stores under tmp_path"""
+    from services.openai_service import OpenAIService
+
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    monkeypatch.delenv('LLM_UPSTREAMS', raising=False)
+    monkeypatch.setenv('LLM_CACHE_PATH', str(tmp_path / 'completions.sqlite3'))
+    monkeypatch.setenv('KEYWORD_INDEX_DIR', str(tmp_path / 'keywords'))
+    service = OpenAIService()
+    service.client = FakeOpenAIClient()
+    return service
@@ -0,0 +1,195 @@
+import asyncio
+import time
+
+import pytest
+
+from benchmarks.fakes import FakeOpenAIClient
+from services.article_pipeline import ArticlePipeline, long_form_error
+from services.seo_scorer import SEOScorer
+from services.upstream_scheduler import AdaptiveConcurrencyLimiter, UpstreamScheduler
+
+LATENCY = 0.3
+
+
+def outline(sections: int) -> dict:
+    return {'title': 'Guide', 'sections': [
+        {'heading': f'Part {n}', 'points': ['first point', 'second point']} for n in range(1, sections + 1)
+    ]}
+
+
+@pytest.fixture
+def pipeline(service):
+    service.client = FakeOpenAIClient(latency=LATENCY)
+    service.cache = None
+    service.similar = None
+    service.scheduler = UpstreamScheduler(limiter=AdaptiveConcurrencyLimiter(initial=64, maximum=64))
+    pipeline = ArticlePipeline(service, SEOScorer(), max_workers=4)
+    yield pipeline
+    pipeline.executor.shutdown()
+
+
+def test_long_form_sections_are_not_limited_by_the_pipeline_pool(pipeline):
+    start = time.perf_counter()
+    result = pipeline.write_long_form('Guide', 'crm tools', outline(20), word_count=2000)
+    elapsed = time.perf_counter() - start
+    assert [section['heading'] for section in result['sections']] == [f'Part {n}' for n in range(1, 21)]
+    # Introduction plus one round of sections, although the pipeline pool has 4 threads
+    assert elapsed < LATENCY * 2 + 0.2
+
+
+def test_long_form_outline_sections_only_need_a_heading(service):
+    bare = {'sections': [{'heading': 'Why CRM'}, {'heading': 'Picking one', 'points': ['price']}]}
+    assert long_form_error(bare) is None
+    error = long_form_error({'sections': [{'points': ['price']}]})
+    assert error == "outline.sections[0]: missing required property 'heading'"
+    assert long_form_error({'sections': [{'heading': 'Why', 'points': 'price'}]}) is not None
+
+    service.client = None
+    pipeline = ArticlePipeline(service, SEOScorer(), max_workers=2)
+    try:
+        result = pipeline.write_long_form('Guide', 'crm tools', bare, word_count=600)
+    finally:
+        pipeline.executor.shutdown()
+    assert [section['heading'] for section in result['sections']] == ['Why CRM', 'Picking one']
+
+
+class StubService:
+    """Pipeline stages with scripted failures; records which stages ran to completion"""
+
+    def __init__(self, fail=(), delay=0.05, titles=('Chosen title', 'Other title')):
+        self.fail = set(fail)
+        self.delay = delay
+        self.titles = list(titles)
+        self.finished = []
+
+    def _stage(self, name, value):
+        time.sleep(self.delay)
+        if name in self.fail:
+            raise RuntimeError(f'{name} failed')
+        self.finished.append(name)
+        return value
+
+    def generate_keywords(self, seed_keyword, use_cache=True, native=True):
+        return self._stage('keywords', ['crm tools', 'crm software'])
+
+    def generate_titles(self, keyword, tone='professional', use_cache=True, native=True):
+        return self._stage('titles', self.titles)
+
+    def generate_topics(self, title, keyword, use_cache=True, native=True):
+        return self._stage(f'topics:{title}', [outline(2)])
+
+    def generate_content(self, title, keyword, outline, content_type, word_count, use_cache=True):
+        return self._stage(f'content:{content_type}', 'Some content about crm tools.')
+
+
+class AsyncStubService(StubService):
+    async def _astage(self, name, value):
+        await asyncio.sleep(self.delay)
+        if name in self.fail:
+            raise RuntimeError(f'{name} failed')
+        self.finished.append(name)
+        return value
+
+    async def generate_keywords(self, seed_keyword, use_cache=True, native=True):
+        return await self._astage('keywords', ['crm tools', 'crm software'])
+
+    async def generate_titles(self, keyword, tone='professional', use_cache=True, native=True):
+        return await self._astage('titles', self.titles)
+
+    async def generate_topics(self, title, keyword, use_cache=True, native=True):
+        return await self._astage(f'topics:{title}', [outline(2)])
+
+    async def generate_content(self, title, keyword, outline, content_type, word_count, use_cache=True):
+        return await self._astage(f'content:{content_type}', 'Some content about crm tools.')
+
+
+def run(service, **kwargs):
+    pipeline = ArticlePipeline(service, SEOScorer(), max_workers=2)
+    try:
+        if isinstance(service, AsyncStubService):
+            return asyncio.run(pipeline.arun('crm', analyze=False, **kwargs))
+        return pipeline.run('crm', analyze=False, **kwargs)
+    finally:
+        pipeline.executor.shutdown()
+
+
+@pytest.mark.parametrize('stub', [StubService, AsyncStubService])
+def test_unused_outline_failure_does_not_fail_the_article(stub):
+    result = run(stub(fail={'topics:Other title'}))
+    assert result['content']['blog_intro']['content']
+    assert result['topics'] == [
+        {'title': 'Chosen title', 'outlines': [outline(2)]},
+        {'title': 'Other title', 'error': 'topics:Other title failed'},
+    ]
+
+
+@pytest.mark.parametrize('stub', [StubService, AsyncStubService])
+def test_keyword_research_failure_is_reported_when_the_keyword_is_given(stub):
+    result = run(stub(fail={'keywords'}), keyword='crm tools')
+    assert result['keywords'] == []
+    assert result['keywords_error'] == 'keywords failed'
+    assert result['content']['blog_intro']['content']
+
+
+@pytest.mark.parametrize('stub', [StubService, AsyncStubService])
+def test_given_keyword_keeps_research_off_the_critical_path(stub):
+    service = stub()
+    research = service.generate_keywords
+    if stub is AsyncStubService:
+        async def generate_keywords(*args, **kwargs):
+            await asyncio.sleep(0.5)
+            return await research(*args, **kwargs)
+    else:
+        def generate_keywords(*args, **kwargs):
+            time.sleep(0.5)
+            return research(*args, **kwargs)
+    service.generate_keywords = generate_keywords
+
+    result = run(service, keyword='crm tools')
+    assert result['keywords'] == ['crm tools', 'crm software']
+    # Titles, outlines and content ran while research was still going
+    assert result['timings']['content[blog_intro]']['started_at'] < 0.4
+
+
+@pytest.mark.parametrize('stub', [StubService, AsyncStubService])
+def test_keyword_research_failure_fails_the_article_when_it_picks_the_keyword(stub):
+    with pytest.raises(RuntimeError):
+        run(stub(fail={'keywords'}))
+
+
+def test_async_failure_cancels_sibling_stages():
+    service = AsyncStubService(fail={'topics:Chosen title'})
+    slow_generate_topics = service.generate_topics
+
+    async def generate_topics(title, keyword, use_cache=True, native=True):
+        if title == 'Other title':
+            await asyncio.sleep(0.5)
+        return await slow_generate_topics(title, keyword, use_cache, native)
+
+    service.generate_topics = generate_topics
+    pipeline = ArticlePipeline(service, SEOScorer(), max_workers=2)
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await pipeline.arun('crm', analyze=False)
+        # Left running, the other outline would finish while the loop is still up
+        await asyncio.sleep(0.7)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pipeline.executor.shutdown()
+    assert 'topics:Other title' not in service.finished
+
+
+def test_sync_failure_cancels_queued_stages():
+    service = StubService(fail={'topics:Chosen title'}, titles=('Chosen title', 'Other title', 'Third title'))
+    pipeline = ArticlePipeline(service, SEOScorer(), max_workers=1)
+    try:
+        with pytest.raises(RuntimeError):
+            pipeline.run('crm', analyze=False)
+        pipeline.executor.shutdown(wait=True)
+    finally:
+        pipeline.executor.shutdown()
+    # With one pipeline thread the third outline was still queued when the chosen one failed
+    assert 'topics:Third title' not in service.finished
@@ -0,0 +1,61 @@
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from services.async_openai_service import AsyncOpenAIService
+
+
+class FakeAsyncCompletions:
+    async def create(self, model, messages, **kwargs):
+        await asyncio.sleep(0)
+        content = json.dumps(['fake keyword one', 'fake keyword two', 'fake keyword three'])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+class ThreadRecorder:
+    """Wraps an object and records the thread each method call runs on"""
+
+    def __init__(self, target, calls):
+        self._target = target
+        self._calls = calls
+
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            self._calls.append((name, threading.get_ident()))
+            return attribute(*args, **kwargs)
+        return call
+
+
+@pytest.fixture
+def async_service(tmp_path, monkeypatch):
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    monkeypatch.delenv('LLM_UPSTREAMS', raising=False)
+    monkeypatch.setenv('LLM_CACHE_PATH', str(tmp_path / 'completions.sqlite3'))
+    monkeypatch.setenv('KEYWORD_INDEX_DIR', str(tmp_path / 'keywords'))
+    service = AsyncOpenAIService()
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=FakeAsyncCompletions()))
+    return service
+
+
+def test_cache_and_index_io_stays_off_the_event_loop(async_service):
+    calls = []
+    async_service.cache = ThreadRecorder(async_service.cache, calls)
+    async_service.keyword_index = ThreadRecorder(async_service.keyword_index, calls)
+
+    async def generate():
+        loop_thread = threading.get_ident()
+        first = await async_service.generate_keywords('crm tools', native=True)
+        second = await async_service.generate_keywords('crm tools', use_cache=False, native=True)
+        return loop_thread, first, second
+
+    loop_thread, first, second = asyncio.run(generate())
+    assert first == second == ['fake keyword one', 'fake keyword two', 'fake keyword three']
+    assert {name for name, _ in calls} >= {'get', 'set', 'expansions', 'add'}
+    assert all(thread != loop_thread for _, thread in calls)
@@ -0,0 +1,53 @@
+import signal
+
+import pytest
+
+from services.batch_scorer import BatchScorer, analyze
+
+
+class KillsWorker:
+    """Unpickling this in a pool worker SIGKILLs that worker"""
+
+    def __reduce__(self):
+        return signal.raise_signal, (signal.SIGKILL,)
+
+
+def item(n: int) -> dict:
+    return {'content': f'CRM tools help small teams. Draft number {n}.', 'keyword': 'crm tools',
+            'title': 'CRM tools for small teams'}
+
+
+@pytest.fixture
+def scorer():
+    scorer = BatchScorer(max_workers=2, chunk_size=1)
+    yield scorer
+    scorer.shutdown()
+
+
+@pytest.mark.parametrize('order', BatchScorer.ORDERS)
+def test_scores_every_item(scorer, order):
+    results = list(scorer.score([item(n) for n in range(7)] + ['not an object'], order))
+    assert sorted(result['index'] for result in results) == list(range(8))
+    assert all('analysis' in result for result in results if result['index'] < 7)
+    assert [result for result in results if result['index'] == 7][0]['error']
+
+
+def test_killed_worker_fails_only_chunks_in_flight(scorer):
+    items = [dict(item(0), secondary_keywords=KillsWorker())] + [item(n) for n in range(1, 10)]
+    results = list(scorer.score(items))
+
+    assert [result['index'] for result in results] == list(range(10))
+    failed = [result['index'] for result in results if 'error' in result]
+    assert 0 in failed and len(failed) <= scorer.max_workers
+    assert 'worker failed' in results[0]['error']
+
+    # The pool was replaced: later batches and single submissions work
+    assert all('analysis' in result for result in scorer.score([item(n) for n in range(4)]))
+    future = scorer.submit(analyze, 'CRM tools help.', 'crm tools', 'CRM tools')
+    assert 'overall_score' in future.result(timeout=30)
+
+
+def test_submit_replaces_a_broken_pool(scorer):
+    with pytest.raises(Exception):
+        scorer.submit(analyze, KillsWorker(), 'crm', 'CRM').result(timeout=30)
+    assert scorer.submit(analyze, 'CRM tools help.', 'crm tools', 'CRM tools').result(timeout=30)
@@ -0,0 +1,80 @@
+import sqlite3
+import threading
+
+import pytest
+
+from services import completion_cache
+from services.completion_cache import CompletionCache
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'completions.sqlite3')
+
+
+def disk_rows(path):
+    with sqlite3.connect(path) as db:
+        return db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions').fetchone()
+
+
+def test_memory_then_disk_hits(path):
+    cache = CompletionCache(path, memory_entries=1)
+    cache.set('a', 'alpha')
+    cache.set('b', 'beta')
+    assert cache.get('b') == 'beta'
+    assert cache.get('a') == 'alpha'  # pushed out of memory, still on disk
+    assert cache.get('missing') is None
+    stats = cache.stats()
+    assert (stats['memory_hits'], stats['disk_hits'], stats['misses']) == (1, 1, 1)
+    assert CompletionCache(path).get('a') == 'alpha'  # another worker shares the file
+
+
+def test_disk_stays_under_budget_and_evicts_in_batches(path):
+    cache = CompletionCache(path, memory_entries=1, disk_max_bytes=10000)
+    passes = []
+    evict = cache._evict_disk
+    cache._evict_disk = lambda now: passes.append(evict(now)) or passes[-1]
+    for n in range(300):
+        cache.set(f'key{n}', 'x' * 100)
+        assert disk_rows(path)[1] <= 10000
+    assert cache._disk_bytes == disk_rows(path)[1]
+    # Each pass frees room down to the low-water mark instead of one row per write
+    assert len(passes) < 30
+    assert max(passes) >= 10
+
+
+def test_replacing_a_key_does_not_double_count(path):
+    cache = CompletionCache(path, disk_max_bytes=1000)
+    for _ in range(20):
+        cache.set('same', 'x' * 100)
+    assert cache._disk_bytes == disk_rows(path)[1] == 100
+
+
+def test_disk_hits_keep_entries_recent(path, monkeypatch):
+    monkeypatch.setattr(completion_cache, 'TOUCH_BATCH', 1)
+    cache = CompletionCache(path, memory_entries=1, disk_max_bytes=1000)
+    for n in range(9):
+        cache.set(f'key{n}', 'x' * 100)
+    cache.get('key0')  # least recently written, but just read
+    cache.set('key9', 'x' * 100)
+    cache.set('key10', 'x' * 100)
+    assert CompletionCache(path).get('key0') == 'x' * 100
+    assert CompletionCache(path).get('key1') is None
+
+
+def test_memory_hits_do_not_wait_for_disk(path):
+    cache = CompletionCache(path)
+    cache.set('hot', 'value')
+    with cache._disk_lock:
+        result = []
+        reader = threading.Thread(target=lambda: result.append(cache.get('hot')))
+        reader.start()
+        reader.join(timeout=2)
+    assert result == ['value']
+
+
+def test_memory_only(tmp_path):
+    cache = CompletionCache(None)
+    cache.set('a', 'alpha')
+    assert cache.get('a') == 'alpha'
+    assert 'disk_entries' not in cache.stats()
@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from services.job_queue import JobQueue
+
+
+def wait_for(queue, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in ('succeeded', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f'job {job_id} still {job["status"]}')
+
+
+@pytest.fixture
+def queue(tmp_path):
+    handlers = {
+        'echo': lambda payload: payload['value'],
+        'unserializable': lambda payload: {'tags': {1, 2, 3}},
+    }
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), handlers, workers=1, poll_interval=0.01)
+    queue.start()
+    yield queue
+    queue.stop(timeout=5)
+
+
+def test_jobs_run_and_store_results(queue):
+    job = queue.submit('echo', {'value': [1, 2]})
+    assert wait_for(queue, job['id'])['result'] == [1, 2]
+
+
+def test_unserializable_result_fails_the_job_not_the_worker(queue):
+    bad = queue.submit('unserializable', {})
+    failed = wait_for(queue, bad['id'])
+    assert failed['status'] == 'failed'
+    assert 'not JSON serializable' in failed['error']
+
+    good = queue.submit('echo', {'value': 'still running'})
+    assert wait_for(queue, good['id'])['result'] == 'still running'
+    assert all(thread.is_alive() for thread in queue._threads)
+
+
+def test_unexpected_errors_keep_the_worker_alive(queue, monkeypatch):
+    finish = queue._finish
+    broken = []
+
+    def flaky_finish(job_id, status, **fields):
+        if status == 'succeeded' and not broken:
+            broken.append(job_id)
+            raise RuntimeError('disk full')
+        finish(job_id, status, **fields)
+
+    monkeypatch.setattr(queue, '_finish', flaky_finish)
+    first = queue.submit('echo', {'value': 1})
+    failed = wait_for(queue, first['id'])
+    assert failed['status'] == 'failed'
+    assert 'disk full' in failed['error']
+
+    second = queue.submit('echo', {'value': 2})
+    assert wait_for(queue, second['id'])['result'] == 2
+    assert all(thread.is_alive() for thread in queue._threads)
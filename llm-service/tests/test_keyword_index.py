@@ -0,0 +1,142 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from services import keyword_index
+from services.keyword_index import KeywordIndex, KeywordSegment
+
+LLM_SERVICE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def index(tmp_path):
+    return KeywordIndex(str(tmp_path), refresh_seconds=0, compact_bytes=1 << 40)
+
+
+def test_segment_round_trip(tmp_path):
+    path = str(tmp_path / 'keywords.idx')
+    weights = {'crm tools': 5, 'crm software': 9, 'crm': 2, 'email marketing': 7}
+    edges = {'crm': {'crm tools': 3, 'crm software': 1}, 'crm tools': {'crm': 3}}
+    KeywordSegment.write(path, 4, weights, edges, displays={'crm': 'CRM', 'crm tools': 'CRM Tools'})
+
+    segment = KeywordSegment(path)
+    assert (segment.generation, segment.count, segment.edge_count) == (4, 4, 3)
+    assert [segment.term(i) for i in range(segment.count)] == sorted(weights)
+    assert segment.find('crm software') is not None and segment.find('crm s') is None
+    crm = segment.find('crm')
+    assert segment.display(crm) == 'CRM' and segment.weight(crm) == 2
+    assert segment.display(segment.find('email marketing')) == 'email marketing'
+    assert segment.neighbors(crm) == [('crm tools', 3), ('crm software', 1)]
+
+
+def test_prefix_returns_the_heaviest_completions(tmp_path):
+    path = str(tmp_path / 'keywords.idx')
+    weights = {f'seo {n:03d}': n for n in range(200)}
+    weights.update({'sales': 1000, 'seoul': 500})
+    KeywordSegment.write(path, 1, weights, {})
+    segment = KeywordSegment(path)
+
+    lo, hi = segment.prefix_range('seo ')
+    assert hi - lo == 200
+    assert [segment.term(i) for i in segment.top(lo, hi, 3)] == ['seo 199', 'seo 198', 'seo 197']
+    lo, hi = segment.prefix_range('seo')
+    assert [segment.term(i) for i in segment.top(lo, hi, 2)] == ['seoul', 'seo 199']
+    assert segment.top(*segment.prefix_range('zzz'), 5) == []
+
+
+def test_prefix_and_related_merge_the_segment_with_recent_additions(index):
+    index.import_list([('crm software', 50), ('crm tools', 10)], seed='crm')
+    index.compact()
+    index.add('crm', ['crm for startups', 'crm tools'])
+
+    assert index.prefix('CRM', 3) == [('crm software', 50), ('crm tools', 11), ('crm', 2)]
+    related = dict(index.related('crm'))
+    assert related == {'crm software': 1, 'crm tools': 2, 'crm for startups': 1}
+    suggestions = index.suggest('crm t')
+    assert [item['keyword'] for item in suggestions['prefix']] == ['crm tools']
+
+
+def test_expansions_are_capped_and_keep_their_casing(index):
+    assert index.expansions('CRM', 5) is None
+    index.add('CRM', ['CRM Software', 'crm for Startups', 'HubSpot CRM', 'Salesforce', 'Pipedrive', 'Zoho CRM'])
+    assert index.expansions('crm', 5) == ['crm for Startups', 'CRM Software', 'HubSpot CRM', 'Pipedrive', 'Salesforce']
+
+    # The casing first seen wins, and survives a compaction
+    index.add('crm', ['crm software'])
+    index.compact()
+    assert index.expansions('crm', 2) == ['CRM Software', 'crm for Startups']
+    assert index.stats()['warm'] == 2 and index.stats()['cold'] == 1
+
+
+def test_workers_pick_up_each_others_log(tmp_path, index):
+    other = KeywordIndex(str(tmp_path), refresh_seconds=0, compact_bytes=1 << 40)
+    index.add('seo', ['seo audit', 'seo tools', 'local seo'])
+    assert other.expansions('seo', 5) is not None
+
+    # A different process appends to the same log
+    script = (
+        'import sys; from services.keyword_index import KeywordIndex; '
+        "KeywordIndex(sys.argv[1]).add('email', ['email marketing', 'email templates', 'cold email'])"
+    )
+    subprocess.run([sys.executable, '-c', script, str(tmp_path)], cwd=LLM_SERVICE, check=True)
+    assert index.expansions('email', 5) is not None
+    assert other.expansions('email', 5) is not None
+
+
+def test_compaction_carries_over_appends_that_race_it(tmp_path, index, monkeypatch):
+    index.add('crm', ['crm tools', 'crm software', 'crm pricing'])
+    write = KeywordSegment.write
+
+    def write_while_another_worker_appends(*args, **kwargs):
+        write(*args, **kwargs)
+        index.add('seo', ['seo audit', 'seo tools', 'local seo'])
+
+    monkeypatch.setattr(KeywordSegment, 'write', staticmethod(write_while_another_worker_appends))
+    assert index.compact()
+    monkeypatch.undo()
+
+    assert index.stats()['generation'] == 1
+    assert index.stats()['terms'] == 4
+    assert not os.path.exists(index._log_path(0))
+    assert index.expansions('seo', 5) == ['local seo', 'seo audit', 'seo tools']
+
+    reopened = KeywordIndex(str(tmp_path))
+    assert reopened.expansions('crm', 5) == ['crm pricing', 'crm software', 'crm tools']
+    assert reopened.expansions('seo', 5) == ['local seo', 'seo audit', 'seo tools']
+
+
+def test_only_one_compaction_runs_at_a_time(index):
+    index.add('crm', ['crm tools', 'crm software', 'crm pricing'])
+    with keyword_index._locked(index._compact_lock_path):
+        assert not index.compact()
+    assert index.compact()
+
+
+def test_without_fcntl_the_index_is_off_and_locks_stay_in_process(tmp_path, monkeypatch):
+    monkeypatch.setattr(keyword_index, 'fcntl', None)
+    monkeypatch.setenv('KEYWORD_INDEX_DIR', str(tmp_path))
+    monkeypatch.delenv('KEYWORD_INDEX_ENABLED', raising=False)
+    assert KeywordIndex.from_env() is None
+
+    index = KeywordIndex(str(tmp_path), refresh_seconds=0)
+    index.add('crm', ['crm tools', 'crm software', 'crm pricing'])
+    with keyword_index._locked(index._compact_lock_path):
+        assert not index.compact()
+    assert index.compact()
+    assert index.expansions('crm', 5) == ['crm pricing', 'crm software', 'crm tools']
+
+
+def test_warm_seeds_answer_generate_keywords_in_the_models_shape(service):
+    assert service.generate_keywords('CRM Tools', native=True) == [
+        'fake keyword one', 'fake keyword two', 'fake keyword three'
+    ]
+    calls = service.client.calls
+    service.keyword_index.add('crm tools', ['Extra One', 'Extra Two', 'Extra Three'])
+
+    # As many keywords as the prompt asks the model for, as they were generated
+    assert service.generate_keywords('crm tools', native=True) == [
+        'Extra One', 'Extra Three', 'Extra Two', 'fake keyword one', 'fake keyword three'
+    ]
+    assert service.client.calls == calls
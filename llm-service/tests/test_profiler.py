@@ -0,0 +1,33 @@
+import pytest
+
+from services.profiler import Profiler
+
+
+def test_enabling_profiling_without_a_token_refuses_to_start(monkeypatch, tmp_path):
+    monkeypatch.setenv('PROFILE_ENABLED', 'true')
+    monkeypatch.setenv('PROFILE_DIR', str(tmp_path))
+    monkeypatch.delenv('PROFILE_TOKEN', raising=False)
+    with pytest.raises(ValueError):
+        Profiler.from_env()
+
+    monkeypatch.setenv('PROFILE_TOKEN', 'secret')
+    assert Profiler.from_env().token == 'secret'
+
+
+def test_disabled_profiling_needs_no_token(monkeypatch):
+    monkeypatch.delenv('PROFILE_ENABLED', raising=False)
+    monkeypatch.delenv('PROFILE_TOKEN', raising=False)
+    assert Profiler.from_env() is None
+
+
+def test_forced_profiles_and_downloads_need_the_token(tmp_path):
+    profiler = Profiler(str(tmp_path), token='secret')
+    assert not profiler.wants({'X-Profile': 'true'})
+    assert not profiler.wants({'X-Profile': 'true', 'X-Profile-Token': 'guess'})
+    assert profiler.wants({'X-Profile': 'true', 'X-Profile-Token': 'secret'})
+    assert not profiler.authorized({})
+
+    # A profiler built without a token opens nothing up
+    tokenless = Profiler(str(tmp_path))
+    assert not tokenless.wants({'X-Profile': 'true'})
+    assert not tokenless.authorized({'X-Profile-Token': ''})
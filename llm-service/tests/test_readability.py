@@ -0,0 +1,22 @@
+from collections import Counter
+
+from services.readability import measure, split_sentences, word_profile
+
+TEXT = (
+    'Good keyword research was done by the team. It is completely necessary, honestly. '
+    'Marketing teams publish articles every week... Then they measure results! '
+    'Do readers finish long-form guides? Most of them do, e.g. the popular ones. '
+)
+
+
+def test_measure_consumes_a_stream_of_sentences():
+    sentences = split_sentences(TEXT * 50)
+    streamed = measure(sentence for sentence in sentences)
+    assert streamed.sentences == measure(sentences).sentences == 6 * 50
+    assert streamed.passive_sentences == 50
+
+    tokens = Counter(token for sentence in sentences for token in sentence.lower().split())
+    profiles = [(word_profile(token), occurrences) for token, occurrences in tokens.items()]
+    assert streamed.words == sum(profile[0] * n for profile, n in profiles)
+    assert streamed.syllables == sum(profile[1] * n for profile, n in profiles)
+    assert streamed.complex_words == sum(profile[2] * n for profile, n in profiles)
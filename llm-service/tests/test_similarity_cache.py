@@ -0,0 +1,55 @@
+import pytest
+
+from services.similarity_cache import SimilarityCache, normalize
+
+
+@pytest.fixture
+def cache():
+    return SimilarityCache({'generate_keywords': 0.85})
+
+
+def test_word_order_case_and_plurals_share_a_key():
+    assert normalize('Best CRM Tools') == normalize('tools for best crm') == ('best', 'crm', 'tool')
+
+
+@pytest.mark.parametrize('text', ['маркетинг', '東京 旅行', 'café ñandú'])
+def test_non_latin_inputs_keep_their_words(cache, text):
+    assert normalize(text)
+    assert cache.get('generate_keywords', '', text) is None
+    cache.set('generate_keywords', '', text, 'stored')
+    assert cache.get('generate_keywords', '', text) == 'stored'
+
+
+def test_non_latin_inputs_do_not_collide(cache):
+    cache.set('generate_keywords', '', 'маркетинг', 'marketing')
+    assert cache.get('generate_keywords', '', '東京 旅行') is None
+
+
+@pytest.mark.parametrize('text', ['???', '', '  -- !! '])
+def test_inputs_without_words_are_not_cached(cache, text):
+    assert normalize(text) == ()
+    cache.set('generate_keywords', '', text, 'stored')
+    assert cache.get('generate_keywords', '', text) is None
+    assert cache.get('generate_keywords', '', '!!!') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_significant_symbols_separate_inputs(cache):
+    cache.set('generate_keywords', '', 'c++ tutorial', 'c++')
+    assert cache.get('generate_keywords', '', 'c# tutorial') is None
+    assert cache.get('generate_keywords', '', 'c tutorial') is None
+    assert cache.get('generate_keywords', '', 'Tutorial C++') == 'c++'
+
+
+def test_near_duplicates_match_but_numbers_must_agree(cache):
+    cache.set('generate_keywords', '', 'best email marketing tools 2024', 'stored')
+    assert cache.get('generate_keywords', '', 'best email marketing tool 2024') == 'stored'
+    assert cache.get('generate_keywords', '', 'best email marketing tools 2025') is None
+
+
+@pytest.mark.parametrize('seed', ['маркетинг', '東京 旅行', '???'])
+def test_generate_endpoints_accept_any_input(service, seed):
+    assert service.generate_keywords(seed, native=True)
+    assert service.generate_titles(seed, native=True)
+    # The second call is answered from the caches
+    assert service.generate_titles(seed, native=True)
@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from benchmarks.fakes import FakeOpenAIClient
+from services.single_flight import AsyncSingleFlight, SingleFlight
+
+
+def run_together(count, fn):
+    """Call fn(index) from count threads released at once; returns results or exceptions"""
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def worker(index):
+        barrier.wait()
+        try:
+            results[index] = fn(index)
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def slow(value, delay=0.2, calls=None):
+    def fn():
+        if calls is not None:
+            calls.append(1)
+        time.sleep(delay)
+        return value
+    return fn
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+    results = run_together(10, lambda index: flight.do('key', slow('shared', calls=calls)))
+    assert results == ['shared'] * 10
+    assert len(calls) == 1
+    assert flight.stats == {'leaders': 1, 'followers': 9}
+    assert flight.in_flight() == 0
+
+
+def test_failure_reaches_every_waiter_but_is_not_replayed():
+    flight = SingleFlight()
+
+    def failing():
+        time.sleep(0.2)
+        raise ValueError('upstream broke')
+
+    results = run_together(5, lambda index: flight.do('key', failing))
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.do('key', lambda: 'recovered') == 'recovered'
+
+
+def test_follower_timeout_leaves_the_leader_running():
+    flight = SingleFlight()
+    leader = threading.Thread(target=lambda: flight.do('key', slow('late', delay=0.3)))
+    leader.start()
+    time.sleep(0.05)
+    with pytest.raises(TimeoutError):
+        flight.do('key', slow('unused'), timeout=0.05)
+    leader.join()
+    assert flight.in_flight() == 0
+
+
+def test_async_waiters_share_one_task():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 'shared'
+
+    async def main():
+        return await asyncio.gather(*(flight.do('key', fetch) for _ in range(10)))
+
+    assert asyncio.run(main()) == ['shared'] * 10
+    assert len(calls) == 1
+    assert flight.in_flight() == 0
+
+
+def test_async_cancelled_leader_does_not_cancel_followers():
+    flight = AsyncSingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return 'shared'
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do('key', fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do('key', fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower, leader.cancelled()
+
+    assert asyncio.run(main()) == ('shared', True)
+
+
+def test_async_call_is_cancelled_once_every_waiter_leaves():
+    flight = AsyncSingleFlight()
+    started = []
+
+    async def fetch():
+        started.append(asyncio.current_task())
+        await asyncio.sleep(10)
+
+    async def main():
+        waiters = [asyncio.ensure_future(flight.do('key', fetch)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        return started[0].cancelled()
+
+    assert asyncio.run(main())
+    assert flight.in_flight() == 0
+
+
+def test_identical_prompts_reach_the_upstream_once(service):
+    service.client = FakeOpenAIClient(latency=0.2)
+    service.cache = None
+    service.similar = None
+    service.keyword_index = None
+    results = run_together(20, lambda index: service.generate_keywords('crm tools', native=True))
+    assert all(result == results[0] for result in results)
+    assert service.client.chat.completions.calls == 1
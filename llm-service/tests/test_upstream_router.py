@@ -0,0 +1,78 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services.upstream_router import UpstreamRouter, UpstreamTarget
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class ScriptedClient:
+    """A client whose calls fail, succeed, or wait for a release, in the order they arrive"""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=self)
+        self.fail = False
+        self.hold = None
+
+    def create(self, **kwargs):
+        if self.hold is not None:
+            hold, self.hold = self.hold, None
+            hold.wait(5)
+        if self.fail:
+            raise ConnectionError('upstream unreachable')
+        return 'ok'
+
+
+@pytest.fixture
+def upstream():
+    client = ScriptedClient()
+    clock = Clock()
+    target = UpstreamTarget('only', client)
+    router = UpstreamRouter([target], eject_after=1, eject_seconds=10, clock=clock)
+    return SimpleNamespace(client=client, clock=clock, target=target, router=router)
+
+
+def test_only_the_probe_ends_the_probe(upstream):
+    upstream.client.fail = True
+    with pytest.raises(ConnectionError):
+        upstream.router.chat.completions.create(model='m')
+    assert upstream.target.ejected_until == 10
+    upstream.clock.now = 11
+    upstream.client.fail = False
+
+    # The probe goes out and hangs...
+    release = upstream.client.hold = threading.Event()
+    probe = threading.Thread(target=upstream.router.chat.completions.create, kwargs={'model': 'm'})
+    probe.start()
+    while not upstream.target.probing:
+        time.sleep(0.001)
+
+    # ...while a call with nowhere else to go lands on the same target and finishes first
+    assert upstream.router.chat.completions.create(model='m') == 'ok'
+    assert upstream.target.probing
+
+    release.set()
+    probe.join()
+    assert not upstream.target.probing
+    assert upstream.target.in_flight == 0
+
+
+def test_a_failed_probe_ejects_the_target_again(upstream):
+    upstream.client.fail = True
+    with pytest.raises(ConnectionError):
+        upstream.router.chat.completions.create(model='m')
+    upstream.clock.now = 11
+    with pytest.raises(ConnectionError):
+        upstream.router.chat.completions.create(model='m')
+    assert not upstream.target.probing
+    # Doubled on the repeat
+    assert upstream.target.ejected_until == 31
@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+
+from services.upstream_scheduler import AdaptiveConcurrencyLimiter, UpstreamError, UpstreamScheduler
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f'status {status_code}')
+        self.status_code = status_code
+
+
+def scheduler(initial: int = 8) -> UpstreamScheduler:
+    limiter = AdaptiveConcurrencyLimiter(initial=initial, maximum=64)
+    return UpstreamScheduler(limiter=limiter, max_retries=0, sleep=lambda seconds: None)
+
+
+def fail(error):
+    def call(*args, **kwargs):
+        raise error
+    return call
+
+
+def test_fast_successes_raise_the_limit():
+    upstream = scheduler()
+    for _ in range(16):
+        upstream.call(lambda: 'ok')
+    assert upstream.limiter.limit > 9
+
+
+@pytest.mark.parametrize('error', [StatusError(500), StatusError(503), ConnectionRefusedError(), TimeoutError()])
+def test_fast_server_and_transport_failures_lower_the_limit(error):
+    upstream = scheduler()
+    for _ in range(3):
+        with pytest.raises(UpstreamError):
+            upstream.call(fail(error))
+    assert upstream.limiter.limit == 1
+
+
+def test_client_errors_leave_the_limit_alone():
+    upstream = scheduler()
+    for _ in range(16):
+        with pytest.raises(UpstreamError):
+            upstream.call(fail(StatusError(400)))
+    assert upstream.limiter.limit == 8
+    assert upstream.limiter.in_flight == 0
+
+
+def test_fallback_reraises_local_bugs(service):
+    service._complete = fail(KeyError('choices'))
+    with pytest.raises(KeyError):
+        service.generate_titles('crm tools', native=True)
+
+
+def test_fallback_keeps_upstream_failures_retryable(service):
+    service._complete = fail(UpstreamError('overloaded', 503, 2.0))
+    with pytest.raises(UpstreamError) as raised:
+        service.generate_titles('crm tools', native=True)
+    assert raised.value.status_code == 503
+
+    service._complete = fail(ConnectionResetError())
+    with pytest.raises(UpstreamError):
+        service.generate_titles('crm tools', native=True)
+
+
+class RecordingLimiter(AdaptiveConcurrencyLimiter):
+    def __init__(self):
+        super().__init__(initial=8)
+        self.latencies = []
+
+    def release(self, latency=None, throttled=False, failed=False):
+        self.latencies.append(latency)
+        super().release(latency, throttled, failed)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def chunks(clock, count):
+    for n in range(count):
+        clock.now += 1.0
+        yield n
+
+
+def test_stream_holds_its_slot_until_exhausted():
+    clock = Clock()
+    limiter = RecordingLimiter()
+    upstream = UpstreamScheduler(limiter=limiter, clock=clock, sleep=lambda seconds: None)
+
+    received = []
+    for chunk in upstream.stream(lambda: chunks(clock, 5)):
+        assert limiter.in_flight == 1
+        received.append(chunk)
+    assert received == [0, 1, 2, 3, 4]
+    assert limiter.in_flight == 0
+    assert limiter.latencies == [5.0]
+
+
+def test_closing_a_stream_frees_its_slot_without_judging_it():
+    clock = Clock()
+    limiter = RecordingLimiter()
+    upstream = UpstreamScheduler(limiter=limiter, clock=clock, sleep=lambda seconds: None)
+
+    stream = upstream.stream(lambda: chunks(clock, 5))
+    assert next(stream) == 0
+    stream.close()
+    assert limiter.in_flight == 0
+    assert limiter.latencies == [None]
+
+
+def test_failing_stream_counts_as_a_failure():
+    upstream = scheduler()
+
+    def broken():
+        yield 'first'
+        raise StatusError(502)
+
+    with pytest.raises(StatusError):
+        list(upstream.stream(broken))
+    assert upstream.limiter.in_flight == 0
+    assert upstream.limiter.limit == 4
+
+
+def test_async_stream_holds_its_slot_until_exhausted():
+    clock = Clock()
+    limiter = RecordingLimiter()
+    upstream = UpstreamScheduler(limiter=limiter, clock=clock)
+
+    async def open_stream():
+        async def tokens():
+            for n in range(3):
+                await asyncio.sleep(0)
+                clock.now += 1.0
+                yield n
+        return tokens()
+
+    async def consume():
+        received = []
+        async for chunk in upstream.astream(open_stream):
+            assert limiter.in_flight == 1
+            received.append(chunk)
+        return received
+
+    assert asyncio.run(consume()) == [0, 1, 2]
+    assert limiter.in_flight == 0
+    assert limiter.latencies == [3.0]
+
+
+def test_content_stream_releases_the_slot_when_the_client_leaves(service):
+    stream = service.generate_content_stream('CRM tools', 'crm tools', {'sections': []}, use_cache=False)
+    assert next(stream)['type'] == 'token'
+    assert service.scheduler.limiter.in_flight == 1
+    stream.close()
+    assert service.scheduler.limiter.in_flight == 0